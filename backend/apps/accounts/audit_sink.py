@@ -0,0 +1,87 @@
+"""
+Buffered sink for permission-check audit events.
+
+PermissionChecker hands every check to record(), which only appends to an
+in-process buffer. The buffer is written with one bulk_create (plus one
+Permission code -> id lookup) once it holds PERMISSION_AUDIT_BATCH_SIZE
+events or its oldest event is PERMISSION_AUDIT_FLUSH_MS old; the age is
+also checked when a request finishes, and whatever is left is flushed when
+the worker process exits.
+
+Denials are always recorded. Successful checks are kept with probability
+PERMISSION_AUDIT_SAMPLE_RATE (1.0 records everything).
+"""
+import atexit
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class PermissionAuditSink:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = []
+        self._oldest = None
+
+    def record(self, user_id, permission_code, result, scope='', action='check', metadata=None):
+        if result and random.random() >= _setting('PERMISSION_AUDIT_SAMPLE_RATE', 1.0):
+            return
+        with self._lock:
+            if not self._events:
+                self._oldest = time.monotonic()
+            self._events.append((user_id, action, permission_code, result, scope or '', metadata or {}))
+            due = len(self._events) >= _setting('PERMISSION_AUDIT_BATCH_SIZE', 100)
+        if due or self._expired():
+            self.flush()
+
+    def _expired(self):
+        oldest = self._oldest
+        return oldest is not None and (time.monotonic() - oldest) * 1000 >= _setting('PERMISSION_AUDIT_FLUSH_MS', 2000)
+
+    def flush_if_due(self):
+        if self._expired():
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            events, self._events, self._oldest = self._events, [], None
+        if not events:
+            return 0
+
+        from .models import Permission, PermissionAuditLog
+        try:
+            codes = {event[2] for event in events if event[2]}
+            permission_ids = dict(Permission.objects.filter(code__in=codes).values_list('code', 'id'))
+            PermissionAuditLog.objects.bulk_create([
+                PermissionAuditLog(
+                    user_id=user_id, action=action, permission_id=permission_ids.get(code),
+                    result=result, scope_used=scope, metadata=metadata
+                )
+                for user_id, action, code, result, scope, metadata in events
+            ], batch_size=500)
+        except Exception as e:
+            # Auditing must never break the request that triggered the flush
+            logger.error(f"Failed to write {len(events)} permission audit event(s): {e}")
+            return 0
+        return len(events)
+
+
+audit_sink = PermissionAuditSink()
+
+atexit.register(audit_sink.flush)
+
+
+@receiver(request_finished)
+def flush_permission_audit(sender, **kwargs):
+    audit_sink.flush_if_due()
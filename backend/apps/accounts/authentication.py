@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .tenant import bind_tenant, claims_are_current
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    Authenticated user backed by access-token claims. id, pk, is_superuser
+    and the authentication flags are answered from the token; the User row
+    is only loaded when something else is accessed.
+    """
+    from_token_claims = True
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    def __init__(self, token):
+        user_id = token['user_id']
+        super().__init__(lambda: get_user_model().objects.get(pk=user_id))
+        self.__dict__['_claims'] = {'id': user_id, 'is_superuser': bool(token.get('is_superuser'))}
+
+    @property
+    def id(self):
+        return self._claims['id']
+
+    pk = id
+
+    @property
+    def is_superuser(self):
+        return self._claims['is_superuser']
+
+    def __bool__(self):
+        # IsAuthenticated checks ``request.user and ...``
+        return True
+
+    def __setattr__(self, name, value):
+        # The pinned tenant context lives on the proxy, not the User row
+        if name == '_tenant':
+            self.__dict__[name] = value
+        else:
+            super().__setattr__(name, value)
+
+
+class TenantJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that also attaches the caller's request.tenant.
+
+    With JWT_STATELESS_TENANT enabled, a token whose tenant claims are still
+    current authenticates without loading the User row (see ClaimsUser).
+    Tokens with a stale permission version go through the normal lookup and
+    get a tenant context resolved from the database.
+    """
+
+    def get_user(self, validated_token):
+        if getattr(settings, 'JWT_STATELESS_TENANT', False) and claims_are_current(validated_token):
+            return ClaimsUser(validated_token)
+        return super().get_user(validated_token)
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is None:
+            return None
+        user, token = result
+        # On the underlying HttpRequest so both DRF and Django views see it
+        bind_tenant(request._request, user, token)
+        return user, token
@@ -1,6 +1,11 @@
 """
 Email Utilities for Nexus HRMS
 Handles all email notifications for the platform.
+
+Registration notices go through the notification outbox (send_* queues,
+render_* is called by the worker). Login credentials and 2FA codes are sent
+directly: they carry secrets that must not be stored in the outbox and the
+user is waiting for them.
 """
 
 from django.core.mail import send_mail, EmailMultiAlternatives
@@ -13,9 +18,20 @@ logger = logging.getLogger(__name__)
 
 def send_registration_confirmation(admin_email, admin_name, organization_name):
     """
-    Send confirmation email when a new organization registration is submitted.
+    Queue the confirmation email for a new organization registration.
     Informs the registrant that their request is pending approval.
     """
+    from apps.notifications.outbox import enqueue
+    return enqueue(
+        'account',
+        renderer='apps.accounts.emails.render_registration_confirmation',
+        params=[admin_email, admin_name, organization_name],
+    )
+
+
+def render_registration_confirmation(admin_email, admin_name, organization_name):
+    from apps.notifications.outbox import RenderedEmail
+
     subject = f"Registration Received - {organization_name}"
     
     plain_message = f"""
@@ -105,20 +121,7 @@ The Nexus HRMS Team
     </html>
     """
     
-    try:
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[admin_email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        logger.info(f"Registration confirmation email sent to {admin_email}")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to send registration confirmation email to {admin_email}: {str(e)}")
-        return False
+    return RenderedEmail([admin_email], subject, plain_message, html_message)
 
 
 def send_login_credentials(admin_email, admin_name, organization_name, username, password, login_url=None):
@@ -255,8 +258,19 @@ The Nexus HRMS Team
 
 def send_registration_rejected(admin_email, admin_name, organization_name, rejection_reason=None):
     """
-    Send notification email when an organization registration is rejected.
+    Queue the notification email for a rejected organization registration.
     """
+    from apps.notifications.outbox import enqueue
+    return enqueue(
+        'account',
+        renderer='apps.accounts.emails.render_registration_rejected',
+        params=[admin_email, admin_name, organization_name, rejection_reason],
+    )
+
+
+def render_registration_rejected(admin_email, admin_name, organization_name, rejection_reason=None):
+    from apps.notifications.outbox import RenderedEmail
+
     subject = f"Registration Update - {organization_name}"
     
     reason_text = rejection_reason if rejection_reason else "No specific reason was provided."
@@ -326,20 +340,7 @@ The Nexus HRMS Team
     </html>
     """
     
-    try:
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[admin_email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        logger.info(f"Registration rejection email sent to {admin_email}")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to send registration rejection email to {admin_email}: {str(e)}")
-        return False
+    return RenderedEmail([admin_email], subject, plain_message, html_message)
 
 
 def send_2fa_otp(user_email, user_name, otp_code):
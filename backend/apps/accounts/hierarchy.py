@@ -0,0 +1,253 @@
+"""
+Closure tables for the organization, department and reporting trees.
+
+Every node has one row per ancestor (itself included, at depth 0):
+
+    OrganizationClosure(ancestor=root, descendant=subsidiary, depth=2)
+
+so "all descendants", "root" and "is X under Y" are single indexed queries
+instead of one query per level. The signals in signals.py keep the rows in
+step with ``parent`` / ``reporting_manager``: a new node copies its parent's
+ancestor rows, and a move replaces the links between the moved subtree and
+its old ancestors with links to the new ones. ``rebuild`` recomputes a table
+from scratch (migration backfill, ``manage.py rebuild_hierarchies``).
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+
+def _trees():
+    from .models import (
+        Department, DepartmentClosure, Employee, Organization,
+        OrganizationClosure, ReportingClosure
+    )
+    return {
+        Organization: (OrganizationClosure, 'parent'),
+        Department: (DepartmentClosure, 'parent'),
+        Employee: (ReportingClosure, 'reporting_manager'),
+    }
+
+
+def tree_for(model):
+    """(closure model, parent field name) for ``model`` or one of its proxies."""
+    return _trees()[model._meta.concrete_model]
+
+
+def parent_id(node):
+    return node.__dict__.get(f'{tree_for(type(node))[1]}_id')
+
+
+def loaded_parent_id(node):
+    """Parent as stored in the closure table (None for a root or unknown node)."""
+    closure, _ = tree_for(type(node))
+    return closure.objects.filter(descendant_id=node.pk, depth=1).values_list('ancestor_id', flat=True).first()
+
+
+def parent_changed(node):
+    if not hasattr(node, '_loaded_parent_id'):
+        node._loaded_parent_id = loaded_parent_id(node)
+    return node._loaded_parent_id != parent_id(node)
+
+
+def check_move(node):
+    """Refuse to place ``node`` under one of its own descendants."""
+    new_parent_id = parent_id(node)
+    if new_parent_id is None or node._state.adding:
+        return
+    if new_parent_id == node.pk or is_descendant(type(node), new_parent_id, node.pk):
+        raise ValueError(f"{node} cannot be placed under itself or one of its descendants")
+
+
+def insert_node(node):
+    closure, _ = tree_for(type(node))
+    rows = [closure(ancestor_id=node.pk, descendant_id=node.pk, depth=0)]
+    new_parent_id = parent_id(node)
+    if new_parent_id is not None:
+        rows += [
+            closure(ancestor_id=ancestor_id, descendant_id=node.pk, depth=depth + 1)
+            for ancestor_id, depth in closure.objects.filter(descendant_id=new_parent_id).values_list('ancestor_id', 'depth')
+        ]
+    closure.objects.bulk_create(rows, ignore_conflicts=True)
+    node._loaded_parent_id = new_parent_id
+
+
+def insert_nodes(model, nodes):
+    """
+    insert_node for many new nodes at once (bulk imports, which skip the
+    save signals). Parents may be existing nodes or other nodes of the batch.
+    """
+    closure, _ = tree_for(model)
+    parents = {node.pk: parent_id(node) for node in nodes}
+    outside = {pid for pid in parents.values() if pid is not None and pid not in parents}
+    ancestors = {}
+    for ancestor_id, descendant_id, depth in closure.objects.filter(descendant_id__in=outside).values_list(
+        'ancestor_id', 'descendant_id', 'depth'
+    ):
+        ancestors.setdefault(descendant_id, []).append((ancestor_id, depth))
+
+    def chain(node_id):
+        """(ancestor, depth) pairs of a batch node, itself included"""
+        if node_id not in ancestors:
+            pending, current = [], node_id
+            while current in parents and current not in ancestors:
+                if current in pending:
+                    raise ValueError(f"Parent cycle through {current}")
+                pending.append(current)
+                current = parents[current]
+            # current is now None, an outside parent or an already chained node
+            above = ancestors.get(current, [])
+            for pending_id in reversed(pending):
+                above = [(pending_id, 0)] + [(ancestor_id, depth + 1) for ancestor_id, depth in above]
+                ancestors[pending_id] = above
+        return ancestors[node_id]
+
+    rows = [
+        closure(ancestor_id=ancestor_id, descendant_id=node.pk, depth=depth)
+        for node in nodes
+        for ancestor_id, depth in chain(node.pk)
+    ]
+    closure.objects.bulk_create(rows, batch_size=1000)
+    for node in nodes:
+        node._loaded_parent_id = parents[node.pk]
+
+
+@transaction.atomic
+def move_node(node):
+    closure, _ = tree_for(type(node))
+    subtree = list(closure.objects.filter(ancestor_id=node.pk).values_list('descendant_id', 'depth'))
+    if not subtree:
+        # Never indexed (created before the table existed): index it now
+        insert_node(node)
+        return
+
+    subtree_ids = [descendant_id for descendant_id, _ in subtree]
+    old_ancestor_ids = list(
+        closure.objects.filter(descendant_id=node.pk, depth__gt=0).values_list('ancestor_id', flat=True)
+    )
+    if old_ancestor_ids:
+        closure.objects.filter(ancestor_id__in=old_ancestor_ids, descendant_id__in=subtree_ids).delete()
+
+    new_parent_id = parent_id(node)
+    if new_parent_id is not None:
+        new_ancestors = list(closure.objects.filter(descendant_id=new_parent_id).values_list('ancestor_id', 'depth'))
+        closure.objects.bulk_create([
+            closure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=ancestor_depth + depth + 1)
+            for ancestor_id, ancestor_depth in new_ancestors
+            for descendant_id, depth in subtree
+        ], batch_size=1000)
+    node._loaded_parent_id = new_parent_id
+
+
+def detach_subtree(node):
+    """
+    Cut ``node``'s subtree loose from its ancestors before ``node`` is
+    deleted. Its children are re-parented to NULL (on_delete=SET_NULL)
+    without save signals, so they become roots of their own trees.
+    """
+    closure, _ = tree_for(type(node))
+    subtree_ids = list(closure.objects.filter(ancestor_id=node.pk).values_list('descendant_id', flat=True))
+    ancestor_ids = list(closure.objects.filter(descendant_id=node.pk, depth__gt=0).values_list('ancestor_id', flat=True))
+    if subtree_ids and ancestor_ids:
+        closure.objects.filter(ancestor_id__in=ancestor_ids, descendant_id__in=subtree_ids).delete()
+
+
+# ==================== QUERIES ====================
+
+def descendants(node, include_self=False):
+    """Queryset of everything below ``node``."""
+    model = type(node)._meta.concrete_model
+    lookup = {'ancestor_links__ancestor_id': node.pk}
+    if not include_self:
+        lookup['ancestor_links__depth__gt'] = 0
+    return model.objects.filter(**lookup)
+
+
+def active_descendants(node, **active):
+    """
+    Descendants matching ``active`` that are reached only through nodes
+    matching it too, i.e. what walking down the active children level by
+    level returns.
+    """
+    closure, _ = tree_for(type(node))
+    inactive = closure.objects.filter(ancestor_id=node.pk, depth__gt=0).exclude(
+        **{f'descendant__{field}': value for field, value in active.items()}
+    ).values('descendant_id')
+    blocked = closure.objects.filter(ancestor_id__in=inactive).values('descendant_id')
+    return descendants(node).filter(**active).exclude(pk__in=blocked)
+
+
+def root(node):
+    if parent_id(node) is None:
+        return node
+    model = type(node)._meta.concrete_model
+    parent_field = tree_for(model)[1]
+    return model.objects.filter(
+        descendant_links__descendant_id=node.pk, **{f'{parent_field}__isnull': True}
+    ).first()
+
+
+def is_descendant(model, node_id, ancestor_id, include_self=False):
+    """Whether ``node_id`` sits under ``ancestor_id``."""
+    closure, _ = tree_for(model)
+    lookup = {'ancestor_id': ancestor_id, 'descendant_id': node_id}
+    if not include_self:
+        lookup['depth__gt'] = 0
+    return closure.objects.filter(**lookup).exists()
+
+
+def same_root(model, node_id, other_id):
+    """Whether both nodes belong to the same tree, in one query."""
+    closure, parent_field = tree_for(model)
+    return closure.objects.filter(**{
+        'descendant_id': node_id,
+        f'ancestor__{parent_field}__isnull': True,
+        'ancestor__descendant_links__descendant_id': other_id,
+    }).exists()
+
+
+def same_tree_ids(model, node_id):
+    """Subquery of the ids in the same tree as ``node_id``, root included."""
+    closure, parent_field = tree_for(model)
+    roots = closure.objects.filter(**{'descendant_id': node_id, f'ancestor__{parent_field}__isnull': True})
+    return closure.objects.filter(ancestor_id__in=roots.values('ancestor_id')).values('descendant_id')
+
+
+# ==================== REBUILD ====================
+
+def rebuild(model, closure, parent_field):
+    """
+    Recompute ``closure`` for ``model`` from its ``parent_field`` column. Takes the
+    classes explicitly so migrations can pass their historical models.
+    """
+    nodes = dict(model.objects.values_list('pk', parent_field))
+    children = defaultdict(list)
+    for node_id, node_parent_id in nodes.items():
+        if node_parent_id in nodes:
+            children[node_parent_id].append(node_id)
+
+    rows = []
+    reached = set()
+    stack = [(node_id, ()) for node_id, node_parent_id in nodes.items() if node_parent_id not in nodes]
+    while stack:
+        node_id, path = stack.pop()
+        reached.add(node_id)
+        path = path + (node_id,)
+        depth = len(path) - 1
+        rows.extend(closure(ancestor_id=ancestor_id, descendant_id=node_id, depth=depth - i) for i, ancestor_id in enumerate(path))
+        stack.extend((child_id, path) for child_id in children[node_id])
+
+    # Nodes caught in a parent cycle only get their own row
+    rows.extend(closure(ancestor_id=node_id, descendant_id=node_id, depth=0) for node_id in nodes if node_id not in reached)
+
+    with transaction.atomic():
+        closure.objects.all().delete()
+        closure.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def rebuild_all():
+    return {
+        model.__name__: rebuild(model, closure, parent_field)
+        for model, (closure, parent_field) in _trees().items()
+    }
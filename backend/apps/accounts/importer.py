@@ -0,0 +1,463 @@
+"""
+Bulk employee onboarding from CSV / XLSX (HRIS migrations).
+
+A job is validated as a whole before anything is written:
+
+1. every row is cleaned with the Employee model fields' own validators;
+2. employee ids, emails and usernames are checked for duplicates inside the
+   file and against the database with chunked ``__in`` lookups;
+3. department, designation and onboarding template names (or codes) and
+   reporting managers (employee ids, in the file or already employed) are
+   resolved from one query each;
+4. rows whose manager failed, or that form a reporting cycle, fail too.
+
+The valid rows are then written in one transaction: passwords are hashed in
+a thread pool beforehand (the PBKDF2/Argon2 hashers release the GIL), users,
+employees (managers first) and onboarding steps are bulk-created in chunks,
+and the reporting closure and search index are filled in bulk since
+bulk_create skips the save signals. Failed rows go to a CSV error report on
+the job. ``dry_run`` jobs stop after validation.
+"""
+import csv
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+import openpyxl
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from apps.audit.utils import log_activity
+
+from . import hierarchy, search, stats
+from .models import Department, Designation, Employee
+from .validators import validate_password_complexity
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 1000
+
+# Canonical column -> accepted header spellings (lower-cased, spaces/dashes as underscores)
+COLUMNS = {
+    'employee_id': ('employee_id', 'emp_id', 'employee_code', 'emp_code', 'code'),
+    'first_name': ('first_name', 'firstname', 'given_name'),
+    'middle_name': ('middle_name', 'middlename'),
+    'last_name': ('last_name', 'lastname', 'surname', 'family_name'),
+    'email': ('email', 'work_email', 'official_email', 'email_address'),
+    'personal_email': ('personal_email',),
+    'phone': ('phone', 'mobile', 'phone_number', 'mobile_number'),
+    'gender': ('gender',),
+    'date_of_birth': ('date_of_birth', 'dob', 'birth_date'),
+    'date_of_joining': ('date_of_joining', 'doj', 'joining_date', 'hire_date'),
+    'employment_type': ('employment_type', 'type'),
+    'department': ('department', 'department_name', 'department_code'),
+    'designation': ('designation', 'designation_name', 'designation_code', 'job_title'),
+    'reporting_manager': ('reporting_manager', 'manager', 'manager_employee_id', 'reporting_manager_id'),
+    'onboarding_template': ('onboarding_template', 'template'),
+    'username': ('username', 'login', 'user_name'),
+    'password': ('password',),
+}
+REQUIRED_COLUMNS = ('employee_id', 'first_name', 'email')
+
+# Cleaned through the matching Employee field (max_length, validators, choices)
+MODEL_FIELDS = (
+    'employee_id', 'first_name', 'middle_name', 'last_name', 'email', 'personal_email',
+    'phone', 'gender', 'date_of_birth', 'date_of_joining', 'employment_type',
+)
+DATE_FIELDS = ('date_of_birth', 'date_of_joining')
+DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%m/%d/%Y')
+
+
+def _normalise_header(value):
+    return str(value or '').strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Excel stores numeric ids and phone numbers as floats
+        value = int(value)
+    if isinstance(value, (date, datetime)):
+        return value
+    return str(value).strip()
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValidationError(f"Invalid date '{value}'")
+
+
+def _chunks(values, size=IMPORT_CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _choice(field, value):
+    """Accept a choice by value or label, case-insensitively."""
+    lowered = value.lower().replace(' ', '_')
+    for key, label in field.choices:
+        if lowered in (str(key).lower(), str(label).lower().replace(' ', '_')):
+            return key
+    return value
+
+
+class EmployeeFileReader:
+    """Iterates (row_number, {column: value}) over an onboarding file."""
+
+    def __init__(self, fh, filename):
+        self.fh = fh
+        self.is_excel = filename.lower().endswith(('.xlsx', '.xlsm'))
+
+    def _raw_rows(self):
+        if self.is_excel:
+            workbook = openpyxl.load_workbook(self.fh, read_only=True, data_only=True)
+            try:
+                yield from workbook.active.iter_rows(values_only=True)
+            finally:
+                workbook.close()
+        else:
+            text = io.TextIOWrapper(self.fh, encoding='utf-8-sig', newline='')
+            yield from csv.reader(text)
+
+    def __iter__(self):
+        rows = self._raw_rows()
+        headers = [_normalise_header(h) for h in next(rows, [])]
+
+        positions = {}
+        for column, candidates in COLUMNS.items():
+            for candidate in candidates:
+                if candidate in headers:
+                    positions[column] = headers.index(candidate)
+                    break
+
+        missing = [column for column in REQUIRED_COLUMNS if column not in positions]
+        if missing:
+            raise ValueError(f"File is missing required column(s): {', '.join(missing)}")
+
+        for row_number, row in enumerate(rows, start=2):
+            if not row or all(cell in (None, '') for cell in row):
+                continue
+            row = list(row) + [None] * (len(headers) - len(row))
+            yield row_number, {column: _cell(row[index]) for column, index in positions.items()}
+
+
+class ImportRow:
+    __slots__ = ('number', 'data', 'errors', 'employee', 'user', 'manager_row', 'template_id')
+
+    def __init__(self, number, data):
+        self.number = number
+        self.data = data
+        self.errors = []
+        self.employee = None
+        self.user = None
+        self.manager_row = None
+        self.template_id = None
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+class EmployeeImportService:
+    @staticmethod
+    def run(job):
+        """Import a queued job and attach the error report."""
+        job.status = 'processing'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+
+        with tempfile.TemporaryFile(mode='w+', newline='') as report:
+            writer = csv.writer(report)
+            writer.writerow(['row', 'employee_id', 'email', 'error'])
+            try:
+                with job.file.open('rb') as fh:
+                    rows = [ImportRow(number, data) for number, data in EmployeeFileReader(fh, job.file.name)]
+                EmployeeImportService.import_rows(job, rows)
+                for row in rows:
+                    if not row.ok:
+                        writer.writerow([row.number, row.data.get('employee_id', ''), row.data.get('email', ''), '; '.join(row.errors)])
+                job.status = 'completed'
+            except Exception as e:
+                logger.exception(e)
+                job.status = 'failed'
+                job.last_error = str(e)
+
+            if job.error_rows:
+                report.seek(0)
+                name = f'{os.path.splitext(os.path.basename(job.file.name))[0]}_errors.csv'
+                job.error_report.save(name, File(report), save=False)
+
+        job.finished_at = timezone.now()
+        job.save()
+        return job
+
+    @staticmethod
+    def import_rows(job, rows):
+        job.total_rows = len(rows)
+        for row in rows:
+            EmployeeImportService._clean_row(row, job.company)
+        EmployeeImportService._check_duplicates(rows)
+        EmployeeImportService._resolve_lookups(job, rows)
+        EmployeeImportService._check_managers(job, rows)
+
+        valid = [row for row in rows if row.ok]
+        job.error_rows = len(rows) - len(valid)
+        if job.dry_run or not valid:
+            return
+
+        EmployeeImportService._hash_passwords(valid)
+        with transaction.atomic():
+            job.users_created = EmployeeImportService._create_users(valid)
+            EmployeeImportService._create_employees(job, valid)
+        job.imported_rows = len(valid)
+        stats.record_event(job.company_id)
+
+        log_activity(
+            user=job.created_by,
+            action_type='CREATE',
+            module='EMPLOYEE',
+            description=f"Imported {len(valid)} employees from '{job.original_filename or job.file.name}'",
+            reference_id=str(job.id)
+        )
+
+    # ---------- validation ----------
+
+    @staticmethod
+    def _clean_row(row, company):
+        data = row.data
+        if not data.get('date_of_joining'):
+            data['date_of_joining'] = timezone.now().date()
+
+        for name in MODEL_FIELDS:
+            field = Employee._meta.get_field(name)
+            value = data.get(name, '')
+            if value == '' and field.has_default():
+                data[name] = field.get_default()
+                continue
+            if value == '' and field.blank:
+                data[name] = None if field.null or name in DATE_FIELDS else ''
+                continue
+            try:
+                if name in DATE_FIELDS:
+                    value = _parse_date(value)
+                elif field.choices:
+                    value = _choice(field, value)
+                data[name] = field.clean(value, None)
+            except ValidationError as e:
+                row.errors.append(f"{name}: {' '.join(e.messages)}")
+
+        if data.get('email'):
+            data['email'] = data['email'].lower()
+
+        username = data.get('username', '')
+        if username:
+            try:
+                User._meta.get_field('username').clean(username, None)
+            except ValidationError as e:
+                row.errors.append(f"username: {' '.join(e.messages)}")
+        elif data.get('password'):
+            row.errors.append("password: a username is required to create a login")
+
+        if data.get('password'):
+            try:
+                validate_password_complexity(data['password'], company)
+            except serializers.ValidationError as e:
+                row.errors.append(f"password: {' '.join(str(message) for message in e.detail)}")
+
+    @staticmethod
+    def _check_duplicates(rows):
+        checks = (
+            ('employee_id', Employee, 'employee_id', "Employee ID '{}' already exists"),
+            ('email', Employee, 'email', "Email '{}' is already used by another employee"),
+            ('username', User, 'username', "Username '{}' already exists"),
+        )
+        for column, model, field, message in checks:
+            by_value = {}
+            for row in rows:
+                value = row.data.get(column)
+                if value:
+                    by_value.setdefault(str(value).lower(), []).append(row)
+
+            for value, same in by_value.items():
+                if len(same) > 1:
+                    for row in same:
+                        row.errors.append(f"Duplicate {column} '{value}' in file (rows {', '.join(str(r.number) for r in same)})")
+
+            originals = {row.data[column] for group in by_value.values() for row in group}
+            for chunk in _chunks(originals):
+                for existing in model.objects.filter(**{f'{field}__in': chunk}).values_list(field, flat=True):
+                    for row in by_value.get(existing.lower(), ()):
+                        row.errors.append(message.format(existing))
+
+    @staticmethod
+    def _resolve_lookups(job, rows):
+        from apps.hrms.models import OnboardingTemplate
+
+        def index(queryset, *keys):
+            lookup = {}
+            for values in queryset.values_list('id', *keys):
+                for key in values[1:]:
+                    if key:
+                        lookup.setdefault(str(key).lower(), values[0])
+            return lookup
+
+        departments = index(Department.objects.filter(company_id=job.company_id), 'name', 'code')
+        designations = index(Designation.objects.filter(company_id=job.company_id), 'name', 'code')
+        templates = index(OnboardingTemplate.objects.filter(company_id=job.company_id, is_active=True), 'name')
+
+        for row in rows:
+            data = row.data
+            for column, lookup in (('department', departments), ('designation', designations)):
+                value = data.get(column)
+                data[f'{column}_id'] = lookup.get(value.lower()) if value else None
+                if value and data[f'{column}_id'] is None:
+                    row.errors.append(f"{column}: '{value}' not found")
+
+            template = data.get('onboarding_template')
+            row.template_id = templates.get(template.lower()) if template else job.onboarding_template_id
+            if template and row.template_id is None:
+                row.errors.append(f"onboarding_template: '{template}' not found")
+
+    @staticmethod
+    def _check_managers(job, rows):
+        in_file = {str(row.data['employee_id']).lower(): row for row in rows if row.data.get('employee_id')}
+        wanted = {
+            row.data['reporting_manager'] for row in rows
+            if row.data.get('reporting_manager') and str(row.data['reporting_manager']).lower() not in in_file
+        }
+        existing = {}
+        for chunk in _chunks(wanted):
+            managers = Employee.objects.filter(company_id=job.company_id, employee_id__in=chunk)
+            for employee_id, pk in managers.values_list('employee_id', 'id'):
+                existing[employee_id.lower()] = pk
+
+        for row in rows:
+            manager = row.data.get('reporting_manager')
+            row.data['reporting_manager_id'] = None
+            if not manager:
+                continue
+            key = str(manager).lower()
+            if key in in_file:
+                row.manager_row = in_file[key]
+                if row.manager_row is row:
+                    row.errors.append("reporting_manager: an employee cannot report to themselves")
+            elif key in existing:
+                row.data['reporting_manager_id'] = existing[key]
+            else:
+                row.errors.append(f"reporting_manager: employee '{manager}' not found")
+
+        # Reports of a failed or cyclic manager row cannot be created either
+        changed = True
+        while changed:
+            changed = False
+            for row in rows:
+                if row.ok and row.manager_row is not None and not row.manager_row.ok:
+                    row.errors.append(f"reporting_manager: row {row.manager_row.number} was not imported")
+                    changed = True
+
+        for row in rows:
+            seen, current = set(), row
+            while row.ok and current is not None:
+                if current in seen:
+                    row.errors.append("reporting_manager: reporting cycle in file")
+                    break
+                seen.add(current)
+                current = current.manager_row
+
+    # ---------- writes ----------
+
+    @staticmethod
+    def _hash_passwords(rows):
+        logins = [row for row in rows if row.data.get('username')]
+        workers = getattr(settings, 'EMPLOYEE_IMPORT_HASH_WORKERS', None) or os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Rows without a password get an unusable one; they set it via activation
+            hashes = pool.map(make_password, [row.data.get('password') or None for row in logins])
+            for row, password_hash in zip(logins, hashes):
+                row.data['password_hash'] = password_hash
+
+    @staticmethod
+    def _create_users(rows):
+        logins = [row for row in rows if row.data.get('username')]
+        for chunk in _chunks(logins):
+            User.objects.bulk_create([
+                User(
+                    username=row.data['username'], email=row.data['email'], password=row.data['password_hash'],
+                    first_name=row.data['first_name'][:150], last_name=(row.data['last_name'] or '')[:150],
+                )
+                for row in chunk
+            ])
+            # MySQL does not return ids from bulk inserts
+            ids = dict(User.objects.filter(username__in=[row.data['username'] for row in chunk]).values_list('username', 'id'))
+            for row in chunk:
+                row.user = ids[row.data['username']]
+        return len(logins)
+
+    @staticmethod
+    def _create_employees(job, rows):
+        from apps.hrms.models import EmployeeOnboardingStep, OnboardingStep
+
+        fields = [name for name in MODEL_FIELDS if name not in ('employee_id',)]
+        for row in rows:
+            row.employee = Employee(
+                company_id=job.company_id,
+                user_id=row.user,
+                employee_id=row.data['employee_id'],
+                department_id=row.data['department_id'],
+                designation_id=row.data['designation_id'],
+                reporting_manager_id=row.data['reporting_manager_id'],
+                onboarding_template_id=row.template_id,
+                onboarding_status='pending',
+                status='active',
+                created_by=job.created_by,
+                **{name: row.data[name] for name in fields if row.data.get(name) is not None},
+            )
+        for row in rows:
+            if row.manager_row is not None:
+                row.employee.reporting_manager_id = row.manager_row.employee.pk
+
+        # Managers before their reports: the self-referencing FK is checked per row
+        def depth(row):
+            levels = 0
+            while row.manager_row is not None:
+                levels, row = levels + 1, row.manager_row
+            return levels
+
+        employees = [row.employee for row in sorted(rows, key=depth)]
+        for chunk in _chunks(employees):
+            Employee.objects.bulk_create(chunk)
+
+        hierarchy.insert_nodes(Employee, employees)
+        for chunk in _chunks(employees):
+            search.index_employees(Employee.objects.filter(pk__in=[employee.pk for employee in chunk]))
+
+        steps = {}
+        for template_id, step_id in OnboardingStep.objects.filter(
+            template_id__in={row.template_id for row in rows if row.template_id}
+        ).order_by('step_order').values_list('template_id', 'id'):
+            steps.setdefault(template_id, []).append(step_id)
+        onboarding = [
+            EmployeeOnboardingStep(employee_id=row.employee.pk, template_step_id=step_id)
+            for row in rows
+            for step_id in steps.get(row.template_id, ())
+        ]
+        EmployeeOnboardingStep.objects.bulk_create(onboarding, batch_size=IMPORT_CHUNK_SIZE)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from apps.accounts.hierarchy import rebuild_all
+
+class Command(BaseCommand):
+    help = 'Rebuild the organization, department and reporting closure tables'
+
+    def handle(self, *args, **kwargs):
+        for model_name, rows in rebuild_all().items():
+            self.stdout.write(f"{model_name}: {rows} closure rows")
+
+        self.stdout.write(self.style.SUCCESS('Hierarchies rebuilt!'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from apps.accounts.models import Employee
+from apps.accounts.search import index_employees
+
+class Command(BaseCommand):
+    help = 'Rebuild the employee directory search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Only re-index employees of this company id')
+
+    def handle(self, *args, **options):
+        queryset = Employee.objects.all()
+        if options.get('company'):
+            queryset = queryset.filter(company_id=options['company'])
+
+        count = index_employees(queryset)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} employees'))
@@ -0,0 +1,33 @@
+"""
+Refreshes stale dashboard statistics snapshots.
+Usage: python manage.py refresh_stats_snapshots [--all] [--loop --interval 60]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.accounts.stats import refresh_stale
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the statistics snapshots that have changes recorded or are past their max age'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Refresh every snapshot, stale or not')
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, checking for stale snapshots every --interval seconds'
+        )
+        parser.add_argument('--interval', type=float, default=60.0, help='Polling interval in seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            result = refresh_stale(force=options['all'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{result['organizations']} organization snapshots refreshed"
+                f"{', global refreshed' if result['global'] else ''}"
+            ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,47 @@
+"""
+Runs queued bulk employee onboarding imports.
+Usage: python manage.py run_employee_imports [--loop --interval 10]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.accounts.importer import EmployeeImportService
+from apps.accounts.models import EmployeeImportJob
+
+
+class Command(BaseCommand):
+    help = 'Imports queued employee onboarding CSV/XLSX files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, polling for new jobs every --interval seconds'
+        )
+        parser.add_argument('--interval', type=float, default=10.0, help='Polling interval in seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            ran = self.run_pending()
+            if not options['loop']:
+                break
+            if not ran:
+                time.sleep(options['interval'])
+
+    def run_pending(self):
+        ran = 0
+        for job_id in list(EmployeeImportJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True)):
+            # Claim the job so concurrent workers skip it
+            if not EmployeeImportJob.objects.filter(pk=job_id, status='pending').update(status='processing'):
+                continue
+            job = EmployeeImportJob.objects.select_related('company', 'created_by').get(pk=job_id)
+            EmployeeImportService.run(job)
+            ran += 1
+            style = self.style.SUCCESS if job.status == 'completed' else self.style.ERROR
+            mode = ' (dry run)' if job.dry_run else ''
+            self.stdout.write(style(
+                f'{job.original_filename}{mode}: {job.status} - {job.imported_rows} imported, '
+                f'{job.users_created} logins, {job.error_rows} errors'
+            ))
+        return ran
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.27 on 2026-10-19 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0018_employee_onboarding_status_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="employee",
+            index=models.Index(
+                fields=["company", "status", "first_name"],
+                name="accounts_em_company_efe6dc_idx",
+            ),
+        ),
+    ]
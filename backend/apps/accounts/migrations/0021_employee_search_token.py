@@ -0,0 +1,78 @@
+# Generated by Django 4.2.27 on 2026-10-19 02:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from apps.accounts.search import index_employees
+
+
+def build_search_index(apps, schema_editor):
+    Employee = apps.get_model("accounts", "Employee")
+    EmployeeSearchToken = apps.get_model("accounts", "EmployeeSearchToken")
+    index_employees(Employee.objects.all(), token_model=EmployeeSearchToken)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0020_hierarchy_closure"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmployeeSearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=64)),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[
+                            ("name", "Name"),
+                            ("employee_id", "Employee ID"),
+                            ("email", "Email"),
+                            ("phone", "Phone"),
+                            ("department", "Department"),
+                            ("designation", "Designation"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("weight", models.PositiveSmallIntegerField(default=1)),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="accounts.organization",
+                    ),
+                ),
+                (
+                    "employee",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_tokens",
+                        to="accounts.employee",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["company", "term"],
+                        name="accounts_em_company_9815f6_idx",
+                    )
+                ],
+                "unique_together": {("employee", "term", "source")},
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
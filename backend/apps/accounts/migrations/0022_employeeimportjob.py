@@ -0,0 +1,106 @@
+# Generated by Django 4.2.27 on 2026-10-19 02:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hrms", "0005_employeeonboardingstep"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("accounts", "0021_employee_search_token"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmployeeImportJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("file", models.FileField(upload_to="employees/imports/")),
+                ("original_filename", models.CharField(blank=True, max_length=255)),
+                (
+                    "dry_run",
+                    models.BooleanField(
+                        default=False, help_text="Validate only, create nothing"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("processing", "Processing"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        db_index=True,
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("total_rows", models.PositiveIntegerField(default=0)),
+                ("imported_rows", models.PositiveIntegerField(default=0)),
+                ("error_rows", models.PositiveIntegerField(default=0)),
+                ("users_created", models.PositiveIntegerField(default=0)),
+                (
+                    "error_report",
+                    models.FileField(
+                        blank=True, null=True, upload_to="employees/imports/errors/"
+                    ),
+                ),
+                ("last_error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="employee_import_jobs",
+                        to="accounts.organization",
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="employee_import_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "onboarding_template",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Template for rows without an onboarding_template column",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="hrms.onboardingtemplate",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["company", "status"],
+                        name="accounts_em_company_34e0e9_idx",
+                    )
+                ],
+            },
+        ),
+    ]
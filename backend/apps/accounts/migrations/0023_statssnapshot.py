@@ -0,0 +1,42 @@
+# Generated by Django 4.2.27 on 2026-10-19 02:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0022_employeeimportjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatsSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=64, unique=True)),
+                ("metrics", models.JSONField(default=dict)),
+                ("computed_at", models.DateTimeField(db_index=True)),
+                ("events_seen", models.PositiveBigIntegerField(default=0)),
+                (
+                    "organization",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stats_snapshot",
+                        to="accounts.organization",
+                    ),
+                ),
+            ],
+        ),
+    ]
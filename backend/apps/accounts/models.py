@@ -91,19 +91,28 @@ class Organization(BaseModel):
 
     def __str__(self):
         return self.name
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Parent as loaded, so the closure table is only touched on a move
+        instance._loaded_parent_id = instance.__dict__.get('parent_id')
+        return instance
     
     def get_all_subsidiaries(self):
-        """Get all subsidiaries recursively"""
-        subs = list(self.subsidiaries.filter(is_active=True))
-        for sub in list(subs):
-            subs.extend(sub.get_all_subsidiaries())
-        return subs
+        """Get all active subsidiaries at any depth (closure table, one query)"""
+        from .hierarchy import active_descendants
+        return list(active_descendants(self, is_active=True))
     
     def get_root_parent(self):
         """Get the root/main parent organization"""
-        if self.parent:
-            return self.parent.get_root_parent()
-        return self
+        from .hierarchy import root
+        # Walk up if the closure rows are missing (created outside the ORM)
+        return root(self) or self.parent.get_root_parent()
+
+    def is_subsidiary_of(self, organization):
+        from .hierarchy import is_descendant
+        return is_descendant(Organization, self.pk, organization.pk)
     
     def get_active_employees_count(self):
         return self.employees.filter(status='active').count()
@@ -164,12 +173,21 @@ class Department(BaseModel):
     def __str__(self):
         return f"{self.name} ({self.company.name})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_parent_id = instance.__dict__.get('parent_id')
+        return instance
+
     def get_all_children(self):
-        """Get all child departments recursively"""
-        children = list(self.children.all())
-        for child in list(children):
-            children.extend(child.get_all_children())
-        return children
+        """Get all child departments at any depth (closure table, one query)"""
+        from .hierarchy import descendants
+        return list(descendants(self))
+
+    def is_within(self, department):
+        """Whether this department is ``department`` or sits below it"""
+        from .hierarchy import is_descendant
+        return is_descendant(Department, self.pk, department.pk, include_self=True)
 
     def get_employee_count(self):
         return self.employees.filter(status='active').count()
@@ -415,6 +433,7 @@ class Employee(BaseModel):
     class Meta:
         indexes = [
             models.Index(fields=['company', 'status']),
+            models.Index(fields=['company', 'status', 'first_name']),
             models.Index(fields=['department', 'status']),
             models.Index(fields=['designation']),
             models.Index(fields=['reporting_manager']),
@@ -461,16 +480,165 @@ class Employee(BaseModel):
     def __str__(self):
         return f"{self.employee_id} - {self.full_name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_parent_id = instance.__dict__.get('reporting_manager_id')
+        return instance
+
     def get_subordinates_count(self):
         """Get count of direct reports"""
         return self.subordinates.filter(status='active').count()
 
     def get_all_subordinates(self):
-        """Get all subordinates recursively"""
-        subordinates = list(self.subordinates.filter(status='active'))
-        for subordinate in list(subordinates):
-            subordinates.extend(subordinate.get_all_subordinates())
-        return subordinates
+        """Get all active subordinates down the reporting line (closure table, one query)"""
+        from .hierarchy import active_descendants
+        return list(active_descendants(self, status='active'))
+
+    def reports_to(self, manager):
+        """Whether ``manager`` is above this employee, directly or indirectly"""
+        from .hierarchy import is_descendant
+        return is_descendant(Employee, self.pk, manager.pk)
+
+
+# ==================== HIERARCHY CLOSURE TABLES ====================
+
+class HierarchyClosure(models.Model):
+    """One row per (ancestor, descendant) pair, maintained by hierarchy.py"""
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        abstract = True
+
+
+class OrganizationClosure(HierarchyClosure):
+    ancestor = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='ancestor_links')
+
+    class Meta:
+        unique_together = ['ancestor', 'descendant']
+        indexes = [
+            models.Index(fields=['descendant', 'depth']),
+        ]
+
+
+class DepartmentClosure(HierarchyClosure):
+    ancestor = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='ancestor_links')
+
+    class Meta:
+        unique_together = ['ancestor', 'descendant']
+        indexes = [
+            models.Index(fields=['descendant', 'depth']),
+        ]
+
+
+class ReportingClosure(HierarchyClosure):
+    """Reporting lines: ancestor is a (possibly indirect) manager of descendant"""
+    ancestor = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='ancestor_links')
+
+    class Meta:
+        unique_together = ['ancestor', 'descendant']
+        indexes = [
+            models.Index(fields=['descendant', 'depth']),
+        ]
+
+
+# ==================== EMPLOYEE SEARCH INDEX ====================
+
+class EmployeeSearchToken(models.Model):
+    """Normalised search term of an employee, maintained by search.py"""
+    SOURCE_CHOICES = (
+        ('name', 'Name'),
+        ('employee_id', 'Employee ID'),
+        ('email', 'Email'),
+        ('phone', 'Phone'),
+        ('department', 'Department'),
+        ('designation', 'Designation'),
+    )
+
+    company = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='+')
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='search_tokens')
+    term = models.CharField(max_length=64)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        unique_together = ['employee', 'term', 'source']
+        indexes = [
+            models.Index(fields=['company', 'term']),
+        ]
+
+    def __str__(self):
+        return f"{self.term} ({self.source})"
+
+
+# ==================== EMPLOYEE IMPORT JOB ====================
+
+class EmployeeImportJob(models.Model):
+    """Bulk onboarding file (CSV/XLSX) queued for import, see importer.py"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='employee_import_jobs')
+    file = models.FileField(upload_to='employees/imports/')
+    original_filename = models.CharField(max_length=255, blank=True)
+    onboarding_template = models.ForeignKey(
+        'hrms.OnboardingTemplate',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text="Template for rows without an onboarding_template column"
+    )
+    dry_run = models.BooleanField(default=False, help_text="Validate only, create nothing")
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    total_rows = models.PositiveIntegerField(default=0)
+    imported_rows = models.PositiveIntegerField(default=0)
+    error_rows = models.PositiveIntegerField(default=0)
+    users_created = models.PositiveIntegerField(default=0)
+
+    # CSV of (row, employee_id, email, error) for rows that were not imported
+    error_report = models.FileField(upload_to='employees/imports/errors/', null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='employee_import_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['company', 'status']),
+        ]
+
+    def __str__(self):
+        return f"Import {self.original_filename or self.file.name} ({self.status})"
+
+
+# ==================== STATISTICS SNAPSHOT ====================
+
+class StatsSnapshot(models.Model):
+    """Precomputed dashboard metrics of one organization, or of the platform (organization empty); see stats.py"""
+    key = models.CharField(max_length=64, unique=True)
+    organization = models.OneToOneField(
+        Organization, on_delete=models.CASCADE, null=True, blank=True, related_name='stats_snapshot'
+    )
+    metrics = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(db_index=True)
+    # Value of the key's event counter (stats.record_event) when computed
+    events_seen = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Stats {self.key} @ {self.computed_at}"
 
 
 # ==================== EMPLOYEE DOCUMENT MODEL ====================
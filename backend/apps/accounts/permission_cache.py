@@ -0,0 +1,144 @@
+"""
+Compiled effective permissions.
+
+Everything PermissionChecker needs to answer a check for one user is
+compiled into a small dict and kept in the shared cache:
+
+    {
+        'basic': True,                     # active employee -> basic rights
+        'admin': False,                    # superuser, org creator or is_admin
+        'permissions': {                   # code -> granted scopes, widest first
+            'leave.approve': ['department', 'team'],
+        },
+    }
+
+Entries are keyed by a global version (roles and their permissions) and a
+per-user version (employee record, role and permission assignments). The
+signals in signals.py rotate a version whenever one of those rows changes,
+so a warm check is a dict lookup without touching the database.
+
+Rotations only reach other workers through a shared cache (REDIS_URL). With
+a per-process backend the versions expire after LOCAL_VERSION_TIMEOUT so
+every worker recompiles at least that often.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+GLOBAL_VERSION_KEY = 'accounts:perms:version'
+USER_VERSION_KEY = 'accounts:perms:version:{user_id}'
+COMPILED_KEY = 'accounts:perms:{user_id}:{global_version}:{user_version}'
+CACHE_TIMEOUT = 60 * 60
+# A per-process cache never sees another worker's rotation; expiring its
+# versions bounds how long a revoked permission stays in effect there
+LOCAL_VERSION_TIMEOUT = 60
+
+SCOPE_LEVELS = {
+    'self': 1,
+    'team': 2,
+    'department': 3,
+    'branch': 4,
+    'company': 5,
+    'organization': 6,
+    'global': 7
+}
+
+EMPTY = {'basic': False, 'admin': False, 'permissions': {}}
+
+# Backends whose contents are private to one process
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache(alias='default'):
+    """Whether every worker reads and writes the same ``alias`` cache."""
+    return settings.CACHES.get(alias, {}).get('BACKEND') not in PER_PROCESS_CACHES
+
+
+def _version_timeout():
+    return None if is_shared_cache() else LOCAL_VERSION_TIMEOUT
+
+
+def _versions(user_id):
+    keys = [GLOBAL_VERSION_KEY, USER_VERSION_KEY.format(user_id=user_id)]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(key, version, _version_timeout()):
+                version = cache.get(key, version)
+        versions.append(version)
+    return versions
+
+
+def user_version(user_id):
+    """Current per-user version; embedded in access tokens (see tenant.py)."""
+    return _versions(user_id)[1]
+
+
+def compile_permissions(user):
+    """Build the compiled structure for ``user`` from the database."""
+    from .models import Employee, Organization, RolePermission
+
+    # By id, so a claims-backed user is not loaded
+    employee = Employee.objects.filter(user_id=user.pk).values('status', 'is_admin', 'designation_id').first()
+    admin = bool(
+        user.is_superuser
+        or Organization.objects.filter(created_by_id=user.pk).exists()
+        or (employee and employee['is_admin'])
+    )
+
+    permissions = {}
+    if employee and employee['designation_id']:
+        rows = RolePermission.objects.filter(
+            role__designations=employee['designation_id'],
+            role__is_active=True,
+            permission__is_active=True
+        ).values_list('permission__code', 'scope__code')
+        for code, scope in rows:
+            scopes = permissions.setdefault(code, [])
+            if scope not in scopes:
+                scopes.append(scope)
+        for scopes in permissions.values():
+            scopes.sort(key=lambda scope: SCOPE_LEVELS.get(scope, 0), reverse=True)
+
+    return {
+        'basic': bool(employee and employee['status'] == 'active'),
+        'admin': admin,
+        'permissions': permissions,
+    }
+
+
+def get_effective_permissions(user):
+    if not user or not user.is_authenticated:
+        return EMPTY
+    global_version, user_version = _versions(user.pk)
+    key = COMPILED_KEY.format(user_id=user.pk, global_version=global_version, user_version=user_version)
+    compiled = cache.get(key)
+    if compiled is None:
+        compiled = compile_permissions(user)
+        cache.set(key, compiled, CACHE_TIMEOUT)
+    return compiled
+
+
+def _rotate(key):
+    timeout = _version_timeout()
+    cache.set(key, uuid.uuid4().hex, timeout)
+    # Again after commit, in case another request compiled the old rows
+    # between the write and the commit
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, timeout))
+
+
+def invalidate_user(user_id):
+    if user_id:
+        _rotate(USER_VERSION_KEY.format(user_id=user_id))
+
+
+def invalidate_all():
+    _rotate(GLOBAL_VERSION_KEY)
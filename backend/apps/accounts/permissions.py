@@ -1,12 +1,18 @@
 from django.core.exceptions import PermissionDenied
 from django.utils import timezone
 from django.db import models
+from django.db.models import Q
 from functools import wraps
 from rest_framework.response import Response
 from rest_framework import status as http_status
 import logging
 import traceback
 
+from .audit_sink import audit_sink
+from .hierarchy import same_root, same_tree_ids
+from .permission_cache import SCOPE_LEVELS, get_effective_permissions
+from .tenant import get_tenant
+
 logger = logging.getLogger(__name__)
 
 def _get_models():
@@ -65,11 +71,8 @@ def has_basic_right(user, action):
         return False
     
     try:
-        models = _get_models()
-        Employee = models['Employee']
-        # Check for any active employee record for this user
-        employee = Employee.objects.filter(user=user, status='active').first()
-        if employee:
+        # Any active employee record for this user
+        if get_effective_permissions(user)['basic']:
             logger.debug(f"✓ Basic right '{action}' granted to {user.email}")
             return True
         return False
@@ -104,19 +107,8 @@ def is_client_admin(user):
         if user.is_superuser:
             return True
             
-        # Check if org creator
-        if is_org_creator(user):
-            return True
-        
-        # Check employee is_admin flag
-        models = _get_models()
-        Employee = models['Employee']
-        
-        try:
-            employee = Employee.objects.get(user=user)
-            return employee.is_admin
-        except Employee.DoesNotExist:
-            return False
+        # Org creator or employee is_admin flag, resolved once per request
+        return get_tenant(user).is_admin
             
     except Exception as e:
         logger.error(f"[is_client_admin] ERROR: {str(e)}")
@@ -147,6 +139,14 @@ class PermissionChecker:
         self.log = log
         self._cache = {}
         self._models = _get_models()
+        self._compiled = None
+        self._employee = None
+
+    @property
+    def compiled(self):
+        if self._compiled is None:
+            self._compiled = get_effective_permissions(self.user)
+        return self._compiled
         
     def has_permission(self, permission_code, scope_required='self', obj=None, **kwargs):
         """
@@ -160,12 +160,12 @@ class PermissionChecker:
         logger.debug(f"[PermissionChecker] Checking '{permission_code}' for {self.user.email}")
         
         # 1. Check if it's a basic employee right
-        if has_basic_right(self.user, permission_code):
+        if permission_code in EMPLOYEE_BASIC_RIGHTS and self.compiled['basic']:
             logger.debug(f"✓ Basic right granted")
             return True
         
         # 2. Check if user is admin (admins have ALL permissions)
-        if is_client_admin(self.user):
+        if self.user.is_superuser or self.compiled['admin']:
             logger.debug(f"✓ Admin access - all permissions granted")
             return True
         
@@ -184,59 +184,32 @@ class PermissionChecker:
         return result
     
     def _check_role_permissions(self, permission_code, scope_required, obj):
-        """Check permission through user roles"""
-        Permission = self._models['Permission']
-        RolePermission = self._models['RolePermission']
-        Employee = self._models['Employee']
-        
-        try:
-            permission = Permission.objects.get(code=permission_code, is_active=True)
-        except Permission.DoesNotExist:
-            logger.warning(f"Permission '{permission_code}' not found")
-            return False
-        
-        # Get user's employee record
-        try:
-            employee = Employee.objects.select_related('designation').get(user=self.user)
-        except Employee.DoesNotExist:
-            logger.warning(f"No employee record for {self.user.email}")
-            return False
-        
-        # Check designation-based permissions
-        if employee.designation:
-            # Get roles mapped to designation
-            roles = employee.designation.roles.filter(is_active=True)
-            
-            for role in roles:
-                role_perm = RolePermission.objects.filter(
-                    role=role,
-                    permission=permission
-                ).select_related('scope').first()
-                
-                if role_perm:
-                    if self._has_sufficient_scope(role_perm.scope.code, scope_required):
-                        if obj and not self._check_object_scope(obj, role_perm.scope.code, employee):
-                            continue
-                        logger.debug(f"✓ Permission granted via role: {role.name}")
-                        return True
+        """Check permission through the designation's roles (compiled)"""
+        # Scopes granted by the roles, widest first
+        for scope in self.compiled['permissions'].get(permission_code, ()):
+            if not self._has_sufficient_scope(scope, scope_required):
+                break
+            if obj is not None:
+                employee = self._get_employee()
+                if employee is None or not self._check_object_scope(obj, scope, employee):
+                    continue
+            logger.debug(f"✓ Permission granted via role scope: {scope}")
+            return True
         
         logger.debug(f"✗ Permission denied - no matching role")
         return False
+
+    def _get_employee(self):
+        """User's employee record, only needed for object-level checks"""
+        if self._employee is None:
+            Employee = self._models['Employee']
+            self._employee = Employee.objects.select_related('company', 'department').filter(user=self.user).first()
+        return self._employee
     
     def _has_sufficient_scope(self, granted_scope, required_scope):
         """Check if granted scope meets required scope"""
-        scope_hierarchy = {
-            'self': 1,
-            'team': 2,
-            'department': 3,
-            'branch': 4,
-            'company': 5,
-            'organization': 6,
-            'global': 7
-        }
-        
-        granted_level = scope_hierarchy.get(granted_scope, 0)
-        required_level = scope_hierarchy.get(required_scope, 0)
+        granted_level = SCOPE_LEVELS.get(granted_scope, 0)
+        required_level = SCOPE_LEVELS.get(required_scope, 0)
         
         return granted_level >= required_level
     
@@ -262,28 +235,60 @@ class PermissionChecker:
         
         elif scope == 'organization':
             if hasattr(obj, 'company'):
-                root_org = employee.company.get_root_parent()
-                obj_org = obj.company.get_root_parent()
-                return obj_org == root_org
+                return same_root(self._models['Organization'], obj.company_id, employee.company_id)
             return False
         
         # branch and global always allowed
         return True
+
+    def _scope_q(self, scope, employee, employee_field):
+        """SQL equivalent of _check_object_scope for rows reached via ``employee_field``"""
+        def lookup(name):
+            return f"{employee_field}__{name}" if employee_field else name
+
+        if scope == 'self':
+            return Q(**{employee_field or 'pk': employee.pk})
+        elif scope == 'team':
+            return Q(**{lookup('reporting_manager'): employee.pk})
+        elif scope == 'department':
+            return Q(**{lookup('department'): employee.department_id})
+        elif scope == 'company':
+            return Q(**{lookup('company'): employee.company_id})
+        elif scope == 'organization':
+            companies = same_tree_ids(self._models['Organization'], employee.company_id)
+            return Q(**{lookup('company__in'): companies})
+        return Q()
+
+    def filter_queryset(self, queryset, permission_code, employee_field=None):
+        """
+        Restrict ``queryset`` to the rows the user may see under
+        ``permission_code``, as one WHERE clause instead of an object check
+        per row. ``employee_field`` is the path from the model to Employee
+        (e.g. 'employee' for leave requests); None for Employee querysets.
+        """
+        if self.user.is_superuser or self.compiled['admin']:
+            return queryset
+
+        scopes = list(self.compiled['permissions'].get(permission_code, ()))
+        if permission_code in EMPLOYEE_BASIC_RIGHTS and self.compiled['basic']:
+            scopes.append('self')
+        employee = self._get_employee() if scopes else None
+        if employee is None:
+            return queryset.none()
+
+        condition = Q()
+        for scope in scopes:
+            scope_q = self._scope_q(scope, employee, employee_field)
+            if not scope_q:
+                # branch and global
+                return queryset
+            condition |= scope_q
+        return queryset.filter(condition)
     
     def _log_permission_check(self, permission_code, result, scope):
-        """Log permission check for audit"""
+        """Log permission check for audit (buffered, see audit_sink)"""
         try:
-            PermissionAuditLog = self._models['PermissionAuditLog']
-            Permission = self._models['Permission']
-            
-            permission = Permission.objects.get(code=permission_code)
-            PermissionAuditLog.objects.create(
-                user=self.user,
-                action='check',
-                permission=permission,
-                result=result,
-                scope_used=scope
-            )
+            audit_sink.record(self.user.pk, permission_code, result, scope)
         except:
             pass
     
@@ -0,0 +1,290 @@
+"""
+Employee directory search index.
+
+Each employee is broken into normalised tokens (lower-cased, accents and
+punctuation stripped) stored in EmployeeSearchToken with the field they came
+from (``source``) and its weight:
+
+    names, employee id       weight 3
+    email local part, phone  weight 2
+    department, designation  weight 1
+
+Lookups run against the (company, term) index only, never the Employee
+table:
+
+- prefix: ``term LIKE 'q%'`` is an index range scan, so prefixes do not need
+  rows of their own;
+- typo tolerance: the company's distinct terms sharing the first two
+  characters are read from the same index and compared with an optimal
+  string alignment distance (1 edit from 4 characters, 2 from 8);
+- ranking: one grouped query scores each employee per query word
+  (exact 3x, prefix 2x, fuzzy 1x the field weight), keeps employees that
+  match every word and orders by the total.
+
+signals.py re-indexes an employee on save and the employees of a department
+or designation when it is renamed.
+"""
+import re
+import unicodedata
+
+from django.db.models import Case, F, IntegerField, Max, Q, Value, When
+
+MAX_TERM_LENGTH = 64
+PREFIX_LENGTH = 2
+DEFAULT_LIMIT = 20
+INDEX_BATCH_SIZE = 2000
+
+FIELD_WEIGHTS = {
+    'name': 3,
+    'employee_id': 3,
+    'email': 2,
+    'phone': 2,
+    'department': 1,
+    'designation': 1,
+}
+
+INDEXED_FIELDS = {
+    'first_name', 'middle_name', 'last_name', 'email', 'employee_id', 'phone',
+    'company', 'company_id', 'department', 'department_id', 'designation', 'designation_id'
+}
+
+_SPLIT = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', str(text or '')).encode('ascii', 'ignore').decode().lower()
+    return [token[:MAX_TERM_LENGTH] for token in _SPLIT.split(text) if token]
+
+
+def _email_terms(email):
+    local = (email or '').split('@')[0]
+    terms = normalize(local)
+    joined = ''.join(terms)
+    if len(terms) > 1 and joined:
+        terms.append(joined[:MAX_TERM_LENGTH])
+    return terms
+
+
+def _phone_terms(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    if not digits:
+        return []
+    # Full number with country code, and the national number people type
+    return list(dict.fromkeys([digits, digits[-10:]]))
+
+
+def _employee_id_terms(employee_id):
+    terms = normalize(employee_id)
+    joined = ''.join(terms)
+    if len(terms) > 1 and joined:
+        terms.append(joined[:MAX_TERM_LENGTH])
+    return terms
+
+
+def employee_terms(employee, department_name=None, designation_name=None):
+    """{(term, source)} for one employee."""
+    terms = set()
+    for name in (employee.first_name, employee.middle_name, employee.last_name):
+        terms.update((term, 'name') for term in normalize(name))
+    terms.update((term, 'email') for term in _email_terms(employee.email))
+    terms.update((term, 'employee_id') for term in _employee_id_terms(employee.employee_id))
+    terms.update((term, 'phone') for term in _phone_terms(employee.phone))
+    terms.update((term, 'department') for term in normalize(department_name))
+    terms.update((term, 'designation') for term in normalize(designation_name))
+    return terms
+
+
+def _token_rows(token_model, employee, terms):
+    return [
+        token_model(
+            company_id=employee.company_id, employee_id=employee.pk,
+            term=term, source=source, weight=FIELD_WEIGHTS[source]
+        )
+        for term, source in terms
+    ]
+
+
+def index_employee(employee):
+    """Re-index one employee; writes nothing if the terms did not change."""
+    from .models import Department, Designation, EmployeeSearchToken
+
+    department_name = designation_name = None
+    if employee.department_id:
+        department_name = Department.objects.filter(pk=employee.department_id).values_list('name', flat=True).first()
+    if employee.designation_id:
+        designation_name = Designation.objects.filter(pk=employee.designation_id).values_list('name', flat=True).first()
+    terms = employee_terms(employee, department_name, designation_name)
+
+    existing = EmployeeSearchToken.objects.filter(employee_id=employee.pk)
+    current = set(existing.values_list('term', 'source'))
+    stale_company = existing.exclude(company_id=employee.company_id).exists() if current else False
+    if current == terms and not stale_company:
+        return
+    existing.delete()
+    EmployeeSearchToken.objects.bulk_create(_token_rows(EmployeeSearchToken, employee, terms))
+
+
+def index_employees(queryset, token_model=None):
+    """
+    Rebuild the tokens of every employee in ``queryset`` in bulk.
+    ``token_model`` lets migrations pass their historical model.
+    """
+    if token_model is None:
+        from .models import EmployeeSearchToken as token_model
+
+    def _flush(employee_ids, rows):
+        token_model.objects.filter(employee_id__in=employee_ids).delete()
+        token_model.objects.bulk_create(rows, batch_size=2000)
+
+    count = 0
+    rows, employee_ids = [], []
+    employees = queryset.select_related('department', 'designation').only(
+        'id', 'company_id', 'first_name', 'middle_name', 'last_name', 'email', 'employee_id', 'phone',
+        'department__name', 'designation__name'
+    )
+    for employee in employees.iterator(chunk_size=INDEX_BATCH_SIZE):
+        employee_ids.append(employee.pk)
+        terms = employee_terms(
+            employee,
+            employee.department.name if employee.department_id else None,
+            employee.designation.name if employee.designation_id else None,
+        )
+        rows.extend(_token_rows(token_model, employee, terms))
+        if len(employee_ids) >= INDEX_BATCH_SIZE:
+            _flush(employee_ids, rows)
+            count += len(employee_ids)
+            rows, employee_ids = [], []
+    if employee_ids:
+        _flush(employee_ids, rows)
+        count += len(employee_ids)
+    return count
+
+
+def reindex_group(source, group_field, group):
+    """
+    Re-index the employees of a department or designation whose name no
+    longer matches their tokens (one query when nothing changed).
+    """
+    from .models import Employee, EmployeeSearchToken
+
+    indexed = set(
+        EmployeeSearchToken.objects.filter(source=source, **{f'employee__{group_field}': group})
+        .values_list('term', flat=True).distinct()
+    )
+    if indexed and indexed != set(normalize(group.name)):
+        index_employees(Employee.objects.filter(**{group_field: group}))
+
+
+# ==================== LOOKUP ====================
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance, giving up once it exceeds ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def _allowed_edits(word):
+    if len(word) >= 8:
+        return 2
+    if len(word) >= 4:
+        return 1
+    return 0
+
+
+def fuzzy_terms(tokens, word):
+    """Indexed terms within the allowed edits of ``word``, also as a prefix."""
+    edits = _allowed_edits(word)
+    if not edits:
+        return []
+    vocabulary = tokens.filter(term__startswith=word[:PREFIX_LENGTH]).values_list('term', flat=True).distinct()
+    matches = []
+    for term in vocabulary:
+        if term.startswith(word):
+            continue
+        # Compare against the term's own prefixes around the typed length
+        best = min(
+            edit_distance(word, term[:length], edits)
+            for length in range(max(len(word) - edits, 1), len(word) + edits + 1)
+        )
+        if best <= edits:
+            matches.append(term)
+    return matches
+
+
+def _token_queryset(company_id):
+    from .models import EmployeeSearchToken
+
+    tokens = EmployeeSearchToken.objects.all()
+    if company_id:
+        tokens = tokens.filter(company_id=company_id)
+    return tokens
+
+
+def ranked_matches(query, company_id=None):
+    """
+    Grouped queryset of {'employee_id', 'score'} for employees matching
+    every word of ``query``, best first. None when the query has no words.
+    """
+    words = list(dict.fromkeys(normalize(query)))[:5]
+    if not words:
+        return None
+
+    tokens = _token_queryset(company_id)
+    any_word = Q()
+    scores = {}
+    for i, word in enumerate(words):
+        fuzzy = fuzzy_terms(tokens, word)
+        matches = Q(term__startswith=word)
+        if fuzzy:
+            matches |= Q(term__in=fuzzy)
+        any_word |= matches
+        scores[f'score_{i}'] = Max(Case(
+            When(term=word, then=F('weight') * 3),
+            When(term__startswith=word, then=F('weight') * 2),
+            When(matches, then=F('weight')),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+
+    total = sum((F(name) for name in scores), Value(0))
+    return (
+        tokens.filter(any_word)
+        .values('employee_id')
+        .annotate(**scores)
+        .filter(**{f'{name}__gt': 0 for name in scores})
+        .annotate(score=total)
+        # Ties by employee code, not the random UUID pk
+        .order_by('-score', 'employee__employee_id', 'employee_id')
+    )
+
+
+def matching_employee_ids(query, company_id=None):
+    """Subquery of matching employee ids, for filtering an existing queryset."""
+    matches = ranked_matches(query, company_id)
+    return None if matches is None else matches.values('employee_id')
+
+
+def search_employees(query, company_id=None, limit=DEFAULT_LIMIT):
+    """[(employee, score)] best first."""
+    from .models import Employee
+
+    matches = ranked_matches(query, company_id)
+    if matches is None:
+        return []
+    ranked = [(row['employee_id'], row['score']) for row in matches[:limit]]
+    employees = Employee.objects.select_related('company', 'department', 'designation').in_bulk(
+        [employee_id for employee_id, _ in ranked]
+    )
+    return [(employees[employee_id], score) for employee_id, score in ranked if employee_id in employees]
@@ -1,17 +1,34 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import AccessToken
 from django.contrib.auth.models import User
+from django.db.models import Count, Exists, IntegerField, OuterRef, Prefetch, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 from .models import (
     Organization, Company, Department, Designation, Employee,
-    EmployeeDocument, EmployeeEducation, EmployeeExperience,
+    EmployeeDocument, EmployeeEducation, EmployeeExperience, EmployeeImportJob,
     InviteCode, NotificationPreference, Role, Module, Permission,
     DataScope, RolePermission, DesignationPermission, SecurityProfile, UserOTP
 )
 from apps.audit.utils import log_activity
+from . import stats
+from .tenant import add_tenant_claims
 from django.utils import timezone
 import random
 
 
+class TenantTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh that re-reads the tenant claims instead of copying stale ones."""
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        user = User.objects.filter(pk=access.get('user_id')).first()
+        if user is not None and 'tenant' in access:
+            add_tenant_claims(access, user)
+            data['access'] = str(access)
+        return data
+
+
 class SuperAdminTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
     Custom JWT Serializer for Super Admin Login (Username-based).
@@ -20,7 +37,7 @@ class SuperAdminTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
-        token['is_superuser'] = user.is_superuser
+        add_tenant_claims(token, user)
         return token
 
     def validate(self, attrs):
@@ -54,6 +71,12 @@ class SuperAdminTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     """Custom JWT Serializer to include user info and roles"""
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        add_tenant_claims(token, user)
+        return token
+
     def validate(self, attrs):
         try:
             return self._validate_impl(attrs)
@@ -176,6 +199,66 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+# ==================== LIST ANNOTATIONS ====================
+# Per-row counts for the list serializers below, computed in the list query.
+# Each serializer reads the annotated attribute and only falls back to a
+# query of its own for objects that did not come through these helpers.
+
+def _count(model, field, **filters):
+    """Correlated COUNT of ``model`` rows whose ``field`` is the outer row"""
+    rows = model.objects.filter(**{field: OuterRef('pk')}, **filters).order_by().values(field)
+    return Coalesce(Subquery(rows.annotate(total=Count('pk')).values('total')), Value(0), output_field=IntegerField())
+
+
+def with_organization_counts(queryset):
+    return queryset.annotate(
+        active_employee_count=_count(Employee, 'company', status='active'),
+        active_department_count=_count(Department, 'company', is_active=True),
+    )
+
+
+def with_department_counts(queryset):
+    return queryset.annotate(
+        active_employee_count=Count('employees', filter=Q(employees__status='active'))
+    )
+
+
+def with_department_children(queryset):
+    """Department counts plus active children, each with its own counts"""
+    children = with_department_counts(
+        Department.objects.filter(is_active=True).select_related('company', 'parent', 'head')
+    )
+    return with_department_counts(queryset).prefetch_related(
+        Prefetch('children', queryset=children, to_attr='active_children')
+    )
+
+
+def with_designation_counts(queryset):
+    return queryset.annotate(
+        active_employee_count=_count(Employee, 'designation', status='active'),
+        permission_count=_count(DesignationPermission, 'designation'),
+    )
+
+
+def with_designation_relations(queryset):
+    """Counts plus the roles and permissions DesignationListSerializer nests"""
+    permission_rows = ('permission', 'permission__module', 'scope')
+    return with_designation_counts(queryset).select_related('company').prefetch_related(
+        'roles',
+        Prefetch('roles__rolepermission_set', queryset=RolePermission.objects.select_related(*permission_rows)),
+        Prefetch('designationpermission_set', queryset=DesignationPermission.objects.select_related(*permission_rows)),
+    )
+
+
+def with_employee_counts(queryset):
+    return queryset.annotate(
+        active_subordinate_count=_count(Employee, 'reporting_manager', status='active'),
+        has_pin=Exists(
+            SecurityProfile.objects.filter(user_id=OuterRef('user_id'), pin_hash__isnull=False).exclude(pin_hash='')
+        ),
+    )
+
+
 # ==================== ORGANIZATION SERIALIZERS ====================
 
 class OrganizationListSerializer(serializers.ModelSerializer):
@@ -192,6 +275,8 @@ class OrganizationListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'slug', 'active_employees', 'created_at']
     
     def get_active_employees(self, obj):
+        if hasattr(obj, 'active_employee_count'):
+            return obj.active_employee_count
         return obj.get_active_employees_count()
 
 
@@ -227,10 +312,14 @@ class OrganizationDetailSerializer(serializers.ModelSerializer):
         ]
     
     def get_active_employees(self, obj):
-        return obj.get_active_employees_count()
+        if hasattr(obj, 'active_employee_count'):
+            return obj.active_employee_count
+        return stats.organization_metric(obj, 'active_employees')
     
     def get_total_departments(self, obj):
-        return obj.departments.filter(is_active=True).count()
+        if hasattr(obj, 'active_department_count'):
+            return obj.active_department_count
+        return stats.organization_metric(obj, 'total_departments')
     
     def get_enable_tax_management(self, obj):
         """Get enable_tax_management from settings JSONField, default to True"""
@@ -298,6 +387,8 @@ class DepartmentListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'company_name', 'parent_name', 'head_name', 'employee_count']
     
     def get_employee_count(self, obj):
+        if hasattr(obj, 'active_employee_count'):
+            return obj.active_employee_count
         return obj.get_employee_count()
 
 
@@ -325,18 +416,20 @@ class DepartmentDetailSerializer(serializers.ModelSerializer):
         ]
     
     def get_children(self, obj):
-        children = obj.children.filter(is_active=True)
+        if hasattr(obj, 'active_children'):
+            children = obj.active_children
+        else:
+            children = with_department_counts(obj.children.filter(is_active=True).select_related('company', 'parent', 'head'))
         return DepartmentListSerializer(children, many=True).data
     
     def get_employee_count(self, obj):
+        if hasattr(obj, 'active_employee_count'):
+            return obj.active_employee_count
         return obj.get_employee_count()
 
 
 # ==================== DESIGNATION SERIALIZERS ====================
 
-    def get_employee_count(self, obj):
-        return obj.employees.filter(status='active').count()
-
 
 class ModuleSerializer(serializers.ModelSerializer):
     class Meta:
@@ -405,9 +498,13 @@ class DesignationListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'company_name', 'employee_count']
     
     def get_employee_count(self, obj):
+        if hasattr(obj, 'active_employee_count'):
+            return obj.active_employee_count
         return obj.employees.filter(status='active').count()
     
     def get_permissions_count(self, obj):
+        if hasattr(obj, 'permission_count'):
+            return obj.permission_count
         return obj.designationpermission_set.count()
 
 
@@ -439,6 +536,8 @@ class DesignationDetailSerializer(serializers.ModelSerializer):
         ]
     
     def get_employee_count(self, obj):
+        if hasattr(obj, 'active_employee_count'):
+            return obj.active_employee_count
         return obj.employees.filter(status='active').count()
 
 
@@ -466,6 +565,8 @@ class EmployeeListSerializer(serializers.ModelSerializer):
         ]
 
     def get_has_security_pin(self, obj):
+        if hasattr(obj, 'has_pin'):
+            return obj.has_pin
         if obj.user and hasattr(obj.user, 'security_profile'):
             return bool(obj.user.security_profile.pin_hash)
         return False
@@ -519,9 +620,32 @@ class EmployeeDetailSerializer(serializers.ModelSerializer):
     onboarding_template_name = serializers.CharField(source='onboarding_template.name', read_only=True)
     
     def get_subordinates_count(self, obj):
+        if hasattr(obj, 'active_subordinate_count'):
+            return obj.active_subordinate_count
         return obj.get_subordinates_count()
 
 
+# ==================== EMPLOYEE IMPORT SERIALIZERS ====================
+
+class EmployeeImportJobSerializer(serializers.ModelSerializer):
+    """Bulk employee onboarding upload"""
+    onboarding_template_name = serializers.CharField(source='onboarding_template.name', read_only=True)
+
+    class Meta:
+        model = EmployeeImportJob
+        fields = '__all__'
+        read_only_fields = (
+            'company', 'original_filename', 'status', 'total_rows', 'imported_rows',
+            'error_rows', 'users_created', 'error_report', 'last_error', 'created_by',
+            'started_at', 'finished_at',
+        )
+
+    def validate_file(self, value):
+        if not value.name.lower().endswith(('.csv', '.xlsx', '.xlsm')):
+            raise serializers.ValidationError('Only CSV or XLSX files are supported.')
+        return value
+
+
 # ==================== EMPLOYEE DOCUMENT SERIALIZERS ====================
 
 class EmployeeDocumentSerializer(serializers.ModelSerializer):
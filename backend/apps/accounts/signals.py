@@ -0,0 +1,137 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import hierarchy, permission_cache, search, stats
+from .models import (
+    Company, Department, Designation, DesignationPermission, Employee, Organization,
+    Permission, Role, RolePermission, UserPermission, UserRole
+)
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=RolePermission)
+@receiver(post_delete, sender=RolePermission)
+@receiver(post_save, sender=DesignationPermission)
+@receiver(post_delete, sender=DesignationPermission)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def invalidate_all_permissions(sender, instance, **kwargs):
+    """A role or permission definition changed; it may be shared by anyone."""
+    permission_cache.invalidate_all()
+
+
+@receiver(m2m_changed, sender=Designation.roles.through)
+def invalidate_designation_roles(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        permission_cache.invalidate_all()
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+@receiver(post_save, sender=UserPermission)
+@receiver(post_delete, sender=UserPermission)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_user_permissions(sender, instance, **kwargs):
+    """Assignments, is_admin, designation or status of one user changed."""
+    permission_cache.invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def invalidate_org_creator_permissions(sender, instance, **kwargs):
+    permission_cache.invalidate_user(instance.created_by_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_flags(sender, instance, update_fields=None, **kwargs):
+    # is_superuser may have changed; login only touches last_login
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    permission_cache.invalidate_user(instance.pk)
+
+
+# ==================== HIERARCHY CLOSURE TABLES ====================
+
+def _parent_in_update(sender, update_fields):
+    if update_fields is None:
+        return True
+    parent_field = hierarchy.tree_for(sender)[1]
+    return parent_field in update_fields or f'{parent_field}_id' in update_fields
+
+
+@receiver(pre_save, sender=Organization)
+@receiver(pre_save, sender=Company)
+@receiver(pre_save, sender=Department)
+@receiver(pre_save, sender=Employee)
+def check_hierarchy_move(sender, instance, update_fields=None, **kwargs):
+    if not instance._state.adding and _parent_in_update(sender, update_fields) and hierarchy.parent_changed(instance):
+        hierarchy.check_move(instance)
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_save, sender=Company)
+@receiver(post_save, sender=Department)
+@receiver(post_save, sender=Employee)
+def update_hierarchy(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        hierarchy.insert_node(instance)
+    elif _parent_in_update(sender, update_fields) and hierarchy.parent_changed(instance):
+        hierarchy.move_node(instance)
+
+
+@receiver(pre_delete, sender=Department)
+@receiver(pre_delete, sender=Employee)
+def detach_hierarchy_subtree(sender, instance, **kwargs):
+    # Organizations cascade to their subsidiaries; these re-parent to NULL
+    hierarchy.detach_subtree(instance)
+
+
+# ==================== EMPLOYEE SEARCH INDEX ====================
+
+@receiver(post_save, sender=Employee)
+def index_employee_search_tokens(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields and not set(update_fields) & search.INDEXED_FIELDS):
+        return
+    search.index_employee(instance)
+
+
+@receiver(post_save, sender=Department)
+def reindex_department_members(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or 'name' in update_fields):
+        search.reindex_group('department', 'department', instance)
+
+
+@receiver(post_save, sender=Designation)
+def reindex_designation_members(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or 'name' in update_fields):
+        search.reindex_group('designation', 'designation', instance)
+
+
+# ==================== STATISTICS SNAPSHOTS ====================
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Designation)
+@receiver(post_delete, sender=Designation)
+def count_organization_stats_event(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields and not set(update_fields) & stats.TRACKED_FIELDS):
+        return
+    stats.record_event(instance.company_id)
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+@receiver(post_save, sender='subscriptions.Subscription')
+@receiver(post_delete, sender='subscriptions.Subscription')
+@receiver(post_save, sender='payroll.PaySlip')
+@receiver(post_delete, sender='payroll.PaySlip')
+def count_global_stats_event(sender, raw=False, **kwargs):
+    if not raw:
+        stats.record_event()
@@ -0,0 +1,271 @@
+"""
+Dashboard statistics snapshots.
+
+The super admin dashboard, company statistics and organization detail pages
+read precomputed metrics from StatsSnapshot instead of counting employees,
+departments, payslips and subscriptions on every request:
+
+    key 'global'      platform totals (super_admin_stats)
+    key 'org:<uuid>'  one organization (company_statistics, detail serializer)
+
+Freshness is tracked with event counters in the shared cache. The signals in
+signals.py call ``record_event`` when a row feeding a snapshot changes; a
+snapshot whose ``events_seen`` differs from its counter, or that is older
+than STATS_SNAPSHOT_MAX_AGE, is stale. ``manage.py refresh_stats_snapshots``
+recomputes only the stale ones, organizations in batches of grouped queries.
+Readers get the snapshot with staleness metadata and may force a refresh.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+GLOBAL_KEY = 'global'
+EVENT_COUNTER_KEY = 'accounts:stats:events:{key}'
+REFRESH_BATCH_SIZE = 500
+
+# Saves limited to other fields (last login, photo, ...) leave the counts alone
+TRACKED_FIELDS = {
+    'company', 'company_id', 'status', 'employment_type', 'department', 'department_id', 'is_active', 'name'
+}
+
+
+def organization_key(organization_id):
+    return f'org:{organization_id}'
+
+
+def max_age():
+    return timedelta(seconds=getattr(settings, 'STATS_SNAPSHOT_MAX_AGE', 900))
+
+
+# ==================== EVENT COUNTERS ====================
+
+def record_event(organization_id=None):
+    """Count a change to an organization's metrics (and so the global ones)."""
+    keys = [GLOBAL_KEY]
+    if organization_id:
+        keys.append(organization_key(organization_id))
+    for key in keys:
+        counter = EVENT_COUNTER_KEY.format(key=key)
+        if cache.add(counter, 1, None):
+            continue
+        try:
+            cache.incr(counter)
+        except ValueError:
+            # Evicted between add and incr
+            cache.add(counter, 1, None)
+
+
+def event_counts(keys):
+    counters = {key: EVENT_COUNTER_KEY.format(key=key) for key in keys}
+    found = cache.get_many(list(counters.values()))
+    return {key: found.get(counter, 0) for key, counter in counters.items()}
+
+
+# ==================== METRICS ====================
+
+def organization_metrics(organization_ids):
+    """{organization_id: metrics} from a fixed number of grouped queries."""
+    from .models import Department, Designation, Employee
+
+    metrics = {
+        organization_id: {
+            'total_employees': 0,
+            'active_employees': 0,
+            'inactive_employees': 0,
+            'total_departments': 0,
+            'total_designations': 0,
+            'employment_types': [],
+            'employees_by_department': [],
+        }
+        for organization_id in organization_ids
+    }
+
+    employees = Employee.objects.filter(company_id__in=organization_ids).order_by()
+    for row in employees.values('company_id', 'status').annotate(count=Count('id')):
+        entry = metrics[row['company_id']]
+        entry['total_employees'] += row['count']
+        if row['status'] in ('active', 'inactive'):
+            entry[f"{row['status']}_employees"] = row['count']
+    for row in employees.values('company_id', 'employment_type').annotate(count=Count('id')):
+        metrics[row['company_id']]['employment_types'].append(
+            {'employment_type': row['employment_type'], 'count': row['count']}
+        )
+    for row in employees.filter(status='active').values('company_id', 'department__name').annotate(count=Count('id')):
+        metrics[row['company_id']]['employees_by_department'].append(
+            {'department__name': row['department__name'], 'count': row['count']}
+        )
+
+    for model, field in ((Department, 'total_departments'), (Designation, 'total_designations')):
+        rows = model.objects.filter(company_id__in=organization_ids, is_active=True).order_by()
+        for row in rows.values('company_id').annotate(count=Count('id')):
+            metrics[row['company_id']][field] = row['count']
+    return metrics
+
+
+def global_metrics():
+    from apps.payroll.models import PaySlip
+    from apps.subscriptions.models import Subscription
+
+    from .models import Employee, Organization
+
+    now = timezone.now()
+    organizations = Organization.objects.aggregate(
+        total=Count('id', filter=Q(is_parent=True)),
+        pending_verifications=Count('id', filter=Q(is_verified=False)),
+    )
+    employees = Employee.objects.aggregate(total=Count('id'), active=Count('id', filter=Q(status='active')))
+    payroll = PaySlip.objects.filter(
+        payroll_period__month=now.month,
+        payroll_period__year=now.year
+    ).aggregate(total_net=Sum('net_salary'), count=Count('id'))
+    subscriptions = Subscription.objects.aggregate(
+        active=Count('id', filter=Q(status='active')),
+        trial=Count('id', filter=Q(status='trial')),
+    )
+    return {
+        'overview': {
+            'total_organizations': organizations['total'],
+            'total_employees': employees['total'],
+            'active_employees': employees['active'],
+            'pending_verifications': organizations['pending_verifications'],
+        },
+        'payroll': {
+            'month': now.month,
+            'year': now.year,
+            'current_month_total': float(payroll['total_net'] or 0),
+            'current_month_count': payroll['count'] or 0,
+        },
+        'subscriptions': {
+            'active': subscriptions['active'],
+            'trial': subscriptions['trial'],
+        },
+    }
+
+
+# ==================== REFRESH ====================
+
+def _save(snapshots):
+    from .models import StatsSnapshot
+
+    # MySQL upserts on any unique key and rejects an explicit target
+    target = ['key'] if connection.features.supports_update_conflicts_with_target else None
+    StatsSnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=target,
+        update_fields=['metrics', 'computed_at', 'events_seen'],
+    )
+
+
+def refresh_organizations(organization_ids):
+    """Recompute the snapshots of ``organization_ids``; returns how many."""
+    from .models import StatsSnapshot
+
+    organization_ids = list(organization_ids)
+    for start in range(0, len(organization_ids), REFRESH_BATCH_SIZE):
+        batch = organization_ids[start:start + REFRESH_BATCH_SIZE]
+        keys = {organization_id: organization_key(organization_id) for organization_id in batch}
+        # Read the counters first: events arriving mid-refresh leave it stale
+        seen = event_counts(keys.values())
+        now = timezone.now()
+        _save([
+            StatsSnapshot(
+                key=keys[organization_id], organization_id=organization_id,
+                metrics=metrics, computed_at=now, events_seen=seen[keys[organization_id]]
+            )
+            for organization_id, metrics in organization_metrics(batch).items()
+        ])
+    return len(organization_ids)
+
+
+def refresh_global():
+    from .models import StatsSnapshot
+
+    seen = event_counts([GLOBAL_KEY])[GLOBAL_KEY]
+    _save([StatsSnapshot(key=GLOBAL_KEY, metrics=global_metrics(), computed_at=timezone.now(), events_seen=seen)])
+
+
+def is_stale(snapshot, events=None):
+    if events is None:
+        events = event_counts([snapshot.key])[snapshot.key]
+    return events != snapshot.events_seen or snapshot.computed_at < timezone.now() - max_age()
+
+
+def refresh_stale(force=False):
+    """
+    Refresh the global snapshot and the organizations whose snapshot is
+    missing, out of date or has recorded events. Returns the counts.
+    """
+    from .models import Organization, StatsSnapshot
+
+    snapshots = {
+        snapshot.organization_id: snapshot
+        for snapshot in StatsSnapshot.objects.filter(organization__isnull=False).only(
+            'key', 'organization_id', 'computed_at', 'events_seen'
+        )
+    }
+    organization_ids = list(Organization.objects.values_list('id', flat=True))
+    if force:
+        stale = organization_ids
+    else:
+        stale = []
+        for start in range(0, len(organization_ids), REFRESH_BATCH_SIZE):
+            batch = organization_ids[start:start + REFRESH_BATCH_SIZE]
+            events = event_counts(organization_key(organization_id) for organization_id in batch)
+            stale.extend(
+                organization_id for organization_id in batch
+                if organization_id not in snapshots
+                or is_stale(snapshots[organization_id], events[organization_key(organization_id)])
+            )
+
+    refreshed_global = False
+    current = StatsSnapshot.objects.filter(key=GLOBAL_KEY).first()
+    if force or stale or current is None or is_stale(current):
+        refresh_global()
+        refreshed_global = True
+    return {'organizations': refresh_organizations(stale), 'global': refreshed_global}
+
+
+# ==================== READ ====================
+
+def describe(snapshot, events=None):
+    """Staleness metadata returned next to the metrics."""
+    if events is None:
+        events = event_counts([snapshot.key])[snapshot.key]
+    return {
+        'computed_at': snapshot.computed_at.isoformat(),
+        'age_seconds': int((timezone.now() - snapshot.computed_at).total_seconds()),
+        'max_age_seconds': int(max_age().total_seconds()),
+        'pending_events': max(events - snapshot.events_seen, 0),
+        'is_stale': is_stale(snapshot, events),
+    }
+
+
+def get_snapshot(organization=None, refresh=False):
+    """
+    (metrics, metadata) for ``organization`` or the platform. Computed on the
+    spot when missing or when ``refresh`` is set; otherwise served as stored,
+    stale or not, for the scheduled job to catch up.
+    """
+    from .models import StatsSnapshot
+
+    key = GLOBAL_KEY if organization is None else organization_key(organization.pk)
+    snapshot = None if refresh else StatsSnapshot.objects.filter(key=key).first()
+    if snapshot is None:
+        if organization is None:
+            refresh_global()
+        else:
+            refresh_organizations([organization.pk])
+        snapshot = StatsSnapshot.objects.get(key=key)
+    return snapshot.metrics, describe(snapshot)
+
+
+def organization_metric(organization, name):
+    """One metric of ``organization``'s snapshot, loaded once per instance."""
+    if not hasattr(organization, '_stats_metrics'):
+        organization._stats_metrics = get_snapshot(organization)[0]
+    return organization._stats_metrics[name]
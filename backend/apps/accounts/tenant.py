@@ -0,0 +1,208 @@
+"""
+Request-scoped tenant context.
+
+user -> employee -> company -> root organization -> admin flag is resolved
+once per request and exposed as ``request.tenant`` (an immutable
+TenantContext). TenantJWTAuthentication and TenantMiddleware attach it
+lazily, so requests that never ask for it cost nothing, and also pin it to
+the authenticated user object so that the helpers in utils.py and
+permissions.py, which only receive ``user``, read the same context.
+
+With JWT_STATELESS_TENANT enabled (shared cache required, see
+check_stateless_settings) and an access token carrying a ``tenant`` claim
+(see add_tenant_claims) whose ``perm_version`` still matches the user's permission version, the
+context is built from the signed claims and the Employee/Organization rows
+are only loaded if a view actually asks for the objects. A stale token
+falls back to resolving from the database.
+"""
+import uuid
+from dataclasses import dataclass
+from functools import cached_property
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.functional import SimpleLazyObject
+
+
+@dataclass(frozen=True)
+class TenantContext:
+    user_id: object = None
+    employee_id: object = None
+    company_id: object = None
+    root_org_id: object = None
+    is_admin: bool = False
+    is_superuser: bool = False
+
+    @cached_property
+    def employee(self):
+        from .models import Employee
+        if self.employee_id is None:
+            return None
+        return Employee.objects.select_related('company').filter(pk=self.employee_id).first()
+
+    @cached_property
+    def company(self):
+        from .models import Organization
+        if self.company_id is None:
+            return None
+        employee = self.__dict__.get('employee')
+        if employee is not None and employee.company_id == self.company_id:
+            return employee.company
+        return Organization.objects.filter(pk=self.company_id).first()
+
+    @cached_property
+    def root_org(self):
+        company = self.company
+        return company.get_root_parent() if company else None
+
+    def as_claims(self):
+        return {
+            'employee_id': str(self.employee_id) if self.employee_id else None,
+            'company_id': str(self.company_id) if self.company_id else None,
+            'root_org_id': str(self.root_org_id) if self.root_org_id else None,
+            'is_admin': self.is_admin,
+        }
+
+    @classmethod
+    def from_claims(cls, token, is_superuser=False):
+        claims = token.get('tenant')
+        if not isinstance(claims, dict):
+            return None
+        try:
+            # Claims carry ids as strings; compare equal to the model pks again
+            ids = {
+                name: uuid.UUID(claims[name]) if claims.get(name) else None
+                for name in ('employee_id', 'company_id', 'root_org_id')
+            }
+        except (TypeError, ValueError):
+            return None
+        return cls(
+            user_id=token.get('user_id'),
+            is_admin=bool(claims.get('is_admin')),
+            is_superuser=is_superuser,
+            **ids,
+        )
+
+
+ANONYMOUS = TenantContext()
+
+
+def _company_without_profile(user):
+    """Organization of a user with no usable employee profile (see get_employee_org)."""
+    from .models import Employee, Organization
+
+    org = Organization.objects.filter(created_by_id=user.pk).first()
+    if org:
+        return org
+    admin_employee = Employee.objects.select_related('company').filter(user_id=user.pk, is_admin=True).first()
+    if admin_employee:
+        return admin_employee.company
+    if user.is_superuser:
+        return Organization.objects.filter(is_active=True).first()
+    return None
+
+
+def resolve_tenant(user):
+    """Build the context for ``user`` from the database."""
+    from .models import Employee
+    from .permission_cache import get_effective_permissions
+
+    if not user or not user.is_authenticated:
+        return ANONYMOUS
+
+    employee = None
+    if not user.is_superuser:
+        employee = Employee.objects.select_related('company').filter(user_id=user.pk).first()
+        if not getattr(user, 'from_token_claims', False):
+            # Prime user.employee_profile so later attribute access does not query
+            Employee._meta.get_field('user').remote_field.set_cached_value(user, employee)
+
+    company = employee.company if employee else _company_without_profile(user)
+    root_org = company.get_root_parent() if company else None
+
+    tenant = TenantContext(
+        user_id=user.pk,
+        employee_id=employee.pk if employee else None,
+        company_id=company.pk if company else None,
+        root_org_id=root_org.pk if root_org else None,
+        is_admin=user.is_superuser or get_effective_permissions(user)['admin'],
+        is_superuser=user.is_superuser,
+    )
+    tenant.__dict__.update(employee=employee, company=company, root_org=root_org)
+    return tenant
+
+
+def get_tenant(user):
+    """The context pinned to ``user`` by the request, or a freshly resolved one."""
+    tenant = getattr(user, '_tenant', None)
+    if tenant is None:
+        tenant = resolve_tenant(user)
+    return tenant
+
+
+def add_tenant_claims(token, user):
+    """Embed the user's tenant context and permission version in ``token``."""
+    from .permission_cache import user_version
+
+    token['tenant'] = resolve_tenant(user).as_claims()
+    token['perm_version'] = user_version(user.pk)
+    token['is_superuser'] = user.is_superuser
+    return token
+
+
+def claims_are_current(token):
+    from .permission_cache import user_version
+
+    return (
+        isinstance(token.get('tenant'), dict)
+        and token.get('perm_version') == user_version(token.get('user_id'))
+    )
+
+
+def check_stateless_settings():
+    """
+    JWT_STATELESS_TENANT trusts token claims while the permission version
+    matches. Versions kept in a per-process cache are not rotated by other
+    workers, so revocations would go unseen until the token expires.
+    """
+    from .permission_cache import is_shared_cache
+
+    if getattr(settings, 'JWT_STATELESS_TENANT', False) and not is_shared_cache():
+        raise ImproperlyConfigured(
+            'JWT_STATELESS_TENANT requires a shared default cache (e.g. REDIS_URL); '
+            'the configured backend is per process.'
+        )
+
+
+def bind_tenant(request, user, token=None):
+    """Attach a lazily resolved context to the request and the user object."""
+    def _resolve():
+        stateless = getattr(settings, 'JWT_STATELESS_TENANT', False)
+        if stateless and token is not None and claims_are_current(token):
+            tenant = TenantContext.from_claims(token, is_superuser=user.is_superuser)
+            if tenant is not None:
+                return tenant
+        return resolve_tenant(user)
+
+    tenant = SimpleLazyObject(_resolve)
+    user._tenant = tenant
+    request.tenant = tenant
+    return tenant
+
+
+class TenantMiddleware:
+    """request.tenant for session-authenticated requests (admin site)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        def _resolve():
+            user = request.user
+            tenant = get_tenant(user)
+            if user.is_authenticated:
+                user._tenant = tenant
+            return tenant
+
+        request.tenant = SimpleLazyObject(_resolve)
+        return self.get_response(request)
@@ -1,3 +1,476 @@
-from django.test import TestCase
+import tempfile
+import time
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import stats
+from .audit_sink import audit_sink
+from .models import (
+    DataScope, Department, Designation, DesignationPermission, Employee, EmployeeImportJob, Module,
+    Organization, Permission, PermissionAuditLog, Role, RolePermission
+)
+from .importer import EmployeeImportService
+from .permission_cache import LOCAL_VERSION_TIMEOUT, USER_VERSION_KEY, get_effective_permissions, user_version
+from .permissions import PermissionChecker, has_basic_right, is_client_admin
+from .search import search_employees
+from .tenant import TenantContext, add_tenant_claims, check_stateless_settings, get_tenant
+from .utils import get_employee_or_none, get_employee_org, get_employee_org_id
+
+
+class CompiledPermissionsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('manager', 'manager@test.com', 'x')
+        self.company = Organization.objects.create(name="Test Corp", slug="test-corp")
+        self.designation = Designation.objects.create(company=self.company, name="Manager", code="MGR")
+        self.employee = Employee.objects.create(
+            user=self.user, employee_id="EMP001", company=self.company, first_name="John",
+            email="john@test.com", date_of_joining=date(2020, 1, 1), designation=self.designation
+        )
+        module = Module.objects.get_or_create(code='leave', defaults={'name': 'Leave'})[0]
+        self.permission = Permission.objects.get_or_create(
+            code='leave.approve', defaults={'module': module, 'name': 'Approve Leave'}
+        )[0]
+        self.role = Role.objects.create(organization=self.company, name="Approver", code="approver")
+        self.designation.roles.add(self.role)
+
+    def test_warm_checks_do_not_query_and_changes_invalidate(self):
+        team = DataScope.objects.get_or_create(code='team', defaults={'name': 'Team', 'level': 2})[0]
+        RolePermission.objects.create(role=self.role, permission=self.permission, scope=team)
+        PermissionChecker(self.user, log=False).has_permission('leave.approve', 'team')
+        self.user._tenant = get_tenant(self.user)  # as bound by TenantJWTAuthentication
+
+        with self.assertNumQueries(0):
+            checker = PermissionChecker(self.user, log=False)
+            self.assertTrue(checker.has_permission('leave.approve', 'team'))
+            self.assertFalse(checker.has_permission('leave.approve', 'department'))
+            self.assertTrue(has_basic_right(self.user, 'clock_in'))
+            self.assertFalse(is_client_admin(self.user))
+
+        del self.user._tenant
+        self.employee.is_admin = True
+        self.employee.save()
+        self.assertTrue(is_client_admin(self.user))
+
+        self.employee.is_admin = False
+        self.employee.save()
+        self.designation.roles.remove(self.role)
+        self.assertFalse(PermissionChecker(self.user, log=False).has_permission('leave.approve', 'team'))
+
+    def test_per_process_versions_expire(self):
+        Employee.objects.filter(pk=self.employee.pk).update(is_admin=True)
+        cache.clear()
+        self.assertTrue(get_effective_permissions(self.user)['admin'])
+
+        # Revoked through another worker: no rotation reaches this process
+        Employee.objects.filter(pk=self.employee.pk).update(is_admin=False)
+        self.assertTrue(get_effective_permissions(self.user)['admin'])
+        later = time.time() + LOCAL_VERSION_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            self.assertFalse(get_effective_permissions(self.user)['admin'])
+
+    @override_settings(PERMISSION_AUDIT_SAMPLE_RATE=0.0, PERMISSION_AUDIT_BATCH_SIZE=3, PERMISSION_AUDIT_FLUSH_MS=60000)
+    def test_audit_events_are_buffered_and_denials_always_kept(self):
+        audit_sink.flush()
+        checker = PermissionChecker(self.user)
+        for scope in ('self', 'team', 'department'):
+            checker.has_permission('leave.approve', scope)
+        RolePermission.objects.create(
+            role=self.role, permission=self.permission,
+            scope=DataScope.objects.get_or_create(code='team', defaults={'name': 'Team', 'level': 2})[0]
+        )
+        PermissionChecker(self.user).has_permission('leave.approve', 'team')
+
+        # Three denials filled the batch; the sampled-out grant was dropped
+        logs = PermissionAuditLog.objects.filter(user=self.user, action='check')
+        self.assertEqual(logs.count(), 3)
+        self.assertFalse(logs.filter(result=True).exists())
+        self.assertEqual(logs.filter(permission=self.permission).count(), 3)
+
+
+class TenantContextTest(TestCase):
+    setUp = CompiledPermissionsTest.setUp
+
+    def test_helpers_share_one_resolution(self):
+        tenant = get_tenant(self.user)
+        self.user._tenant = tenant
+        with self.assertNumQueries(0):
+            self.assertEqual(get_employee_org(self.user), self.company)
+            self.assertEqual(get_employee_org_id(self.user), self.company.id)
+            self.assertEqual(get_employee_or_none(self.user), self.employee)
+            self.assertEqual(self.user.employee_profile, self.employee)
+            is_client_admin(self.user)
+        self.assertEqual(tenant.root_org_id, self.company.id)
+        with self.assertRaises(AttributeError):
+            tenant.company_id = None
+
+    def test_hydrated_from_claims(self):
+        claims = TenantContext(employee_id=self.employee.id, company_id=self.company.id, is_admin=True).as_claims()
+        tenant = TenantContext.from_claims({'user_id': self.user.id, 'tenant': claims})
+        self.assertTrue(tenant.is_admin)
+        self.assertEqual(tenant.company_id, self.company.id)
+        self.assertEqual(tenant.company, self.company)
+
+    @override_settings(JWT_STATELESS_TENANT=True)
+    def test_claims_token_compares_org_ids(self):
+        self.employee.is_admin = True
+        self.employee.save()
+        target = User.objects.create_user('target', 'target@test.com', 'x')
+        Employee.objects.create(
+            user=target, employee_id="EMP002", company=self.company, first_name="Jane",
+            email="jane@test.com", date_of_joining=date(2020, 1, 1)
+        )
+        access = add_tenant_claims(RefreshToken.for_user(self.user), self.user).access_token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = client.post(
+            '/api/account/security/pin/admin-set/',
+            {'user_id': target.id, 'pin': '1234', 'confirm_pin': '1234'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_claims_ignored_unless_stateless(self):
+        Employee.objects.filter(pk=self.employee.pk).update(is_admin=True)
+        access = add_tenant_claims(RefreshToken.for_user(self.user), self.user).access_token
+        # Revoked on another worker: this process still holds the old version
+        version = user_version(self.user.id)
+        Employee.objects.filter(pk=self.employee.pk).update(is_admin=False)
+        cache.clear()
+        cache.set(USER_VERSION_KEY.format(user_id=self.user.id), version, None)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = client.post('/api/account/security/pin/admin-set/', {'user_id': self.user.id}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_stateless_requires_shared_cache(self):
+        with override_settings(JWT_STATELESS_TENANT=True):
+            with self.assertRaises(ImproperlyConfigured):
+                check_stateless_settings()
+            redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://'}}
+            with override_settings(CACHES=redis):
+                check_stateless_settings()
+
+    @override_settings(JWT_STATELESS_TENANT=True)
+    def test_stateless_token_skips_user_lookup_until_stale(self):
+        access = add_tenant_claims(RefreshToken.for_user(self.user), self.user).access_token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        client.get('/api/leave/requests/')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(client.get('/api/leave/requests/').status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'auth_user' in q['sql']])
+
+        # Changing the employee rotates the permission version: back to the database
+        self.employee.is_admin = True
+        self.employee.save()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(client.get('/api/leave/requests/').status_code, 200)
+        self.assertTrue([q for q in ctx.captured_queries if 'auth_user' in q['sql']])
+
+
+class HierarchyClosureTest(TestCase):
+    def setUp(self):
+        self.group = Organization.objects.create(name="Group", slug="group")
+        self.sub = Organization.objects.create(name="Sub", slug="sub", parent=self.group)
+        self.subsub = Organization.objects.create(name="SubSub", slug="subsub", parent=self.sub)
+        self.other = Organization.objects.create(name="Other", slug="other")
+
+    def _employee(self, code, manager=None, status='active'):
+        return Employee.objects.create(
+            employee_id=code, company=self.sub, first_name=code, email=f"{code}@test.com",
+            date_of_joining=date(2020, 1, 1), reporting_manager=manager, status=status
+        )
+
+    def test_organization_tree_queries_and_moves(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.subsub.get_root_parent(), self.group)
+        with self.assertNumQueries(1):
+            self.assertEqual(set(self.group.get_all_subsidiaries()), {self.sub, self.subsub})
+
+        self.sub.parent = self.other
+        self.sub.save()
+        self.assertEqual(Organization.objects.get(pk=self.subsub.pk).get_root_parent(), self.other)
+        self.assertEqual(self.group.get_all_subsidiaries(), [])
+        self.assertTrue(self.subsub.is_subsidiary_of(self.other))
+
+        self.other.parent = self.subsub
+        with self.assertRaises(ValueError):
+            self.other.save()
+
+    def test_reporting_line_skips_inactive_managers(self):
+        ceo = self._employee('CEO')
+        vp = self._employee('VP', ceo)
+        left = self._employee('LEFT', vp, status='resigned')
+        self._employee('ORPHAN', left)
+        dev = self._employee('DEV', vp)
+        with self.assertNumQueries(1):
+            self.assertEqual(set(ceo.get_all_subordinates()), {vp, dev})
+        self.assertTrue(dev.reports_to(ceo))
+
+        vp.delete()
+        self.assertFalse(Employee.objects.get(pk=dev.pk).reports_to(ceo))
+
+    def test_department_subtree_survives_parent_delete(self):
+        root = Department.objects.create(company=self.sub, name="Eng", code="ENG")
+        child = Department.objects.create(company=self.sub, name="Platform", code="PLT", parent=root)
+        leaf = Department.objects.create(company=self.sub, name="Infra", code="INF", parent=child)
+        self.assertEqual(set(root.get_all_children()), {child, leaf})
+        self.assertTrue(leaf.is_within(root))
+
+        child.delete()
+        self.assertEqual(root.get_all_children(), [])
+        self.assertTrue(leaf.is_within(Department.objects.get(pk=leaf.pk)))
+        self.assertFalse(leaf.is_within(root))
+
+    def test_scope_filters_run_in_sql(self):
+        user = User.objects.create_user('lead', 'lead@test.com', 'x')
+        lead = self._employee('LEAD')
+        lead.user = user
+        lead.save()
+        report = self._employee('REP', lead)
+        outsider = Employee.objects.create(
+            employee_id='OUT', company=self.other, first_name='Out', email='out@test.com', date_of_joining=date(2020, 1, 1)
+        )
+        checker = PermissionChecker(user, log=False)
+        checker._compiled = {'basic': True, 'admin': False, 'permissions': {'employee.view': ['team']}}
+        self.assertEqual(set(checker.filter_queryset(Employee.objects.all(), 'employee.view')), {report})
+
+        checker._compiled['permissions']['employee.view'] = ['organization']
+        queryset = checker.filter_queryset(Employee.objects.all(), 'employee.view')
+        self.assertIn(report, queryset)
+        self.assertNotIn(outsider, queryset)
+
+
+class EmployeeSearchIndexTest(TestCase):
+    def setUp(self):
+        self.company = Organization.objects.create(name="Search Corp", slug="search-corp")
+        self.other = Organization.objects.create(name="Other Corp", slug="other-corp")
+        self.department = Department.objects.create(company=self.company, name="Finance", code="FIN")
+        self.jonathan = self._employee('EMP-1001', 'Jonathan', 'Smith', 'jon.smith@test.com', department=self.department)
+        self.joanna = self._employee('EMP-1002', 'Joanna', 'Smithers', 'joanna@test.com')
+        self._employee('EMP-2001', 'Jonathan', 'Outsider', 'out@test.com', company=self.other)
+
+    def _employee(self, code, first, last, email, company=None, department=None):
+        return Employee.objects.create(
+            employee_id=code, company=company or self.company, first_name=first, last_name=last,
+            email=email, date_of_joining=date(2020, 1, 1), department=department
+        )
+
+    def _search(self, query):
+        return [employee for employee, _ in search_employees(query, self.company.id)]
+
+    def test_prefix_typo_and_ranking(self):
+        self.assertEqual(self._search('jon smith'), [self.jonathan])
+        self.assertEqual(self._search('smith'), [self.jonathan, self.joanna])
+        self.assertEqual(self._search('jonahtan'), [self.jonathan])
+        # One edit away from EMP-1001 too, ranked after the exact match
+        self.assertEqual(self._search('emp1002'), [self.joanna, self.jonathan])
+        self.assertEqual(self._search('zzz'), [])
+
+    def test_index_follows_renames(self):
+        self.assertEqual(self._search('finance'), [self.jonathan])
+        self.department.name = "Treasury"
+        self.department.save()
+        self.assertEqual(self._search('treasury'), [self.jonathan])
+        self.assertEqual(self._search('finance'), [])
+
+        self.joanna.last_name = "Brown"
+        self.joanna.save()
+        self.assertEqual(self._search('smith'), [self.jonathan])
+
+    def test_list_endpoint_uses_index(self):
+        user = User.objects.create_user('admin', 'admin@test.com', 'x')
+        self.jonathan.user = user
+        self.jonathan.save()
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/account/employees/', {'search': 'joanna'})
+        self.assertEqual([row['employee_id'] for row in response.json()['results']], ['EMP-1002'])
+        response = client.get('/api/account/employees/search/', {'q': 'smi'})
+        self.assertEqual([row['employee_id'] for row in response.json()['results']], ['EMP-1001', 'EMP-1002'])
+
+
+class ListQueryCountTest(TestCase):
+    """List endpoints cost the same number of queries for 2 or 8 rows"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('hr', 'hr@test.com', 'x')
+        self.company = Organization.objects.create(name="Count Corp", slug="count-corp", created_by=self.user)
+        self.root = Department.objects.create(company=self.company, name="Root", code="ROOT")
+        self.designation = Designation.objects.create(company=self.company, name="Engineer", code="ENG")
+        self.scope = DataScope.objects.get_or_create(code='team', defaults={'name': 'Team', 'level': 2})[0]
+        self.module = Module.objects.get_or_create(code='leave', defaults={'name': 'Leave'})[0]
+        Employee.objects.create(
+            user=self.user, employee_id="HR001", company=self.company, first_name="Hr",
+            email="hr@test.com", date_of_joining=date(2020, 1, 1)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.rows = 0
+
+    def _add_rows(self, count):
+        for _ in range(count):
+            self.rows += 1
+            n = self.rows
+            department = Department.objects.create(company=self.company, name=f"Dept {n}", code=f"D{n}", parent=self.root)
+            designation = Designation.objects.create(company=self.company, name=f"Desig {n}", code=f"G{n}")
+            role = Role.objects.create(organization=self.company, name=f"Role {n}", code=f"role-{n}")
+            permission = Permission.objects.get_or_create(
+                code=f'leave.count_{n}', defaults={'module': self.module, 'name': f'Count {n}'}
+            )[0]
+            RolePermission.objects.create(role=role, permission=permission, scope=self.scope)
+            DesignationPermission.objects.create(designation=designation, permission=permission, scope=self.scope)
+            designation.roles.add(role)
+            user = User.objects.create_user(f'user{n}', f'user{n}@test.com', 'x')
+            Employee.objects.create(
+                user=user, employee_id=f"E{n:03}", company=self.company, first_name=f"Emp{n}",
+                email=f"e{n}@test.com", date_of_joining=date(2020, 1, 1),
+                department=department, designation=designation
+            )
+
+    def _queries(self, path):
+        self.client.get(path)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_constant_queries_per_endpoint(self):
+        paths = [
+            '/api/account/departments/',
+            f'/api/account/departments/{self.root.pk}/',
+            '/api/account/designations/',
+            '/api/account/employees/',
+        ]
+        self._add_rows(2)
+        few = {path: self._queries(path) for path in paths}
+        self._add_rows(6)
+        many = {path: self._queries(path) for path in paths}
+        self.assertEqual(few, many)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), EMPLOYEE_IMPORT_HASH_WORKERS=2)
+class EmployeeImportTest(TestCase):
+    HEADER = "Employee ID,First Name,Last Name,Email,Department,Designation,Manager,Username,Password,DOJ\n"
+
+    def setUp(self):
+        from apps.hrms.models import OnboardingStep, OnboardingTemplate
+
+        self.admin = User.objects.create_user('import-admin', 'admin@import.com', 'x')
+        self.company = Organization.objects.create(name="Import Corp", slug="import-corp", created_by=self.admin)
+        Department.objects.create(company=self.company, name="Engineering", code="ENG")
+        Designation.objects.create(company=self.company, name="Developer", code="DEV")
+        self.boss = Employee.objects.create(
+            employee_id="BOSS", company=self.company, first_name="Boss",
+            email="boss@import.com", date_of_joining=date(2020, 1, 1)
+        )
+        self.template = OnboardingTemplate.objects.create(company=self.company, name="Default")
+        OnboardingStep.objects.create(template=self.template, step_name="Laptop", step_order=1)
+        OnboardingStep.objects.create(template=self.template, step_name="Badge", step_order=2)
+
+    def _run(self, rows, dry_run=False):
+        upload = SimpleUploadedFile('staff.csv', (self.HEADER + rows).encode())
+        job = EmployeeImportJob.objects.create(
+            company=self.company, file=upload, original_filename='staff.csv',
+            onboarding_template=self.template, dry_run=dry_run, created_by=self.admin
+        )
+        return EmployeeImportService.run(job)
+
+    def test_imports_valid_rows_and_reports_errors(self):
+        job = self._run(
+            "E2,Bea,Two,bea@import.com,ENG,Developer,E1,bea,Secret123,2024-02-01\n"
+            "E1,Al,One,al@import.com,Engineering,DEV,BOSS,,,\n"
+            "E3,Cy,Three,boss@import.com,,,,,,\n"
+            "E4,Di,Four,di@import.com,Sales,,,,,\n"
+            "E5,Ed,Five,ed@import.com,,,E4,,,\n"
+        )
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.total_rows, job.imported_rows, job.error_rows, job.users_created), (5, 2, 3, 1))
+        errors = job.error_report.read().decode()
+        self.assertIn("Email 'boss@import.com' is already used", errors)
+        self.assertIn("department: 'Sales' not found", errors)
+        self.assertIn("row 5 was not imported", errors)
+
+        bea = Employee.objects.select_related('user', 'department').get(employee_id='E2')
+        self.assertTrue(bea.user.check_password('Secret123'))
+        self.assertEqual(bea.department.code, 'ENG')
+        self.assertEqual(bea.date_of_joining, date(2024, 2, 1))
+        self.assertTrue(bea.reports_to(self.boss))
+        self.assertEqual({employee.employee_id for employee in self.boss.get_all_subordinates()}, {'E1', 'E2'})
+        self.assertEqual(bea.onboarding_steps.count(), 2)
+        self.assertEqual([employee for employee, _ in search_employees('bea', self.company.id)], [bea])
+
+    def test_dry_run_and_cycles_create_nothing(self):
+        job = self._run("E1,Al,One,al@import.com,,,,,,\n", dry_run=True)
+        self.assertEqual((job.imported_rows, job.error_rows), (0, 0))
+        self.assertFalse(Employee.objects.filter(employee_id='E1').exists())
+
+        job = self._run("E1,Al,One,al@import.com,,,E2,,,\nE2,Bo,Two,bo@import.com,,,E1,,,\n")
+        self.assertEqual((job.imported_rows, job.error_rows), (0, 2))
+        self.assertIn("reporting cycle", job.error_report.read().decode())
+
+    def test_manager_must_belong_to_company(self):
+        other = Organization.objects.create(name="Other Corp", slug="other-corp")
+        Employee.objects.create(
+            employee_id="OUT", company=other, first_name="Out",
+            email="out@other.com", date_of_joining=date(2020, 1, 1)
+        )
+        job = self._run("E1,Al,One,al@import.com,,,OUT,,,\n")
+        self.assertEqual((job.imported_rows, job.error_rows), (0, 1))
+        self.assertIn("employee 'OUT' not found", job.error_report.read().decode())
+
+
+class StatsSnapshotTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('root', 'root@stats.com', 'x')
+        self.company = Organization.objects.create(name="Stats Corp", slug="stats-corp")
+        Department.objects.create(company=self.company, name="Ops", code="OPS")
+        self._employee('S1')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _employee(self, code):
+        return Employee.objects.create(
+            employee_id=code, company=self.company, first_name=code,
+            email=f"{code.lower()}@stats.com", date_of_joining=date(2020, 1, 1)
+        )
+
+    def test_endpoints_read_snapshot_until_refreshed(self):
+        response = self.client.get(f'/api/account/companies/{self.company.pk}/statistics/').json()
+        self.assertEqual((response['total_employees'], response['total_departments']), (1, 1))
+        self.assertFalse(response['snapshot']['is_stale'])
+
+        self._employee('S2')
+        response = self.client.get(f'/api/account/companies/{self.company.pk}/statistics/').json()
+        self.assertEqual(response['total_employees'], 1)
+        self.assertEqual(response['snapshot']['pending_events'], 1)
+        self.assertTrue(response['snapshot']['is_stale'])
+
+        response = self.client.get(f'/api/account/companies/{self.company.pk}/statistics/', {'refresh': 'true'}).json()
+        self.assertEqual(response['total_employees'], 2)
+        self.assertFalse(response['snapshot']['is_stale'])
+
+    def test_job_refreshes_only_stale_snapshots(self):
+        other = Organization.objects.create(name="Quiet Corp", slug="quiet-corp")
+        self.assertEqual(stats.refresh_stale(), {'organizations': 2, 'global': True})
+        self.assertEqual(stats.refresh_stale(), {'organizations': 0, 'global': False})
+
+        self._employee('S2')
+        self.assertEqual(stats.refresh_stale(), {'organizations': 1, 'global': True})
+        self.assertEqual(stats.get_snapshot(self.company)[0]['active_employees'], 2)
+        self.assertEqual(stats.get_snapshot(other)[0]['total_employees'], 0)
+
+        response = self.client.get('/api/account/super-admin/stats/').json()
+        self.assertEqual(response['overview']['total_employees'], 2)
+        self.assertIn('computed_at', response['snapshot'])
@@ -1,6 +1,7 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from . import views
+from .serializers import TenantTokenRefreshSerializer
 from apps.requests import views as req_views
 
 app_name = 'account'
@@ -11,7 +12,7 @@ urlpatterns = [
     path('auth/login/', views.MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('auth/login/verify-2fa/', views.verify_2fa, name='verify_2fa'),
     path('auth/super-admin/login/', views.SuperAdminTokenObtainPairView.as_view(), name='super_admin_login'),
-    path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('auth/token/refresh/', TokenRefreshView.as_view(serializer_class=TenantTokenRefreshSerializer), name='token_refresh'),
     path('auth/register/', views.register_organization, name='register_organization'),
     path('auth/activate/', views.activate_employee, name='activate_employee'),
     
@@ -67,6 +68,9 @@ urlpatterns = [
     path('employees/me/', views.get_my_profile, name='get_my_profile'),
     path('employees/me/permissions/', views.get_my_permissions, name='get_my_permissions'),
     path('employees/me/documents/', views.get_my_documents, name='get_my_documents'),
+    path('employees/search/', views.employee_search, name='employee_search'),
+    path('employees/imports/', views.employee_import_list_create, name='employee_import_list_create'),
+    path('employees/imports/<uuid:pk>/', views.employee_import_detail, name='employee_import_detail'),
     path('employees/', views.employee_list_create, name='employee_list_create'),
     path('employees/<uuid:pk>/', views.employee_detail, name='employee_detail'),
     
@@ -1,5 +1,5 @@
 from django.core.exceptions import PermissionDenied
-from .models import Employee
+from .tenant import get_tenant
 
 def get_employee_or_none(user):
     """
@@ -16,55 +16,23 @@ def get_employee_or_none(user):
         return None
         
     try:
-        # We use .employee which is the new related_name after refactor
-        return getattr(user, 'employee_profile', None)
+        # Resolved once per request, see tenant.py
+        return get_tenant(user).employee
     except Exception:
         return None
 
 def get_employee_org_id(user):
     """Safely get the company/organization ID for a user."""
-    employee = get_employee_or_none(user)
-    if employee:
-        return employee.company_id
-    
-    # Fallback for organization creators (Admins) who might not have an employee profile
-    if user and user.is_authenticated:
-        from .models import Organization
-        org = Organization.objects.filter(created_by=user).first()
-        if org:
-            return org.id
-            
-        # Fallback for superusers testing the system
-        if user.is_superuser:
-            org = Organization.objects.filter(is_active=True).first()
-            if org:
-                return org.id
-            
-    return None
+    if not user or not user.is_authenticated:
+        return None
+    return get_tenant(user).company_id
 
 def get_employee_org(user):
-    """Safely get the company/organization object for a user."""
-    employee = get_employee_or_none(user)
-    if employee:
-        return employee.company
-    
-    # Fallback for organization creators and managers
-    if user and user.is_authenticated:
-        # Avoid circular import
-        from .models import Organization, Employee
-        
-        # 1. Organization created by user
-        org = Organization.objects.filter(created_by=user).first()
-        if org:
-            return org
-            
-        # 2. Check if user is an admin in any organization via an employee profile
-        admin_employee = Employee.objects.filter(user=user, is_admin=True).first()
-        if admin_employee:
-            return admin_employee.company
-            
-        # 3. Last resort: Any active organization if superuser
-        if user.is_superuser:
-            return Organization.objects.filter(is_active=True).first()
-            
-    return None
+    """
+    Safely get the company/organization object for a user: the employee's
+    company, else the organization the user created, else the company where
+    the user is an admin employee, else (superusers) any active organization.
+    """
+    if not user or not user.is_authenticated:
+        return None
+    return get_tenant(user).company
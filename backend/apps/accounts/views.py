@@ -4,7 +4,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Count, Sum
+from django.db.models import Q, Prefetch
 from django.contrib.auth.models import User
 from django.db import transaction
 from django.utils import timezone
@@ -18,7 +18,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from .models import (
     Organization, Company, Department, Designation, Employee,
-    EmployeeDocument, EmployeeEducation, EmployeeExperience,
+    EmployeeDocument, EmployeeEducation, EmployeeExperience, EmployeeImportJob,
     InviteCode, NotificationPreference, Role, Module, Permission,
     DataScope, RolePermission, DesignationPermission, SecurityProfile
 )
@@ -28,10 +28,14 @@ from .serializers import (
     MyTokenObtainPairSerializer, ModuleSerializer, PermissionSerializer,
     DataScopeSerializer, RoleSerializer, RolePermissionSerializer,
     DesignationListSerializer, DesignationDetailSerializer, DepartmentListSerializer,
-    DepartmentDetailSerializer, EmployeeListSerializer, EmployeeDocumentSerializer,
-    SecurityProfileSerializer, SetPinSerializer, VerifyPinSerializer
+    DepartmentDetailSerializer, EmployeeListSerializer, EmployeeDocumentSerializer, EmployeeImportJobSerializer,
+    SecurityProfileSerializer, SetPinSerializer, VerifyPinSerializer,
+    with_department_children, with_department_counts, with_designation_counts,
+    with_designation_relations, with_employee_counts
 )
 from .permissions import is_client_admin, require_admin, require_permission, PermissionChecker
+from . import stats
+from .search import DEFAULT_LIMIT as SEARCH_LIMIT, matching_employee_ids, search_employees
 from .utils import get_employee_or_none, get_employee_org_id, get_employee_org
 from .validators import validate_password_complexity
 
@@ -701,22 +705,18 @@ def company_detail(request, pk):
         return Response({'error': 'Failed to process request'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _wants_refresh(request):
+    return request.query_params.get('refresh', '').lower() in ('1', 'true', 'yes')
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def company_statistics(request, pk):
-    """Get company statistics"""
+    """Get company statistics (from the stats snapshot; ?refresh=true recomputes it)"""
     try:
         company = get_object_or_404(Organization, pk=pk)
-        stats = {
-            'total_employees': company.employees.count(),
-            'active_employees': company.employees.filter(status='active').count(),
-            'inactive_employees': company.employees.filter(status='inactive').count(),
-            'total_departments': company.departments.filter(is_active=True).count(),
-            'total_designations': company.designations.filter(is_active=True).count(),
-            'employment_types': list(company.employees.values('employment_type').annotate(count=Count('id'))),
-            'employees_by_department': list(company.employees.filter(status='active').values('department__name').annotate(count=Count('id'))),
-        }
-        return Response(stats)
+        metrics, snapshot = stats.get_snapshot(company, refresh=_wants_refresh(request))
+        return Response({**metrics, 'snapshot': snapshot})
     except Exception as e:
         logger.error(f"Error in company_statistics: {str(e)}")
         return Response({'error': 'Failed to fetch statistics'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -735,7 +735,7 @@ def department_list_create(request):
             employee = get_employee_or_none(request.user)
             user_company_id = employee.company_id if employee else None
 
-            queryset = Department.objects.select_related('company', 'parent', 'head')
+            queryset = with_department_counts(Department.objects.select_related('company', 'parent', 'head'))
             
             if user_company_id:
                 queryset = queryset.filter(company_id=user_company_id)
@@ -781,7 +781,12 @@ def department_list_create(request):
 def department_detail(request, pk):
     """Department detail operations"""
     try:
-        dept = get_object_or_404(Department, pk=pk)
+        queryset = Department.objects.all()
+        if request.method == 'GET':
+            queryset = with_department_children(
+                Department.objects.select_related('company', 'parent', 'head', 'created_by', 'updated_by')
+            )
+        dept = get_object_or_404(queryset, pk=pk)
         
         if request.method == 'GET':
             serializer = DepartmentDetailSerializer(dept)
@@ -821,7 +826,7 @@ def designation_list_create(request):
             employee = get_employee_or_none(request.user)
             user_company_id = employee.company_id if employee else None
 
-            queryset = Designation.objects.select_related('company').prefetch_related('roles')
+            queryset = with_designation_relations(Designation.objects.all())
             
             if user_company_id:
                 queryset = queryset.filter(company_id=user_company_id)
@@ -865,7 +870,12 @@ def designation_list_create(request):
 def designation_detail(request, pk):
     """Designation detail operations"""
     try:
-        desig = get_object_or_404(Designation.objects.select_related('company').prefetch_related('roles'), pk=pk)
+        desig = get_object_or_404(
+            with_designation_counts(Designation.objects.select_related('company', 'created_by', 'updated_by')).prefetch_related(
+                Prefetch('roles__rolepermission_set', queryset=RolePermission.objects.select_related('permission__module', 'scope'))
+            ),
+            pk=pk
+        )
         
         if request.method == 'GET':
             serializer = DesignationDetailSerializer(desig)
@@ -1203,6 +1213,110 @@ def get_my_documents(request):
 
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def employee_search(request):
+    """Ranked, typo-tolerant employee directory search (?q=&limit=)"""
+    try:
+        company_id = get_employee_org_id(request.user)
+        if not company_id:
+            if not request.user.is_superuser:
+                return Response({'error': 'Employee profile not found'}, status=status.HTTP_403_FORBIDDEN)
+            company_id = request.query_params.get('company')
+
+        organization = get_employee_org(request.user)
+        root = organization.get_root_parent() if organization else None
+        if root and isinstance(root.settings, dict) and not root.settings.get('enable_global_search', True):
+            return Response({'error': 'Global search is disabled for this organization'}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', SEARCH_LIMIT)), 1), 100)
+        except ValueError:
+            limit = SEARCH_LIMIT
+
+        results = [
+            {
+                'id': employee.id,
+                'employee_id': employee.employee_id,
+                'full_name': employee.full_name,
+                'email': employee.email,
+                'phone': employee.phone,
+                'department_name': employee.department.name if employee.department else None,
+                'designation_name': employee.designation.name if employee.designation else None,
+                'status': employee.status,
+                'profile_photo': employee.profile_photo.url if employee.profile_photo else None,
+                'score': score,
+            }
+            for employee, score in search_employees(request.query_params.get('q', ''), company_id, limit)
+        ]
+        return Response({'count': len(results), 'results': results})
+    except Exception as e:
+        import traceback
+        logger.error(f"[employee_search] Error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def employee_import_list_create(request):
+    """
+    List or upload bulk employee onboarding files (CSV/XLSX). Jobs are queued
+    and run by ``manage.py run_employee_imports``; poll the job for progress.
+    """
+    try:
+        if not is_client_admin(request.user):
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+        company_id = get_employee_org_id(request.user)
+        if not company_id:
+            if not request.user.is_superuser:
+                return Response({'error': 'Employee profile not found'}, status=status.HTTP_403_FORBIDDEN)
+            company_id = request.data.get('company') or request.query_params.get('company')
+            if not company_id:
+                return Response({'error': 'Company identifier is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.method == 'GET':
+            queryset = EmployeeImportJob.objects.filter(company_id=company_id).select_related('onboarding_template')
+            paginator = StandardResultsSetPagination()
+            paginated = paginator.paginate_queryset(queryset, request)
+            serializer = EmployeeImportJobSerializer(paginated, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
+        serializer = EmployeeImportJobSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        template = serializer.validated_data.get('onboarding_template')
+        if template and str(template.company_id) != str(company_id):
+            return Response({'error': 'Onboarding template does not belong to this company'}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = serializer.save(
+            company_id=company_id,
+            original_filename=serializer.validated_data['file'].name,
+            created_by=request.user
+        )
+        return Response(EmployeeImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+    except Exception as e:
+        import traceback
+        logger.error(f"[employee_import_list_create] Error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def employee_import_detail(request, pk):
+    """Status, counters and error report of one import job"""
+    if not is_client_admin(request.user):
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    jobs = EmployeeImportJob.objects.select_related('onboarding_template')
+    if not request.user.is_superuser:
+        jobs = jobs.filter(company_id=get_employee_org_id(request.user))
+    job = get_object_or_404(jobs, pk=pk)
+    return Response(EmployeeImportJobSerializer(job).data)
+
+
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 def employee_list_create(request):
@@ -1220,7 +1334,7 @@ def employee_list_create(request):
             status_filter = request.query_params.get('status')
             search = request.query_params.get('search')
             
-            queryset = Employee.objects.select_related('company', 'department', 'designation')
+            queryset = with_employee_counts(Employee.objects.select_related('company', 'department', 'designation'))
             
             # CRITICAL: Always filter by the user's company
             if user_company_id:
@@ -1237,7 +1351,10 @@ def employee_list_create(request):
             if status_filter:
                 queryset = queryset.filter(status=status_filter)
             if search:
-                queryset = queryset.filter(Q(first_name__icontains=search) | Q(last_name__icontains=search) | Q(email__icontains=search) | Q(employee_id__icontains=search))
+                # Token index lookup (see search.py) instead of icontains scans
+                matches = matching_employee_ids(search, user_company_id or company_id)
+                if matches is not None:
+                    queryset = queryset.filter(pk__in=matches)
             
             paginator = StandardResultsSetPagination()
             paginated = paginator.paginate_queryset(queryset, request)
@@ -1356,7 +1473,12 @@ def employee_list_create(request):
 def employee_detail(request, pk):
     """Employee detail operations"""
     try:
-        emp = get_object_or_404(Employee.objects.select_related('company', 'department', 'designation', 'reporting_manager'), pk=pk)
+        emp = get_object_or_404(
+            with_employee_counts(Employee.objects.select_related(
+                'company', 'department', 'designation', 'reporting_manager', 'onboarding_template', 'created_by', 'updated_by'
+            )),
+            pk=pk
+        )
         
         if request.method == 'GET':
             from .serializers import EmployeeDetailSerializer
@@ -2173,7 +2295,8 @@ def verify_2fa(request):
     
     # Generate tokens
     from rest_framework_simplejwt.tokens import RefreshToken
-    refresh = RefreshToken.for_user(user)
+    from .tenant import add_tenant_claims
+    refresh = add_tenant_claims(RefreshToken.for_user(user), user)
     
     # Get employee profile for role info
     from .permissions import is_client_admin, is_org_creator
@@ -2318,54 +2441,17 @@ def reset_expired_password(request):
 @permission_classes([IsAuthenticated])
 def super_admin_stats(request):
     """
-    Get global statistics for Super Admin Dashboard
+    Get global statistics for Super Admin Dashboard.
+    Served from the stats snapshot; ?refresh=true recomputes it first.
     """
     if not request.user.is_superuser:
         return Response({'error': 'Super Admin access required'}, status=status.HTTP_403_FORBIDDEN)
         
     try:
-        from apps.payroll.models import PaySlip
-        from apps.subscriptions.models import Subscription
-        
-        total_organizations = Organization.objects.filter(is_parent=True).count()
-        total_employees = Employee.objects.count()
-        total_active_employees = Employee.objects.filter(status='active').count()
-        
-        # Payroll stats (Global)
-        now = timezone.now()
-        current_month_payroll = PaySlip.objects.filter(
-            payroll_period__month=now.month,
-            payroll_period__year=now.year
-        ).aggregate(
-            total_net=Sum('net_salary'),
-            count=Count('id')
-        )
-        
-        # Onboarding status
-        pending_verifications = Organization.objects.filter(is_verified=False).count()
-        
-        # Subscription stats
-        active_subscriptions = Subscription.objects.filter(status='active').count()
-        trial_subscriptions = Subscription.objects.filter(status='trial').count()
-        
-        # Growth Data (Mocked for sparklines/charts if needed)
-        # In a real app, we'd aggregate over the last 6 months
-        
+        metrics, snapshot = stats.get_snapshot(refresh=_wants_refresh(request))
         data = {
-            'overview': {
-                'total_organizations': total_organizations,
-                'total_employees': total_employees,
-                'active_employees': total_active_employees,
-                'pending_verifications': pending_verifications,
-            },
-            'payroll': {
-                'current_month_total': float(current_month_payroll['total_net'] or 0),
-                'current_month_count': current_month_payroll['count'] or 0,
-            },
-            'subscriptions': {
-                'active': active_subscriptions,
-                'trial': trial_subscriptions,
-            },
+            **metrics,
+            'snapshot': snapshot,
             'system_health': {
                 'status': 'Healthy',
                 'uptime': '99.9%',
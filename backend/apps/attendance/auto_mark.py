@@ -0,0 +1,140 @@
+"""
+Materialises attendance rows for days on which employees never punched.
+
+For every active employee without a row on a past day, the status is taken
+from (in order) the working-day calendar of their shift pattern (holiday,
+week_off), approved leave (on_leave) and finally the policy's
+auto_mark_absent flag (absent). Rows are inserted with
+bulk_create(ignore_conflicts=True) and flagged is_auto_marked, so re-running
+a day or a whole range is harmless.
+"""
+from datetime import timedelta
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from apps.accounts.models import Employee
+from . import work_calendar
+from .counters import AttendanceCounters
+from .models import Attendance, AttendancePolicy, EmployeeShiftAssignment
+
+BATCH_SIZE = 1000
+
+CALENDAR_STATUS = {
+    work_calendar.HOLIDAY: 'holiday',
+    work_calendar.WEEK_OFF: 'week_off',
+}
+
+
+class AutoMarkService:
+    @staticmethod
+    def mark_range(company_id, start, end):
+        """Mark every day in [start, end]; days from today on are skipped."""
+        last = min(end, timezone.localdate() - timedelta(days=1))
+        marker = _CompanyMarker(company_id, start, last)
+        created = {}
+        day = start
+        while day <= last:
+            created[day] = marker.mark_day(day)
+            day += timedelta(days=1)
+        return created
+
+    @staticmethod
+    def mark_day(company_id, day):
+        return AutoMarkService.mark_range(company_id, day, day).get(day, 0)
+
+
+class _CompanyMarker:
+    """Per-company state loaded once for a backfill range."""
+
+    def __init__(self, company_id, start, end):
+        from apps.leave.models import LeaveRequest
+
+        self.company_id = company_id
+        policy = AttendancePolicy.objects.filter(company_id=company_id, is_active=True).first()
+        self.mark_absent = policy.auto_mark_absent if policy else True
+        self.default_weekdays = work_calendar.company_weekdays(company_id)
+
+        # employee_id -> [assignment, ...] newest first
+        self.assignments = {}
+        queryset = EmployeeShiftAssignment.objects.filter(
+            employee__company_id=company_id,
+            is_active=True,
+            effective_from__lte=end
+        ).filter(
+            Q(effective_to__isnull=True) | Q(effective_to__gte=start)
+        ).select_related('shift').order_by('-effective_from')
+        for assignment in queryset:
+            self.assignments.setdefault(assignment.employee_id, []).append(assignment)
+
+        # employee_id -> [(start, end), ...]
+        self.leaves = {}
+        leave_ranges = LeaveRequest.objects.filter(
+            employee__company_id=company_id,
+            status='approved',
+            start_date__lte=end,
+            end_date__gte=start
+        ).values_list('employee_id', 'start_date', 'end_date')
+        for employee_id, leave_start, leave_end in leave_ranges:
+            self.leaves.setdefault(employee_id, []).append((leave_start, leave_end))
+
+    def _assignment(self, employee_id, day):
+        for assignment in self.assignments.get(employee_id, ()):
+            if assignment.effective_from <= day and (
+                assignment.effective_to is None or assignment.effective_to >= day
+            ):
+                return assignment
+        return None
+
+    def _on_leave(self, employee_id, day):
+        return any(start <= day <= end for start, end in self.leaves.get(employee_id, ()))
+
+    def _status(self, employee_id, day, assignment):
+        weekdays = work_calendar.shift_weekdays(assignment.shift) if assignment else None
+        calendar = work_calendar.get_calendar(self.company_id, day.year, weekdays or self.default_weekdays)
+        status = CALENDAR_STATUS.get(calendar.code(day))
+        if status:
+            return status
+        if self._on_leave(employee_id, day):
+            return 'on_leave'
+        if self.mark_absent:
+            return 'absent'
+        return None
+
+    def mark_day(self, day):
+        has_row = Attendance.objects.filter(employee=OuterRef('pk'), date=day)
+        missing = Employee.objects.filter(
+            company_id=self.company_id,
+            status='active',
+            date_of_joining__lte=day
+        ).filter(~Exists(has_row)).values_list('id', flat=True)
+
+        rows = []
+        for employee_id in missing.iterator(chunk_size=BATCH_SIZE):
+            assignment = self._assignment(employee_id, day)
+            status = self._status(employee_id, day, assignment)
+            if status is None:
+                continue
+            rows.append(Attendance(
+                employee_id=employee_id,
+                date=day,
+                shift=assignment.shift if assignment else None,
+                status=status,
+                is_auto_marked=True,
+                remarks='Auto-marked'
+            ))
+
+        if not rows:
+            return 0
+        # A punch that lands between the read and the insert wins
+        Attendance.objects.bulk_create(rows, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        AttendanceCounters.invalidate(self.company_id, day)
+
+        # ignore_conflicts hides skipped rows; count what was actually written
+        employee_ids = [row.employee_id for row in rows]
+        return sum(
+            Attendance.objects.filter(
+                date=day, is_auto_marked=True, employee_id__in=employee_ids[start:start + BATCH_SIZE]
+            ).count()
+            for start in range(0, len(employee_ids), BATCH_SIZE)
+        )
@@ -0,0 +1,149 @@
+"""
+Per-company, per-day attendance counters kept in the cache backend.
+
+Dashboards read these instead of counting Attendance rows on every load.
+Write paths (check-in/out, breaks, bulk mark) apply deltas with atomic
+``cache.incr``; anything else that edits attendance invalidates the day and
+the next read rebuilds it from the database with one grouped query.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+COUNTER_NAMES = (
+    'total', 'present', 'absent', 'half_day', 'on_leave',
+    'late', 'on_time', 'checked_in', 'on_break',
+)
+
+CACHE_KEY = 'attendance:counters:{company_id}:{day}:{name}'
+
+# Counters are a cache, not a ledger: expire them so that edits made outside
+# the instrumented paths (admin, shell) are picked up eventually.
+CACHE_TIMEOUT = 10 * 60
+
+
+def _key(company_id, day, name):
+    return CACHE_KEY.format(company_id=company_id, day=str(day), name=name)
+
+
+def row_counters(status, is_late, check_in_time):
+    """Counters a single attendance row contributes to."""
+    names = {'total'}
+    if status in ('present', 'absent', 'half_day', 'on_leave'):
+        names.add(status)
+    if is_late:
+        names.add('late')
+    if status == 'present' and not is_late:
+        names.add('on_time')
+    if check_in_time:
+        names.add('checked_in')
+    return names
+
+
+def snapshot(attendance):
+    """Capture the counter-relevant state of a row before it is modified."""
+    if attendance is None or attendance._state.adding:
+        return set()
+    return row_counters(attendance.status, attendance.is_late, attendance.check_in_time)
+
+
+class AttendanceCounters:
+    @staticmethod
+    def get(company_id, day):
+        return AttendanceCounters.get_range(company_id, [day])[day]
+
+    @staticmethod
+    def get_range(company_id, days):
+        """Counters for several days; missing days are rebuilt together."""
+        keys = {
+            _key(company_id, day, name): (day, name)
+            for day in days for name in COUNTER_NAMES
+        }
+        cached = cache.get_many(keys.keys())
+
+        result = {day: {} for day in days}
+        for key, value in cached.items():
+            day, name = keys[key]
+            result[day][name] = value
+
+        missing = [day for day in days if len(result[day]) < len(COUNTER_NAMES)]
+        if missing:
+            result.update(AttendanceCounters.rebuild(company_id, missing))
+        return result
+
+    @staticmethod
+    def rebuild(company_id, days):
+        """Recount the given days from the database and store them."""
+        from .models import Attendance, AttendanceBreak
+
+        counts = {day: dict.fromkeys(COUNTER_NAMES, 0) for day in days}
+
+        rows = Attendance.objects.filter(
+            employee__company_id=company_id,
+            date__in=days
+        ).values('date').annotate(
+            total=Count('id'),
+            present=Count('id', filter=Q(status='present')),
+            absent=Count('id', filter=Q(status='absent')),
+            half_day=Count('id', filter=Q(status='half_day')),
+            on_leave=Count('id', filter=Q(status='on_leave')),
+            late=Count('id', filter=Q(is_late=True)),
+            on_time=Count('id', filter=Q(status='present', is_late=False)),
+            checked_in=Count('id', filter=Q(check_in_time__isnull=False)),
+        )
+        for row in rows:
+            day = row.pop('date')
+            counts[day].update(row)
+
+        breaks = AttendanceBreak.objects.filter(
+            attendance__employee__company_id=company_id,
+            attendance__date__in=days,
+            break_end__isnull=True
+        ).values('attendance__date').annotate(open_breaks=Count('id'))
+        for row in breaks:
+            counts[row['attendance__date']]['on_break'] = row['open_breaks']
+
+        cache.set_many(
+            {
+                _key(company_id, day, name): value
+                for day, values in counts.items()
+                for name, value in values.items()
+            },
+            CACHE_TIMEOUT
+        )
+        return counts
+
+    @staticmethod
+    def apply(company_id, day, deltas):
+        """
+        Atomically add ``deltas`` ({name: +/-n}) once the current transaction
+        commits. A missing key means the day is not cached; the next read
+        rebuilds it from the committed rows, so the delta is simply dropped.
+        """
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        def _apply():
+            for name, delta in deltas.items():
+                try:
+                    cache.incr(_key(company_id, day, name), delta)
+                except ValueError:
+                    AttendanceCounters.invalidate(company_id, day)
+                    return
+
+        transaction.on_commit(_apply)
+
+    @staticmethod
+    def record_change(company_id, day, before, attendance):
+        """Apply the difference between a row's old and new counter sets."""
+        after = row_counters(attendance.status, attendance.is_late, attendance.check_in_time)
+        deltas = {name: 1 for name in after - before}
+        deltas.update({name: -1 for name in before - after})
+        AttendanceCounters.apply(company_id, day, deltas)
+
+    @staticmethod
+    def invalidate(company_id, day):
+        transaction.on_commit(
+            lambda: cache.delete_many([_key(company_id, day, name) for name in COUNTER_NAMES])
+        )
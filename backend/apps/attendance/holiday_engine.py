@@ -1,108 +1,122 @@
 import os
 import json
-import holidays
+import logging
+from collections import namedtuple
 from datetime import date
+from functools import lru_cache
+from types import MappingProxyType
+
+try:
+    import holidays
+except ImportError:
+    holidays = None
+
+logger = logging.getLogger(__name__)
 
 # Get the directory of the current file
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 JSON_FILE = os.path.join(BASE_DIR, 'holidays_india.json')
 
+# Map of full state names to library codes
+STATE_CODE_MAP = {
+    'Andhra Pradesh': 'AP', 'Arunachal Pradesh': 'AR', 'Assam': 'AS', 'Bihar': 'BR',
+    'Chhattisgarh': 'CT', 'Goa': 'GA', 'Gujarat': 'GJ', 'Haryana': 'HR',
+    'Himachal Pradesh': 'HP', 'Jharkhand': 'JH', 'Karnataka': 'KA', 'Kerala': 'KL',
+    'Madhya Pradesh': 'MP', 'Maharashtra': 'MH', 'Manipur': 'MN', 'Meghalaya': 'ML',
+    'Mizoram': 'MZ', 'Nagaland': 'NL', 'Odisha': 'OR', 'Punjab': 'PB',
+    'Rajasthan': 'RJ', 'Sikkim': 'SK', 'Tamil Nadu': 'TN', 'Telangana': 'TG',
+    'Tripura': 'TR', 'Uttar Pradesh': 'UP', 'Uttarakhand': 'UT', 'West Bengal': 'WB',
+    'Andaman and Nicobar Islands': 'AN', 'Chandigarh': 'CH',
+    'Dadra and Nagar Haveli and Daman and Diu': 'DN', 'Delhi': 'DL',
+    'Jammu and Kashmir': 'JK', 'Ladakh': 'LA', 'Lakshadweep': 'LD', 'Puducherry': 'PY'
+}
+
+HolidayEntry = namedtuple('HolidayEntry', ['date', 'name', 'type', 'description'])
+
+# One year of the JSON mirror: national and state -> ((date, name), ...)
+YearCatalogue = namedtuple('YearCatalogue', ['national', 'regional'])
+
+EMPTY_YEAR = YearCatalogue(national=(), regional=MappingProxyType({}))
+
+
+def _entries(year, items):
+    return tuple((date(year, h['month'], h['day']), h['name']) for h in items)
+
+
+@lru_cache(maxsize=1)
+def load_catalogue():
+    """Parse the JSON mirror once into a read-only year -> YearCatalogue index."""
+    if not os.path.exists(JSON_FILE):
+        return MappingProxyType({})
+    try:
+        with open(JSON_FILE, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error("Error reading holiday JSON: %s", e)
+        return MappingProxyType({})
+
+    catalogue = {}
+    for year_str, year_data in data.items():
+        year = int(year_str)
+        catalogue[year] = YearCatalogue(
+            national=_entries(year, year_data.get('national', [])),
+            regional=MappingProxyType({
+                state: _entries(year, items)
+                for state, items in year_data.get('regional', {}).items()
+            })
+        )
+    return MappingProxyType(catalogue)
+
+
+@lru_cache(maxsize=256)
+def library_holidays(year, subdiv=None):
+    """((date, name), ...) from the 'holidays' library, memoized per (subdiv, year)."""
+    if holidays is None:
+        return ()
+    try:
+        calendar = holidays.country_holidays('IN', subdiv=subdiv, years=year)
+    except Exception as e:
+        logger.error("Error using holidays library: %s", e)
+        return ()
+    return tuple(sorted(calendar.items()))
+
+
 def get_indian_holidays(year, states=None, include_national=True):
     """
     Fetch holidays using a hybrid approach:
     1. High-accuracy local JSON mirror for main public holidays.
     2. Fallback to 'holidays' library for specific state rules if not in JSON.
+
+    Returns a tuple of HolidayEntry sorted by date.
     """
-    year_str = str(year)
+    year = int(year)
     all_holidays = []
-    seen_dates = {} # date: name
-    
-    # 1. Load from accurate JSON mirror first
-    if os.path.exists(JSON_FILE):
-        try:
-            with open(JSON_FILE, 'r') as f:
-                data = json.load(f)
-                
-            if year_str in data:
-                year_data = data[year_str]
-                
-                # Fetch National
-                if include_national:
-                    for h in year_data.get('national', []):
-                        date_str = f"{year}-{str(h['month']).zfill(2)}-{str(h['day']).zfill(2)}"
-                        all_holidays.append({
-                            'name': h['name'],
-                            'date': date_str,
-                            'type': 'public',
-                            'description': 'National Holiday'
-                        })
-                        seen_dates[date_str] = h['name']
-                
-                # Fetch Regional from JSON if specified
-                if states:
-                    for state in states:
-                        if state in year_data.get('regional', {}):
-                            for h in year_data['regional'][state]:
-                                date_str = f"{year}-{str(h['month']).zfill(2)}-{str(h['day']).zfill(2)}"
-                                if date_str not in seen_dates:
-                                    all_holidays.append({
-                                        'name': h['name'],
-                                        'date': date_str,
-                                        'type': 'public',
-                                        'description': f"{state} State Holiday"
-                                    })
-                                    seen_dates[date_str] = h['name']
-        except Exception as e:
-            print(f"Error reading holiday JSON: {e}")
-
-    # 2. Fallback/Augment with 'holidays' library for missing pieces
-    # If the JSON didn't cover everything or we want the library's logic
-    try:
-        # Fetch library national if include_national is true but somehow JSON failed
-        if include_national and not seen_dates:
-            lib_hols = holidays.country_holidays('IN', years=year)
-            for date_obj, name in lib_hols.items():
-                date_str = date_obj.strftime('%Y-%m-%d')
-                if date_str not in seen_dates:
-                    all_holidays.append({
-                        'name': name,
-                        'date': date_str,
-                        'type': 'public',
-                        'description': 'National Holiday'
-                    })
-                    seen_dates[date_str] = name
-                    
-        # Fetch library state holidays for any states requested
-        if states:
-            # Map of full state names to library codes
-            STATE_CODE_MAP = {
-                'Andhra Pradesh': 'AP', 'Arunachal Pradesh': 'AR', 'Assam': 'AS', 'Bihar': 'BR',
-                'Chhattisgarh': 'CT', 'Goa': 'GA', 'Gujarat': 'GJ', 'Haryana': 'HR',
-                'Himachal Pradesh': 'HP', 'Jharkhand': 'JH', 'Karnataka': 'KA', 'Kerala': 'KL',
-                'Madhya Pradesh': 'MP', 'Maharashtra': 'MH', 'Manipur': 'MN', 'Meghalaya': 'ML',
-                'Mizoram': 'MZ', 'Nagaland': 'NL', 'Odisha': 'OR', 'Punjab': 'PB',
-                'Rajasthan': 'RJ', 'Sikkim': 'SK', 'Tamil Nadu': 'TN', 'Telangana': 'TG',
-                'Tripura': 'TR', 'Uttar Pradesh': 'UP', 'Uttarakhand': 'UT', 'West Bengal': 'WB',
-                'Andaman and Nicobar Islands': 'AN', 'Chandigarh': 'CH',
-                'Dadra and Nagar Haveli and Daman and Diu': 'DN', 'Delhi': 'DL',
-                'Jammu and Kashmir': 'JK', 'Ladakh': 'LA', 'Lakshadweep': 'LD', 'Puducherry': 'PY'
-            }
-            
-            for state_name in states:
-                code = STATE_CODE_MAP.get(state_name)
-                if code:
-                    lib_state_hols = holidays.country_holidays('IN', subdiv=code, years=year)
-                    for date_obj, name in lib_state_hols.items():
-                        date_str = date_obj.strftime('%Y-%m-%d')
-                        if date_str not in seen_dates:
-                            all_holidays.append({
-                                'name': name,
-                                'date': date_str,
-                                'type': 'public',
-                                'description': f"{state_name} State Holiday"
-                            })
-                            seen_dates[date_str] = name
-    except Exception as e:
-        print(f"Error using holidays library: {e}")
+    seen_dates = set()
+
+    def add(day, name, description):
+        if day not in seen_dates:
+            all_holidays.append(HolidayEntry(day, name, 'public', description))
+            seen_dates.add(day)
+
+    # 1. Accurate JSON mirror first
+    year_data = load_catalogue().get(year, EMPTY_YEAR)
+    if include_national:
+        for day, name in year_data.national:
+            add(day, name, 'National Holiday')
+    for state in states or ():
+        for day, name in year_data.regional.get(state, ()):
+            add(day, name, f"{state} State Holiday")
+
+    # 2. Library national only if the JSON had nothing for this year
+    if include_national and not seen_dates:
+        for day, name in library_holidays(year):
+            add(day, name, 'National Holiday')
+
+    # Library state holidays for any states requested
+    for state in states or ():
+        code = STATE_CODE_MAP.get(state)
+        if code:
+            for day, name in library_holidays(year, code):
+                add(day, name, f"{state} State Holiday")
 
-    return sorted(all_holidays, key=lambda x: x['date'])
+    return tuple(sorted(all_holidays, key=lambda h: h.date))
@@ -0,0 +1,55 @@
+"""
+Nightly job that writes absent / week_off / holiday / on_leave rows for days
+without attendance. Defaults to yesterday; pass a range to backfill.
+Usage: python manage.py auto_mark_attendance [--company <uuid>] [--date 2026-03-01 | --from 2026-03-01 --to 2026-03-31]
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.accounts.models import Organization
+from apps.attendance.auto_mark import AutoMarkService
+
+
+class Command(BaseCommand):
+    help = 'Materialises attendance rows for days on which employees never punched'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Only this company id')
+        parser.add_argument('--date', help='Single day (YYYY-MM-DD); defaults to yesterday')
+        parser.add_argument('--from', dest='start', help='Backfill start (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='end', help='Backfill end (YYYY-MM-DD); defaults to yesterday')
+
+    def handle(self, *args, **options):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        if options.get('start'):
+            start = self._parse(options['start'])
+            end = self._parse(options['end']) if options.get('end') else yesterday
+        else:
+            start = end = self._parse(options['date']) if options.get('date') else yesterday
+        if start > end:
+            raise CommandError('--from must not be after --to')
+
+        if options.get('company'):
+            company_ids = [options['company']]
+        else:
+            company_ids = Organization.objects.filter(is_active=True).values_list('id', flat=True)
+
+        total = 0
+        for company_id in list(company_ids):
+            try:
+                created = AutoMarkService.mark_range(company_id, start, end)
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f'Failed to auto-mark company {company_id}: {e}'))
+                continue
+            total += sum(created.values())
+
+        self.stdout.write(self.style.SUCCESS(f'Auto-marked {total} attendance rows from {start} to {end}.'))
+
+    def _parse(self, value):
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError(f'Invalid date: {value}')
+        return parsed
@@ -0,0 +1,36 @@
+"""
+Recomputes stored monthly overtime rollups (employee, department, shift).
+Usage: python manage.py compute_overtime_summaries [--company <uuid>] [--year 2026 --month 3]
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.accounts.models import Organization
+from apps.attendance.overtime import OvertimeService
+
+
+class Command(BaseCommand):
+    help = 'Recomputes monthly overtime rollups for one or all companies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Only this company id')
+        parser.add_argument('--year', type=int, help='Defaults to the current year')
+        parser.add_argument('--month', type=int, help='Defaults to the current month')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        year = options.get('year') or today.year
+        month = options.get('month') or today.month
+
+        if options.get('company'):
+            company_ids = [options['company']]
+        else:
+            company_ids = Organization.objects.filter(is_active=True).values_list('id', flat=True)
+
+        for company_id in list(company_ids):
+            try:
+                rows = OvertimeService.compute_month(company_id, year, month)
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f'Failed to compute overtime for company {company_id}: {e}'))
+                continue
+            self.stdout.write(f'{company_id}: {len(rows)} rollup rows for {year}-{month:02d}')
@@ -0,0 +1,103 @@
+# Generated by Django 4.2.27 on 2026-10-19 01:26
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0019_employee_company_status_name_index"),
+        ("attendance", "0011_merge_20260404_1439"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OvertimeSummary",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("year", models.PositiveIntegerField()),
+                (
+                    "month",
+                    models.PositiveIntegerField(
+                        validators=[
+                            django.core.validators.MinValueValidator(1),
+                            django.core.validators.MaxValueValidator(12),
+                        ]
+                    ),
+                ),
+                (
+                    "dimension",
+                    models.CharField(
+                        choices=[
+                            ("employee", "Employee"),
+                            ("department", "Department"),
+                            ("shift", "Shift"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        blank=True,
+                        help_text="Employee/department/shift id; blank when unassigned",
+                        max_length=64,
+                    ),
+                ),
+                ("label", models.CharField(max_length=255)),
+                (
+                    "days",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Attendance days with overtime"
+                    ),
+                ),
+                (
+                    "eligible_hours",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=9),
+                ),
+                (
+                    "approved_hours",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=9),
+                ),
+                (
+                    "paid_hours",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=9),
+                ),
+                (
+                    "computed_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="overtime_summaries",
+                        to="accounts.company",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Overtime Summaries",
+                "ordering": ["-paid_hours"],
+                "indexes": [
+                    models.Index(
+                        fields=["company", "year", "month", "dimension"],
+                        name="attendance__company_e07d91_idx",
+                    )
+                ],
+                "unique_together": {("company", "year", "month", "dimension", "key")},
+            },
+        ),
+    ]
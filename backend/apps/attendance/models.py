@@ -3,11 +3,18 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.db.models import Q, Sum, Count, Avg
-from datetime import datetime, timedelta, time
+from datetime import date, datetime, timedelta, time
 import uuid
 
 from apps.accounts.models import Employee, Company, Department
 
+# Marker for "policy not supplied" so that callers can pass None for companies
+# without an active policy.
+POLICY_NOT_LOADED = object()
+
+# Same for the approved overtime hours of the day (None = no approved request)
+APPROVAL_NOT_LOADED = object()
+
 
 class AttendancePolicy(models.Model):
     """Company-wide or department-specific attendance policies"""
@@ -214,19 +221,16 @@ class AttendancePolicy(models.Model):
         
         return total_hours - break_hours
 
+    @property
+    def working_weekdays(self):
+        """Working weekdays (0=Monday) for the selected working_days option"""
+        from .work_calendar import policy_weekdays
+        return policy_weekdays(self)
+
     def is_working_day(self, date):
-        """Check if given date is a working day"""
-        weekday = date.weekday()  # 0=Monday, 6=Sunday
-        day_map = {
-            0: self.monday,
-            1: self.tuesday,
-            2: self.wednesday,
-            3: self.thursday,
-            4: self.friday,
-            5: self.saturday,
-            6: self.sunday,
-        }
-        return day_map.get(weekday, False)
+        """Check if given date is a working day (holidays included)"""
+        from . import work_calendar
+        return work_calendar.is_working_day(self.company_id, date, self.working_weekdays)
 
 
 class Shift(models.Model):
@@ -294,15 +298,20 @@ class Shift(models.Model):
 
     def get_shift_duration(self):
         """Calculate shift duration in hours"""
-        start = datetime.combine(datetime.today(), self.start_time)
-        end = datetime.combine(datetime.today(), self.end_time)
+        return Shift.duration_hours(self.start_time, self.end_time, self.break_duration_minutes)
+
+    @staticmethod
+    def duration_hours(start_time, end_time, break_duration_minutes):
+        """Shift duration in hours from raw column values"""
+        start = datetime.combine(datetime.today(), start_time)
+        end = datetime.combine(datetime.today(), end_time)
         
         # Handle overnight shifts
         if end < start:
             end += timedelta(days=1)
         
         duration_seconds = (end - start).total_seconds()
-        break_seconds = self.break_duration_minutes * 60
+        break_seconds = break_duration_minutes * 60
         
         return (duration_seconds - break_seconds) / 3600
 
@@ -440,10 +449,17 @@ class Attendance(models.Model):
     def __str__(self):
         return f"{self.employee.full_name} - {self.date} - {self.status}"
 
-    def calculate_hours(self):
-        """Calculate total working hours and overtime"""
+    def calculate_hours(self, policy=POLICY_NOT_LOADED, refresh_breaks=True,
+                        approved_overtime=APPROVAL_NOT_LOADED):
+        """
+        Calculate total working hours and overtime.
+
+        Batch callers can pass the company's active ``policy``, the day's
+        ``approved_overtime`` hours and ``refresh_breaks=False`` to skip the
+        per-row lookups.
+        """
         # Recalculate break hours from related AttendanceBreak objects
-        if self.pk:
+        if refresh_breaks and self.pk:
             total_break_seconds = 0
             completed_breaks = self.breaks.filter(break_end__isnull=False)
             for brk in completed_breaks:
@@ -466,7 +482,8 @@ class Attendance(models.Model):
             self.overtime_hours = 0.0
             
             # Calculate overtime if shift is assigned
-            policy = self.employee.company.attendance_policies.filter(is_active=True).first()
+            if policy is POLICY_NOT_LOADED:
+                policy = self.employee.company.attendance_policies.filter(is_active=True).first()
             if self.shift and policy and policy.overtime_applicable:
                 expected_hours = float(self.shift.get_shift_duration())
                 overtime_threshold = float(policy.overtime_after_minutes / 60) if policy.overtime_after_minutes else expected_hours
@@ -480,16 +497,17 @@ class Attendance(models.Model):
                         
                         # Apply pre-approval rule
                         if policy.require_overtime_pre_approval:
-                            approved_request = OvertimeRequest.objects.filter(
-                                employee=self.employee,
-                                date=self.date,
-                                status='approved'
-                            ).first()
+                            if approved_overtime is APPROVAL_NOT_LOADED:
+                                approved_overtime = OvertimeRequest.objects.filter(
+                                    employee_id=self.employee_id,
+                                    date=self.date,
+                                    status='approved'
+                                ).values_list('hours_requested', flat=True).first()
                             
-                            if approved_request:
+                            if approved_overtime is not None:
                                 # Credit overtime up to requested hours if specifically restricted, 
                                 # but usually we credit actual worked hours if approved for that day
-                                self.overtime_hours = round(min(potential_ot, float(approved_request.hours_requested)), 2)
+                                self.overtime_hours = round(min(potential_ot, float(approved_overtime)), 2)
                         else:
                             # Direct credit
                             self.overtime_hours = round(potential_ot, 2)
@@ -501,7 +519,6 @@ class Attendance(models.Model):
             # Determine status based on hours ONLY if in a auto-calculable state
             # and NOT manually regularized/overridden by an admin
             if self.status in ['present', 'half_day', 'absent'] and not self.is_regularized:
-                policy = self.employee.company.attendance_policies.filter(is_active=True).first()
                 if policy:
                     if self.total_hours >= float(policy.full_day_hours):
                         self.status = 'present'
@@ -768,6 +785,41 @@ class OvertimeRequest(models.Model):
         return f"{self.employee.full_name} - {self.date} - {self.hours_requested}h - {self.status}"
 
 
+class OvertimeSummary(models.Model):
+    """Monthly overtime rollup per employee, department or shift"""
+    DIMENSION_CHOICES = (
+        ('employee', 'Employee'),
+        ('department', 'Department'),
+        ('shift', 'Shift'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='overtime_summaries')
+    year = models.PositiveIntegerField()
+    month = models.PositiveIntegerField(validators=[MinValueValidator(1), MaxValueValidator(12)])
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=64, blank=True, help_text='Employee/department/shift id; blank when unassigned')
+    label = models.CharField(max_length=255)
+
+    days = models.PositiveIntegerField(default=0, help_text='Attendance days with overtime')
+    eligible_hours = models.DecimalField(max_digits=9, decimal_places=2, default=0.0)
+    approved_hours = models.DecimalField(max_digits=9, decimal_places=2, default=0.0)
+    paid_hours = models.DecimalField(max_digits=9, decimal_places=2, default=0.0)
+
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('company', 'year', 'month', 'dimension', 'key')
+        ordering = ['-paid_hours']
+        indexes = [
+            models.Index(fields=['company', 'year', 'month', 'dimension']),
+        ]
+        verbose_name_plural = 'Overtime Summaries'
+
+    def __str__(self):
+        return f"{self.label} - {self.year}-{self.month:02d} - {self.paid_hours}h"
+
+
 class AttendanceSummary(models.Model):
     """Monthly attendance summary for employees"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -810,9 +862,14 @@ class AttendanceSummary(models.Model):
     def __str__(self):
         return f"{self.employee.full_name} - {self.year}-{self.month:02d}"
 
-    def calculate_summary(self):
-        """Calculate attendance summary for the month"""
+    def calculate_summary(self, weekdays=None):
+        """
+        Calculate attendance summary for the month. Working days, holidays
+        and week offs come from the company calendar for the employee's
+        weekly pattern (pass ``weekdays`` to skip looking it up).
+        """
         from calendar import monthrange
+        from . import work_calendar
         
         # Get all attendance records for the month
         attendances = Attendance.objects.filter(
@@ -821,29 +878,34 @@ class AttendanceSummary(models.Model):
             date__month=self.month
         )
         
-        # Calculate counts
-        self.present_days = attendances.filter(status='present').count()
-        self.absent_days = attendances.filter(status='absent').count()
-        self.half_days = attendances.filter(status='half_day').count()
-        self.leave_days = attendances.filter(status='on_leave').count()
-        self.holidays = attendances.filter(status='holiday').count()
-        self.week_offs = attendances.filter(status='week_off').count()
-        
-        # Calculate hours
-        self.total_hours_worked = attendances.aggregate(
-            total=Sum('total_hours')
-        )['total'] or 0
-        self.overtime_hours = attendances.aggregate(
-            total=Sum('overtime_hours')
-        )['total'] or 0
-        
-        # Calculate late/early
-        self.late_arrivals = attendances.filter(is_late=True).count()
-        self.early_departures = attendances.filter(is_early_departure=True).count()
+        totals = attendances.aggregate(
+            present=Count('id', filter=Q(status='present')),
+            absent=Count('id', filter=Q(status='absent')),
+            half_day=Count('id', filter=Q(status='half_day')),
+            on_leave=Count('id', filter=Q(status='on_leave')),
+            late=Count('id', filter=Q(is_late=True)),
+            early=Count('id', filter=Q(is_early_departure=True)),
+            hours=Sum('total_hours'),
+            overtime=Sum('overtime_hours'),
+        )
+        self.present_days = totals['present']
+        self.absent_days = totals['absent']
+        self.half_days = totals['half_day']
+        self.leave_days = totals['on_leave']
+        self.total_hours_worked = totals['hours'] or 0
+        self.overtime_hours = totals['overtime'] or 0
+        self.late_arrivals = totals['late']
+        self.early_departures = totals['early']
         
-        # Calculate total working days (excluding holidays and week offs)
-        total_days = monthrange(self.year, self.month)[1]
-        self.total_working_days = total_days - self.holidays - self.week_offs
+        # Working days, holidays and week offs from the calendar
+        if weekdays is None:
+            weekdays = work_calendar.employee_weekdays(self.employee)
+        calendar = work_calendar.get_calendar(self.employee.company_id, self.year, weekdays)
+        month_start = date(self.year, self.month, 1)
+        month_end = date(self.year, self.month, monthrange(self.year, self.month)[1])
+        self.total_working_days = calendar.count(month_start, month_end, work_calendar.WORKING)
+        self.holidays = calendar.count(month_start, month_end, work_calendar.HOLIDAY)
+        self.week_offs = calendar.count(month_start, month_end, work_calendar.WEEK_OFF)
         
         # Calculate attendance percentage
         if self.total_working_days > 0:
@@ -0,0 +1,149 @@
+"""
+Monthly overtime computation.
+
+One grouped query over a company-month of attendance, LEFT JOINed to the
+approved OvertimeRequest of the same employee and day, yields per
+(employee, department, shift) totals. These are rolled up and stored in
+OvertimeSummary so dashboards read a handful of rows.
+
+- eligible: overtime credited on the attendance row by the policy rules
+- approved: hours on the approved request for that day
+- paid: eligible, capped at approved when the policy requires pre-approval
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, FilteredRelation, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Least
+from django.utils import timezone
+
+from .models import Attendance, AttendancePolicy, OvertimeSummary
+
+# Rollups older than this are recomputed on read (attendance edits do not
+# invalidate them; approvals do)
+SUMMARY_MAX_AGE = timedelta(minutes=15)
+
+ZERO = Value(Decimal('0'), output_field=DecimalField(max_digits=9, decimal_places=2))
+
+
+def _full_name(*parts):
+    return ' '.join(filter(None, parts))
+
+
+class OvertimeService:
+    @staticmethod
+    def month_rows(company_id, year, month):
+        """Totals grouped by (employee, department, shift) in one query."""
+        policy = AttendancePolicy.objects.filter(company_id=company_id, is_active=True).first()
+        approved = Coalesce('approval__hours_requested', ZERO)
+        if policy and policy.require_overtime_pre_approval:
+            paid = Least(F('overtime_hours'), approved)
+        else:
+            paid = F('overtime_hours')
+
+        return Attendance.objects.filter(
+            employee__company_id=company_id,
+            date__year=year,
+            date__month=month
+        ).annotate(
+            approval=FilteredRelation(
+                'employee__overtime_requests',
+                condition=Q(
+                    employee__overtime_requests__date=F('date'),
+                    employee__overtime_requests__status='approved'
+                )
+            )
+        ).values(
+            'employee_id', 'employee__first_name', 'employee__middle_name', 'employee__last_name',
+            'employee__department_id', 'employee__department__name',
+            'shift_id', 'shift__name',
+        ).annotate(
+            days=Count('id', filter=Q(overtime_hours__gt=0)),
+            eligible=Coalesce(Sum('overtime_hours'), ZERO),
+            approved=Coalesce(Sum(approved), ZERO),
+            paid=Coalesce(Sum(paid), ZERO),
+        ).order_by()
+
+    @staticmethod
+    def compute_month(company_id, year, month):
+        """Recompute and store every rollup of the company-month."""
+        totals = {}
+
+        def add(dimension, key, label, row):
+            entry = totals.get((dimension, key))
+            if entry is None:
+                entry = totals[(dimension, key)] = OvertimeSummary(
+                    company_id=company_id, year=year, month=month,
+                    dimension=dimension, key=key, label=label,
+                    days=0, eligible_hours=0, approved_hours=0, paid_hours=0
+                )
+            entry.days += row['days']
+            entry.eligible_hours += row['eligible']
+            entry.approved_hours += row['approved']
+            entry.paid_hours += row['paid']
+
+        for row in OvertimeService.month_rows(company_id, year, month):
+            add('employee', str(row['employee_id']), _full_name(
+                row['employee__first_name'], row['employee__middle_name'], row['employee__last_name']
+            ), row)
+            add('department', str(row['employee__department_id'] or ''),
+                row['employee__department__name'] or 'Unassigned', row)
+            add('shift', str(row['shift_id'] or ''), row['shift__name'] or 'No Shift', row)
+
+        now = timezone.now()
+        for entry in totals.values():
+            entry.computed_at = now
+
+        with transaction.atomic():
+            OvertimeSummary.objects.filter(company_id=company_id, year=year, month=month).delete()
+            OvertimeSummary.objects.bulk_create(totals.values(), batch_size=500)
+        return list(totals.values())
+
+    @staticmethod
+    def get_rollup(company_id, year, month, dimension, refresh=False):
+        """Stored rollup rows for one dimension, recomputed when stale."""
+        rows = list(OvertimeSummary.objects.filter(
+            company_id=company_id, year=year, month=month, dimension=dimension
+        ))
+        stale = not rows or min(row.computed_at for row in rows) < timezone.now() - SUMMARY_MAX_AGE
+        if refresh or stale:
+            rows = [
+                row for row in OvertimeService.compute_month(company_id, year, month)
+                if row.dimension == dimension
+            ]
+            rows.sort(key=lambda row: row.paid_hours, reverse=True)
+        return rows
+
+    @staticmethod
+    def invalidate(company_id, day):
+        OvertimeSummary.objects.filter(company_id=company_id, year=day.year, month=day.month).delete()
+
+
+def with_attendance(queryset):
+    """
+    Annotate OvertimeRequests with the matching attendance row and the
+    company's daily overtime cap so OvertimeRequestSerializer needs no
+    per-row queries.
+    """
+    policy_cap = AttendancePolicy.objects.filter(
+        company_id=OuterRef('employee__company_id'),
+        is_active=True
+    ).order_by('-effective_from').values('max_overtime_per_day')[:1]
+
+    return queryset.annotate(
+        matched_attendance=FilteredRelation(
+            'employee__attendances',
+            condition=Q(employee__attendances__date=F('date'))
+        )
+    ).annotate(
+        attendance_id=F('matched_attendance__id'),
+        attendance_check_in=F('matched_attendance__check_in_time'),
+        attendance_check_out=F('matched_attendance__check_out_time'),
+        attendance_total_hours=F('matched_attendance__total_hours'),
+        attendance_overtime_hours=F('matched_attendance__overtime_hours'),
+        shift_start=F('matched_attendance__shift__start_time'),
+        shift_end=F('matched_attendance__shift__end_time'),
+        shift_break_minutes=F('matched_attendance__shift__break_duration_minutes'),
+        policy_max_overtime=Subquery(policy_cap),
+    )
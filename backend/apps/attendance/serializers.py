@@ -402,13 +402,30 @@ class OvertimeRequestSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['id', 'reviewed_by', 'reviewed_at', 'reviewer_comments', 'created_at', 'updated_at']
 
+    def _attendance(self, obj):
+        """
+        Matching attendance values for the request. Read from the annotations
+        added by ``overtime.with_attendance``; single objects fall back to one
+        query, cached on the instance.
+        """
+        if not hasattr(obj, 'attendance_id'):
+            from .overtime import with_attendance
+            annotated = with_attendance(OvertimeRequest.objects.filter(pk=obj.pk)).first()
+            for field in (
+                'attendance_id', 'attendance_check_in', 'attendance_check_out',
+                'attendance_total_hours', 'shift_start', 'shift_end',
+                'shift_break_minutes', 'policy_max_overtime',
+            ):
+                setattr(obj, field, getattr(annotated, field, None))
+        return obj
+
     def get_attendance_match(self, obj):
-        attendance = Attendance.objects.filter(employee=obj.employee, date=obj.date).first()
-        if attendance:
-            shift_start = attendance.shift.start_time.strftime('%H:%M') if attendance.shift else "09:00"
-            shift_end = attendance.shift.end_time.strftime('%H:%M') if attendance.shift else "17:00"
-            clock_in = timezone.localtime(attendance.check_in_time).strftime('%H:%M') if attendance.check_in_time else "None"
-            clock_out = timezone.localtime(attendance.check_out_time).strftime('%H:%M') if attendance.check_out_time else "None"
+        att = self._attendance(obj)
+        if att.attendance_id:
+            shift_start = att.shift_start.strftime('%H:%M') if att.shift_start else "09:00"
+            shift_end = att.shift_end.strftime('%H:%M') if att.shift_end else "17:00"
+            clock_in = timezone.localtime(att.attendance_check_in).strftime('%H:%M') if att.attendance_check_in else "None"
+            clock_out = timezone.localtime(att.attendance_check_out).strftime('%H:%M') if att.attendance_check_out else "None"
             return {
                 "scheduled": f"{shift_start} - {shift_end}",
                 "clock": f"{clock_in} - {clock_out}",
@@ -417,20 +434,23 @@ class OvertimeRequestSerializer(serializers.ModelSerializer):
         return {"scheduled": "Off / No Shift", "clock": "No Punch", "has_record": False}
 
     def get_calculated_ot(self, obj):
-        attendance = Attendance.objects.filter(employee=obj.employee, date=obj.date).first()
-        if not attendance or not attendance.check_in_time or not attendance.check_out_time:
+        att = self._attendance(obj)
+        if not att.attendance_id or not att.attendance_check_in or not att.attendance_check_out:
             return 0.0
         
         # Calculate potential OT (Total hours worked - Shift hours)
-        total_hours = float(attendance.total_hours)
-        expected_hours = float(attendance.shift.get_shift_duration()) if attendance.shift else 8.0
+        total_hours = float(att.attendance_total_hours)
+        if att.shift_start and att.shift_end:
+            expected_hours = float(Shift.duration_hours(att.shift_start, att.shift_end, att.shift_break_minutes))
+        else:
+            expected_hours = 8.0
         
         potential_ot = max(0, total_hours - expected_hours)
         return round(potential_ot, 2)
 
     def get_policy_status(self, obj):
-        attendance = Attendance.objects.filter(employee=obj.employee, date=obj.date).first()
-        if not attendance or not attendance.check_in_time or not attendance.check_out_time:
+        att = self._attendance(obj)
+        if not att.attendance_id or not att.attendance_check_in or not att.attendance_check_out:
             return "mismatch"
         
         # Use our new potential calculation for matching
@@ -442,8 +462,7 @@ class OvertimeRequestSerializer(serializers.ModelSerializer):
             return "mismatch"
         
         # Check against policy cap
-        policy = obj.employee.company.attendance_policies.filter(is_active=True).first()
-        if policy and req_ot > float(policy.max_overtime_per_day):
+        if att.policy_max_overtime is not None and req_ot > float(att.policy_max_overtime):
             return "cap_warning"
             
         return "verified"
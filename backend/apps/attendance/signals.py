@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import work_calendar
+from .models import AttendancePolicy, Holiday, Shift
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+@receiver(post_save, sender=Shift)
+@receiver(post_delete, sender=Shift)
+@receiver(post_save, sender=AttendancePolicy)
+@receiver(post_delete, sender=AttendancePolicy)
+def invalidate_work_calendar(sender, instance, **kwargs):
+    """Holidays, week-offs or the default pattern may have changed."""
+    work_calendar.invalidate(instance.company_id)
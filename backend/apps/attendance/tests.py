@@ -1,7 +1,17 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
-from apps.accounts.models import Organization, Employee
-from .models import Shift, Attendance
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.accounts.models import Department, Organization, Employee
+from . import work_calendar
+from .auto_mark import AutoMarkService
+from .counters import AttendanceCounters, snapshot
+from .models import Shift, Attendance, AttendancePolicy, Holiday, OvertimeRequest
+from .overtime import OvertimeService, with_attendance
 from datetime import date, time
+from decimal import Decimal
+from unittest import mock
 
 
 class AttendanceModelTest(TestCase):
@@ -30,3 +40,312 @@ class AttendanceModelTest(TestCase):
             status='present'
         )
         self.assertEqual(attendance.status, 'present')
+
+
+class AttendanceCountersTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Organization.objects.create(name="Test Corp", slug="test-corp")
+        self.employee = Employee.objects.create(
+            employee_id="EMP001",
+            company=self.company,
+            first_name="John",
+            email="john@test.com",
+            date_of_joining=date.today()
+        )
+
+    def test_deltas_match_rebuild(self):
+        today = date.today()
+        self.assertEqual(AttendanceCounters.get(self.company.id, today)['present'], 0)
+
+        attendance = Attendance.objects.create(employee=self.employee, date=today, status='absent')
+        with self.captureOnCommitCallbacks(execute=True):
+            AttendanceCounters.record_change(self.company.id, today, set(), attendance)
+
+        before = snapshot(attendance)
+        attendance.status = 'present'
+        attendance.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            AttendanceCounters.record_change(self.company.id, today, before, attendance)
+
+        cached = AttendanceCounters.get(self.company.id, today)
+        self.assertEqual(cached['present'], 1)
+        self.assertEqual(cached['absent'], 0)
+        self.assertEqual(cached, AttendanceCounters.rebuild(self.company.id, [today])[today])
+
+
+class WorkCalendarTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Organization.objects.create(name="Test Corp", slug="test-corp")
+
+    @mock.patch('apps.attendance.work_calendar.is_shared_cache', return_value=True)
+    def test_working_days_follow_holiday_changes(self, shared):
+        start, end = date(2026, 1, 1), date(2026, 1, 31)
+        self.assertEqual(work_calendar.working_days_between(self.company.id, start, end), 22)
+
+        holiday = Holiday.objects.create(company=self.company, name="Republic Day", date=date(2026, 1, 26))
+        self.assertEqual(work_calendar.working_days_between(self.company.id, start, end), 21)
+
+        holiday.delete()
+        self.assertEqual(work_calendar.working_days_between(self.company.id, start, end), 22)
+
+    def test_per_process_cache_builds_every_call(self):
+        start, end = date(2026, 1, 1), date(2026, 1, 31)
+        self.assertEqual(work_calendar.working_days_between(self.company.id, start, end), 22)
+        # No signal, as when another worker imports the holiday
+        Holiday.objects.bulk_create([Holiday(company=self.company, name="Republic Day", date=date(2026, 1, 26))])
+        self.assertEqual(work_calendar.working_days_between(self.company.id, start, end), 21)
+
+    def test_matrix_shows_optional_holidays_as_off(self):
+        user = User.objects.create_user('hr', 'hr@test.com', 'x')
+        Employee.objects.create(
+            user=user, employee_id="EMP001", company=self.company, first_name="John",
+            email="john@test.com", date_of_joining=date(2020, 1, 1)
+        )
+        Holiday.objects.create(company=self.company, name="Pongal", date=date(2026, 1, 14), holiday_type='restricted')
+        Holiday.objects.create(company=self.company, name="Republic Day", date=date(2026, 1, 26))
+        self.assertEqual(work_calendar.working_days_between(self.company.id, date(2026, 1, 1), date(2026, 1, 31)), 21)
+
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/attendance/monthly_matrix/', {'month': 1, 'year': 2026})
+        self.assertEqual(response.status_code, 200)
+        row = response.json()['employees'][0]['status']
+        # Jan 2026: 3rd is a Saturday, 5th a Monday
+        self.assertEqual((row[2], row[4], row[13], row[25]), ('O', '', 'O', 'O'))
+
+
+class HolidayImportTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Organization.objects.create(name="Test Corp", slug="test-corp")
+        self.user = User.objects.create_user('hr', 'hr@test.com', 'x')
+        Employee.objects.create(
+            user=self.user, employee_id="EMP001", company=self.company, first_name="John",
+            email="john@test.com", date_of_joining=date.today()
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _import(self):
+        response = self.client.post('/api/attendance/holidays/import/', {'year': 2024}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def test_reimport_restores_soft_deleted_rows(self):
+        first = self._import()
+        self.assertGreater(first['created'], 0)
+        holidays = Holiday.objects.filter(company=self.company)
+        self.assertEqual(holidays.count(), first['total'])
+
+        holidays.filter(name='Republic Day').update(is_active=False, description='')
+        second = self._import()
+        self.assertEqual((second['created'], second['skipped']), (1, first['total'] - 1))
+        self.assertEqual(holidays.count(), first['total'])
+        restored = holidays.get(name='Republic Day')
+        self.assertTrue(restored.is_active)
+        self.assertEqual(restored.description, 'National Holiday')
+
+
+class PresencePaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Organization.objects.create(name="Test Corp", slug="test-corp")
+        self.user = User.objects.create_user('hr', 'hr@test.com', 'x')
+        self.names = ['Amit', 'Bela', 'Bela', 'Chen', 'Dara']
+        employees = [
+            Employee.objects.create(
+                user=self.user if i == 0 else None, employee_id=f"EMP00{i}", company=self.company,
+                first_name=name, email=f"e{i}@test.com", date_of_joining=date(2020, 1, 1)
+            )
+            for i, name in enumerate(self.names)
+        ]
+        # Checked in today, so never listed
+        checked_in = Employee.objects.create(
+            employee_id="EMP009", company=self.company, first_name="Bela",
+            email="e9@test.com", date_of_joining=date(2020, 1, 1)
+        )
+        Attendance.objects.create(
+            employee=checked_in, date=timezone.localdate(), status='present', check_in_time=timezone.now()
+        )
+        self.expected = [str(e.id) for e in sorted(employees, key=lambda e: (e.first_name, e.id))]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_walks_every_row_once(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            params = {'page_size': 2, **({'cursor': cursor} if cursor else {})}
+            response = self.client.get('/api/attendance/presence/not-checked-in/', params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            seen += [row['id'] for row in data['employees']]
+            pages += 1
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(pages, 3)
+
+        # An inactive employee's check-in does not lower the count
+        leaver = Employee.objects.create(
+            employee_id="EMP010", company=self.company, first_name="Eve", status='inactive',
+            email="e10@test.com", date_of_joining=date(2020, 1, 1)
+        )
+        Attendance.objects.create(employee=leaver, date=timezone.localdate(), status='present', check_in_time=timezone.now())
+        response = self.client.get('/api/attendance/presence/not-checked-in/', {'include_count': 'true'})
+        self.assertEqual(response.json()['count'], len(self.expected))
+
+        # An exact final page has no next cursor
+        response = self.client.get('/api/attendance/presence/not-checked-in/', {'page_size': 5})
+        self.assertEqual(len(response.json()['employees']), 5)
+        self.assertIsNone(response.json()['next_cursor'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/attendance/presence/not-checked-in/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Invalid cursor')
+
+
+class OvertimeServiceTest(TestCase):
+    def setUp(self):
+        self.company = Organization.objects.create(name="Test Corp", slug="test-corp")
+        self.policy = AttendancePolicy.objects.create(
+            company=self.company, name="Default", effective_from=date(2024, 1, 1),
+            require_overtime_pre_approval=True, max_overtime_per_day=3
+        )
+        self.shift = Shift.objects.create(
+            company=self.company, name="General", code="GEN", start_time=time(9, 0), end_time=time(18, 0)
+        )
+        department = Department.objects.create(company=self.company, name="Ops", code="OPS")
+        self.amit = Employee.objects.create(
+            employee_id="EMP001", company=self.company, first_name="Amit", department=department,
+            email="amit@test.com", date_of_joining=date(2020, 1, 1)
+        )
+        self.bela = Employee.objects.create(
+            employee_id="EMP002", company=self.company, first_name="Bela",
+            email="bela@test.com", date_of_joining=date(2020, 1, 1)
+        )
+        self._day(self.amit, date(2024, 3, 4), '3', approved='2')
+        self._day(self.amit, date(2024, 3, 5), '1.5', rejected='5')
+        self._day(self.bela, date(2024, 3, 4), '2', approved='4')
+        self._day(self.bela, date(2024, 3, 6), '0')
+        # Another month is left out
+        self._day(self.bela, date(2024, 4, 1), '2', approved='2')
+
+    def _day(self, employee, day, overtime, approved=None, rejected=None):
+        attendance = Attendance.objects.create(employee=employee, date=day, shift=self.shift, status='present')
+        # save() derives overtime from punches; set the credited hours directly
+        Attendance.objects.filter(pk=attendance.pk).update(overtime_hours=Decimal(overtime))
+        for hours, state in ((approved, 'approved'), (rejected, 'rejected')):
+            if hours:
+                OvertimeRequest.objects.create(
+                    employee=employee, date=day, hours_requested=Decimal(hours), reason="Release", status=state
+                )
+
+    def _totals(self, summaries, dimension):
+        return {
+            row.label: (row.days, row.eligible_hours, row.approved_hours, row.paid_hours)
+            for row in summaries if row.dimension == dimension
+        }
+
+    def test_month_rows_cap_paid_at_approved_hours(self):
+        with self.assertNumQueries(2):
+            rows = {row['employee_id']: row for row in OvertimeService.month_rows(self.company.id, 2024, 3)}
+        self.assertEqual(
+            (rows[self.amit.id]['days'], rows[self.amit.id]['eligible'], rows[self.amit.id]['approved'], rows[self.amit.id]['paid']),
+            (2, Decimal('4.5'), Decimal('2'), Decimal('2'))
+        )
+        self.assertEqual((rows[self.bela.id]['eligible'], rows[self.bela.id]['paid']), (Decimal('2'), Decimal('2')))
+
+        self.policy.require_overtime_pre_approval = False
+        self.policy.save()
+        rows = {row['employee_id']: row for row in OvertimeService.month_rows(self.company.id, 2024, 3)}
+        self.assertEqual(rows[self.amit.id]['paid'], Decimal('4.5'))
+
+    def test_compute_month_stores_rollups(self):
+        summaries = OvertimeService.compute_month(self.company.id, 2024, 3)
+        self.assertEqual(self._totals(summaries, 'employee'), {
+            'Amit': (2, Decimal('4.5'), Decimal('2'), Decimal('2')),
+            'Bela': (1, Decimal('2'), Decimal('4'), Decimal('2')),
+        })
+        self.assertEqual(self._totals(summaries, 'department'), {
+            'Ops': (2, Decimal('4.5'), Decimal('2'), Decimal('2')),
+            'Unassigned': (1, Decimal('2'), Decimal('4'), Decimal('2')),
+        })
+        self.assertEqual(self._totals(summaries, 'shift'), {'General': (3, Decimal('6.5'), Decimal('6'), Decimal('4'))})
+
+        # Recomputing replaces the stored rows
+        OvertimeService.compute_month(self.company.id, 2024, 3)
+        stored = OvertimeService.get_rollup(self.company.id, 2024, 3, 'employee')
+        self.assertEqual(sorted(row.label for row in stored), ['Amit', 'Bela'])
+
+    def test_with_attendance_annotates_day_and_policy_max(self):
+        OvertimeRequest.objects.create(
+            employee=self.bela, date=date(2024, 3, 20), hours_requested=Decimal('1'), reason="Audit"
+        )
+        with self.assertNumQueries(1):
+            requests = {
+                (request.employee_id, request.date): request
+                for request in with_attendance(OvertimeRequest.objects.filter(status__in=['approved', 'pending']))
+            }
+        matched = requests[(self.amit.id, date(2024, 3, 4))]
+        self.assertEqual(matched.attendance_overtime_hours, Decimal('3'))
+        self.assertEqual((matched.shift_start, matched.policy_max_overtime), (time(9, 0), 3))
+        unmatched = requests[(self.bela.id, date(2024, 3, 20))]
+        self.assertIsNone(unmatched.attendance_id)
+        self.assertEqual(unmatched.policy_max_overtime, 3)
+
+
+class AutoMarkTest(TestCase):
+    def setUp(self):
+        from apps.leave.models import LeaveRequest, LeaveType
+
+        cache.clear()
+        self.company = Organization.objects.create(name="Test Corp", slug="test-corp")
+        self.employee = Employee.objects.create(
+            employee_id="EMP001", company=self.company, first_name="John",
+            email="john@test.com", date_of_joining=date(2020, 1, 1)
+        )
+        Holiday.objects.create(company=self.company, name="Holi", date=date(2024, 3, 6))
+        leave_type = LeaveType.objects.create(company=self.company, name="Casual Leave", code="CL", days_per_year=12)
+        LeaveRequest.objects.create(
+            employee=self.employee, leave_type=leave_type, start_date=date(2024, 3, 7),
+            end_date=date(2024, 3, 8), reason="Trip", status='approved'
+        )
+        Attendance.objects.create(employee=self.employee, date=date(2024, 3, 5), status='present')
+
+    def test_marks_missing_days_once(self):
+        start, end = date(2024, 3, 4), date(2024, 3, 10)
+        created = AutoMarkService.mark_range(self.company.id, start, end)
+        self.assertEqual(sum(created.values()), 6)
+        self.assertEqual(created[date(2024, 3, 5)], 0)
+
+        statuses = dict(Attendance.objects.filter(employee=self.employee).values_list('date', 'status'))
+        self.assertEqual(statuses, {
+            date(2024, 3, 4): 'absent',
+            date(2024, 3, 5): 'present',
+            date(2024, 3, 6): 'holiday',
+            date(2024, 3, 7): 'on_leave',
+            date(2024, 3, 8): 'on_leave',
+            date(2024, 3, 9): 'week_off',
+            date(2024, 3, 10): 'week_off',
+        })
+        self.assertFalse(Attendance.objects.get(date=date(2024, 3, 5)).is_auto_marked)
+
+        # Re-running the range adds nothing
+        self.assertEqual(sum(AutoMarkService.mark_range(self.company.id, start, end).values()), 0)
+        self.assertEqual(Attendance.objects.filter(employee=self.employee).count(), 7)
+
+    def test_rows_lost_to_a_punch_are_not_counted(self):
+        day = date(2024, 3, 4)
+        bulk_create = Attendance.objects.bulk_create
+
+        def punch_first(rows, **kwargs):
+            Attendance.objects.create(employee=self.employee, date=day, status='present')
+            return bulk_create(rows, **kwargs)
+
+        with mock.patch.object(Attendance.objects, 'bulk_create', side_effect=punch_first):
+            self.assertEqual(AutoMarkService.mark_day(self.company.id, day), 0)
+        self.assertEqual(Attendance.objects.get(employee=self.employee, date=day).status, 'present')
@@ -13,10 +13,13 @@ from .views import (
     dashboard_stats,
     offline_employees,
     on_break,
+    presence_not_checked_in,
+    presence_on_break,
     overtime_pending,
     to_validate,
     analytics_data,
     department_overtime,
+    overtime_rollup,
     my_dashboard,
     monthly_matrix,
     holiday_list, holiday_detail,
@@ -58,10 +61,13 @@ urlpatterns = [
     path('dashboard-stats/', dashboard_stats, name='attendance_dashboard_stats'),
     path('offline-employees/', offline_employees, name='attendance_offline_employees'),
     path('on-break/', on_break, name='attendance_on_break'),
+    path('presence/not-checked-in/', presence_not_checked_in, name='attendance_presence_not_checked_in'),
+    path('presence/on-break/', presence_on_break, name='attendance_presence_on_break'),
     path('overtime-pending/', overtime_pending, name='attendance_overtime_pending'),
     path('to-validate/', to_validate, name='attendance_to_validate'),
     path('analytics/', analytics_data, name='attendance_analytics'),
     path('department-overtime/', department_overtime, name='attendance_department_overtime'),
+    path('overtime-rollup/', overtime_rollup, name='attendance_overtime_rollup'),
     path('my_dashboard/', my_dashboard, name='attendance_my_dashboard'),
     path('monthly_matrix/', monthly_matrix, name='attendance_monthly_matrix'),
     path('start_break/', start_break, name='attendance_start_break'),
@@ -8,17 +8,21 @@ from calendar import monthrange
 
 logger = logging.getLogger(__name__)
 
-from django.db import transaction
-from django.db.models import Q, Sum, Count, Avg
+from django.db import connection, transaction
+from django.db.models import Q, Sum, Count, Avg, Exists, OuterRef
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 import math
 from datetime import date, datetime, timedelta
 import uuid
+from apps.accounts.pagination import CursorCodec, keyset_page
 from apps.accounts.permissions import is_client_admin
 from apps.audit.utils import log_activity
 
 from .holiday_engine import get_indian_holidays
+from . import work_calendar
+from .overtime import OvertimeService, with_attendance
+from .counters import AttendanceCounters, row_counters, snapshot as counter_snapshot
 
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action, api_view, permission_classes
@@ -35,7 +39,8 @@ from .models import (
     Holiday,
     AttendanceRegularizationRequest,
     AttendanceSummary,
-    OvertimeRequest
+    OvertimeRequest,
+    OvertimeSummary
 )
 from .serializers import (
     AttendancePolicySerializer,
@@ -58,6 +63,7 @@ from .serializers import (
 )
 from apps.accounts.models import Employee
 from django.apps import apps
+from django.utils.dateparse import parse_date
 
 
 def safe_api(fn):
@@ -72,6 +78,27 @@ def safe_api(fn):
         )
 
 
+def get_user_company(user):
+    """Company of the requesting user (employee profile or organization)."""
+    employee = getattr(user, 'employee_profile', None)
+    if employee:
+        return employee.company
+    if hasattr(user, 'organization') and user.organization:
+        return user.organization
+    return None
+
+
+def parse_query_date(value, default):
+    if not value:
+        return default
+    if isinstance(value, date):
+        return value
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f'Invalid date: {value}')
+    return parsed
+
+
 def haversine_distance(lat1, lon1, lat2, lon2):
     """
     Calculate the great circle distance between two points 
@@ -344,6 +371,13 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+
+PRESENCE_CURSOR = CursorCodec(str, uuid.UUID)
+
+
+def join_name(*parts):
+    return ' '.join(filter(None, parts))
+
 # ---------------- ATTENDANCE CORE ----------------
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
@@ -382,7 +416,8 @@ def attendance_list(request):
         elif request.method == 'POST':
             serializer = AttendanceSerializer(data=request.data)
             if serializer.is_valid():
-                serializer.save()
+                attendance = serializer.save()
+                AttendanceCounters.invalidate(attendance.employee.company_id, attendance.date)
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -454,10 +489,12 @@ def attendance_detail(request, pk):
             serializer = AttendanceSerializer(instance, data=request.data, partial=partial)
             if serializer.is_valid():
                 serializer.save()
+                AttendanceCounters.invalidate(instance.employee.company_id, instance.date)
                 return Response(serializer.data)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         elif request.method == 'DELETE':
+            AttendanceCounters.invalidate(instance.employee.company_id, instance.date)
             instance.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -496,6 +533,7 @@ def check_in(request):
 
         # 2. Get or Create Attendance for the resolved Work Date
         attendance, created = Attendance.objects.get_or_create(employee=employee, date=work_date)
+        counters_before = set() if created else counter_snapshot(attendance)
         
         # If record already exists and has a check-in, don't overwrite unless regularizing
         if not created and attendance.check_in_time:
@@ -568,6 +606,7 @@ def check_in(request):
         attendance.check_in_latitude = request.data.get('latitude')
         attendance.check_in_longitude = request.data.get('longitude')
         attendance.status = 'present'
+        attendance.is_auto_marked = False
         
         # Calculate Late Status (relative to the work_date)
         if attendance.shift:
@@ -584,6 +623,7 @@ def check_in(request):
                 attendance.late_by_minutes = int(late_delta.total_seconds() / 60)
         
         attendance.save()
+        AttendanceCounters.record_change(employee.company_id, work_date, counters_before, attendance)
         
         log_activity(
             user=request.user,
@@ -628,6 +668,7 @@ def check_out(request):
                     'error': 'Cannot clock out so soon. Please wait at least 1 minute after clocking in.'
                 }, status=status.HTTP_400_BAD_REQUEST)
         
+        counters_before = counter_snapshot(attendance)
         attendance.check_out_time = timezone.now()
         attendance.check_out_device = request.data.get('device', '')
         attendance.check_out_ip = request.META.get('REMOTE_ADDR')
@@ -635,6 +676,7 @@ def check_out(request):
         if attendance.status not in ['half_day', 'on_leave']:
             attendance.status = 'present'
         attendance.save()
+        AttendanceCounters.record_change(employee.company_id, attendance.date, counters_before, attendance)
         
         log_activity(
             user=request.user,
@@ -709,6 +751,7 @@ def regularize(request, pk):
             attendance.regularization_proof = data['supporting_document']
 
         attendance.save() # This triggers model.calculate_hours()
+        AttendanceCounters.invalidate(attendance.employee.company_id, attendance.date)
         
         log_activity(
             user=request.user,
@@ -737,7 +780,7 @@ def start_break(request):
             return Response({'error': 'Employee ID is required'}, status=status.HTTP_400_BAD_REQUEST)
 
         today = timezone.localdate()
-        attendance = Attendance.objects.filter(employee_id=employee_id, date=today).first()
+        attendance = Attendance.objects.filter(employee_id=employee_id, date=today).select_related('employee').first()
         
         if not attendance:
             return Response({'error': 'No active attendance found for today. Please clock in first.'}, status=status.HTTP_400_BAD_REQUEST)
@@ -751,6 +794,7 @@ def start_break(request):
             break_type=break_type,
             break_start=timezone.now()
         )
+        AttendanceCounters.apply(attendance.employee.company_id, today, {'on_break': 1})
         
         return Response({'message': 'Break started successfully', 'id': str(break_record.id)}, status=status.HTTP_201_CREATED)
     
@@ -766,7 +810,7 @@ def end_break(request):
             return Response({'error': 'Employee ID is required'}, status=status.HTTP_400_BAD_REQUEST)
 
         today = timezone.localdate()
-        attendance = Attendance.objects.filter(employee_id=employee_id, date=today).first()
+        attendance = Attendance.objects.filter(employee_id=employee_id, date=today).select_related('employee').first()
         
         if not attendance:
             return Response({'error': 'No attendance record found for today.'}, status=status.HTTP_400_BAD_REQUEST)
@@ -785,8 +829,11 @@ def end_break(request):
             break_end__isnull=False
         ).aggregate(total=Sum('duration_minutes'))['total'] or 0
         
+        counters_before = counter_snapshot(attendance)
         attendance.break_hours = round(total_break_minutes / 60, 2)
         attendance.save() 
+        AttendanceCounters.apply(attendance.employee.company_id, today, {'on_break': -1})
+        AttendanceCounters.record_change(attendance.employee.company_id, today, counters_before, attendance)
         
         return Response({
             'message': 'Break ended successfully',
@@ -804,10 +851,21 @@ def bulk_mark(request):
     def logic():
         employee_ids = request.data.get('employees', [])
         status_val = request.data.get('status', 'present')
-        attendance_date = request.data.get('date', timezone.localdate())
+        attendance_date = parse_query_date(request.data.get('date'), timezone.localdate())
         remarks = request.data.get('remarks', '')
 
+        # Counter state before the change, one query for the whole batch
+        company_ids = {
+            str(emp_id): company_id
+            for emp_id, company_id in Employee.objects.filter(id__in=employee_ids).values_list('id', 'company_id')
+        }
+        before = {
+            str(att.employee_id): counter_snapshot(att)
+            for att in Attendance.objects.filter(employee_id__in=employee_ids, date=attendance_date)
+        }
+
         ids = []
+        deltas = {}
         for emp_id in employee_ids:
             attendance, _ = Attendance.objects.update_or_create(
                 employee_id=emp_id,
@@ -816,6 +874,18 @@ def bulk_mark(request):
             )
             ids.append(str(attendance.id))
 
+            company_deltas = deltas.setdefault(company_ids.get(str(emp_id)), {})
+            old = before.get(str(emp_id), set())
+            new = row_counters(attendance.status, attendance.is_late, attendance.check_in_time)
+            for name in new - old:
+                company_deltas[name] = company_deltas.get(name, 0) + 1
+            for name in old - new:
+                company_deltas[name] = company_deltas.get(name, 0) - 1
+
+        for company_id, company_deltas in deltas.items():
+            if company_id:
+                AttendanceCounters.apply(company_id, attendance_date, company_deltas)
+
         log_activity(
             user=request.user,
             action_type='UPDATE',
@@ -836,15 +906,16 @@ def bulk_mark(request):
 @permission_classes([IsAuthenticated])
 def daily_summary(request):
     def logic():
-        attendance_date = request.query_params.get('date', timezone.localdate())
-        summary = Attendance.objects.filter(date=attendance_date).aggregate(
-            total=Count('id'),
-            present=Count('id', filter=Q(status='present')),
-            absent=Count('id', filter=Q(status='absent')),
-            half_day=Count('id', filter=Q(status='half_day')),
-            on_leave=Count('id', filter=Q(status='on_leave')),
-            late=Count('id', filter=Q(is_late=True)),
-        )
+        attendance_date = parse_query_date(request.query_params.get('date'), timezone.localdate())
+        company = get_user_company(request.user)
+        if not company:
+            return Response({'error': 'Company context required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        counters = AttendanceCounters.get(company.id, attendance_date)
+        summary = {
+            name: counters[name]
+            for name in ('total', 'present', 'absent', 'half_day', 'on_leave', 'late')
+        }
         return Response({'date': attendance_date, 'summary': summary}, status=status.HTTP_200_OK)
     
     return safe_api(logic)
@@ -886,18 +957,17 @@ def employee_monthly(request):
 def dashboard_stats(request):
     def logic():
         today = timezone.localdate()
-        attendance_date = request.query_params.get('date', today)
-        
-        # Get all employees count
-        total_employees = Employee.objects.filter(status='active').count()
+        attendance_date = parse_query_date(request.query_params.get('date'), today)
+        company = get_user_company(request.user)
+        if not company:
+            return Response({'error': 'Company context required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get today's attendance records
-        today_attendances = Attendance.objects.filter(date=attendance_date)
+        total_employees = Employee.objects.filter(company=company, status='active').count()
         
-        # Calculate statistics
-        total_present = today_attendances.filter(status='present').count()
-        on_time = today_attendances.filter(is_late=False, status='present').count()
-        late_come = today_attendances.filter(is_late=True).count()
+        counters = AttendanceCounters.get(company.id, attendance_date)
+        total_present = counters['present']
+        on_time = counters['on_time']
+        late_come = counters['late']
         
         # Calculate percentage
         attendance_percentage = (total_present / total_employees * 100) if total_employees > 0 else 0
@@ -909,6 +979,9 @@ def dashboard_stats(request):
             'attendance_percentage': round(attendance_percentage, 2),
             'on_time': on_time,
             'late_come': late_come,
+            'on_leave': counters['on_leave'],
+            'checked_in': counters['checked_in'],
+            'on_break': counters['on_break'],
         }, status=status.HTTP_200_OK)
     
     return safe_api(logic)
@@ -990,6 +1063,102 @@ def on_break(request):
     return safe_api(logic)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def presence_not_checked_in(request):
+    def logic():
+        company = get_user_company(request.user)
+        if not company:
+            return Response({'error': 'Company context required'}, status=status.HTTP_400_BAD_REQUEST)
+        today = timezone.localdate()
+
+        checked_in_today = Attendance.objects.filter(
+            employee=OuterRef('pk'),
+            date=today,
+            check_in_time__isnull=False
+        )
+        queryset = Employee.objects.filter(
+            company=company,
+            status='active'
+        ).filter(
+            ~Exists(checked_in_today)
+        ).values('id', 'employee_id', 'first_name', 'middle_name', 'last_name', 'department__name')
+
+        rows, next_cursor = keyset_page(queryset, request, ('first_name', 'id'), PRESENCE_CURSOR)
+
+        employees_data = []
+        for row in rows:
+            full_name = join_name(row['first_name'], row['middle_name'], row['last_name'])
+            employees_data.append({
+                'id': str(row['id']),
+                'name': full_name,
+                'employee_id': row['employee_id'],
+                'status': 'Expected',
+                'dept': row['department__name'] or 'N/A',
+                'avatar': full_name[0].upper() if full_name else 'U'
+            })
+
+        data = {'employees': employees_data, 'next_cursor': next_cursor}
+        if request.query_params.get('include_count') == 'true':
+            # Same anti-join as the listing; the cached counters also count
+            # check-ins of inactive employees
+            data['count'] = queryset.order_by().count()
+        return Response(data, status=status.HTTP_200_OK)
+
+    return safe_api(logic)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def presence_on_break(request):
+    def logic():
+        company = get_user_company(request.user)
+        if not company:
+            return Response({'error': 'Company context required'}, status=status.HTTP_400_BAD_REQUEST)
+        today = timezone.localdate()
+
+        queryset = AttendanceBreak.objects.filter(
+            attendance__employee__company=company,
+            attendance__date=today,
+            break_end__isnull=True
+        ).values(
+            'break_start', 'break_type',
+            'attendance__employee_id',
+            'attendance__employee__employee_id',
+            'attendance__employee__first_name',
+            'attendance__employee__middle_name',
+            'attendance__employee__last_name',
+        )
+
+        rows, next_cursor = keyset_page(
+            queryset, request, ('attendance__employee__first_name', 'attendance__employee_id'), PRESENCE_CURSOR
+        )
+
+        break_types = dict(AttendanceBreak.BREAK_TYPE_CHOICES)
+        employees_data = []
+        for row in rows:
+            full_name = join_name(
+                row['attendance__employee__first_name'],
+                row['attendance__employee__middle_name'],
+                row['attendance__employee__last_name'],
+            )
+            employees_data.append({
+                'id': str(row['attendance__employee_id']),
+                'name': full_name,
+                'employee_id': row['attendance__employee__employee_id'],
+                'break_start': row['break_start'],
+                'break_type': break_types.get(row['break_type'], row['break_type']),
+                'avatar': full_name[0].upper() if full_name else 'U'
+            })
+
+        data = {'employees': employees_data, 'next_cursor': next_cursor}
+        if request.query_params.get('include_count') == 'true':
+            data['count'] = AttendanceCounters.get(company.id, today)['on_break']
+        return Response(data, status=status.HTTP_200_OK)
+
+    return safe_api(logic)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def overtime_pending(request):
@@ -1084,16 +1253,20 @@ def analytics_data(request):
         today = timezone.localdate()
         
         if period == 'Day':
+            company = get_user_company(request.user)
+            if not company:
+                return Response({'error': 'Company context required'}, status=status.HTTP_400_BAD_REQUEST)
+
             # Last 7 days
-            from datetime import timedelta
             dates = [(today - timedelta(days=i)) for i in range(6, -1, -1)]
+            counters_by_day = AttendanceCounters.get_range(company.id, dates)
             
             analytics_data = []
             for d in dates:
-                day_attendances = Attendance.objects.filter(date=d)
-                total = day_attendances.count()
-                on_time = day_attendances.filter(is_late=False, status='present').count()
-                late = day_attendances.filter(is_late=True).count()
+                counters = counters_by_day[d]
+                total = counters['total']
+                on_time = counters['on_time']
+                late = counters['late']
                 early_out = 0  # Can be calculated if you have early_out field
                 
                 analytics_data.append({
@@ -1122,27 +1295,23 @@ def department_overtime(request):
     def logic():
         month = int(request.query_params.get('month', date.today().month))
         year = int(request.query_params.get('year', date.today().year))
+        company = get_user_company(request.user)
+        if not company:
+            return Response({'error': 'Company context required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get overtime by department
-        from apps.accounts.models import Department
-        
-        departments = Department.objects.all()
+        # Get overtime by department from the stored monthly rollup
+        rollup = OvertimeService.get_rollup(
+            company.id, year, month, 'department',
+            refresh=request.query_params.get('refresh') == 'true'
+        )
         overtime_data = []
         
-        for dept in departments:
-            overtime_sum = Attendance.objects.filter(
-                employee__department=dept,
-                date__month=month,
-                date__year=year
-            ).aggregate(
-                total_overtime=Sum('overtime_hours')
-            )['total_overtime'] or 0
-            
-            if overtime_sum > 0:
+        for row in rollup:
+            if row.eligible_hours > 0:
                 overtime_data.append({
-                    'department': dept.name,
-                    'overtime_hours': float(overtime_sum),
-                    'color': '#3b82f6' if 'Manager' in dept.name else '#ec4899'
+                    'department': row.label,
+                    'overtime_hours': float(row.eligible_hours),
+                    'color': '#3b82f6' if 'Manager' in row.label else '#ec4899'
                 })
         
         return Response({
@@ -1154,6 +1323,44 @@ def department_overtime(request):
     return safe_api(logic)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def overtime_rollup(request):
+    def logic():
+        month = int(request.query_params.get('month', date.today().month))
+        year = int(request.query_params.get('year', date.today().year))
+        dimension = request.query_params.get('dimension', 'department')
+        if dimension not in dict(OvertimeSummary.DIMENSION_CHOICES):
+            return Response({'error': 'Invalid dimension'}, status=status.HTTP_400_BAD_REQUEST)
+        company = get_user_company(request.user)
+        if not company:
+            return Response({'error': 'Company context required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        rollup = OvertimeService.get_rollup(
+            company.id, year, month, dimension,
+            refresh=request.query_params.get('refresh') == 'true'
+        )
+        return Response({
+            'month': month,
+            'year': year,
+            'dimension': dimension,
+            'computed_at': min((row.computed_at for row in rollup), default=None),
+            'data': [
+                {
+                    'key': row.key,
+                    'label': row.label,
+                    'days': row.days,
+                    'eligible_hours': float(row.eligible_hours),
+                    'approved_hours': float(row.approved_hours),
+                    'paid_hours': float(row.paid_hours),
+                }
+                for row in rollup
+            ]
+        }, status=status.HTTP_200_OK)
+    
+    return safe_api(logic)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def my_dashboard(request):
@@ -1317,45 +1524,27 @@ def monthly_matrix(request):
             date__range=(start_date, end_date)
         ).select_related('employee')
 
-        # Fetch Holidays
-        holidays_in_month = Holiday.objects.filter(
-            company=company,
-            date__range=(start_date, end_date),
-            is_active=True
-        ).values_list('date', flat=True)
-        holiday_set = set(holidays_in_month)
-
-        # Fetch Policy for Week Off fallback
-        policy = AttendancePolicy.objects.filter(company=company, is_active=True).first()
-        policy_week_offs = []
-        if policy and policy.working_days != 'custom':
-            if policy.working_days == '5_days': policy_week_offs = [5, 6] # Sat, Sun
-            elif policy.working_days == '6_days': policy_week_offs = [6] # Sun
-        elif policy:
-            if not policy.monday: policy_week_offs.append(0)
-            if not policy.tuesday: policy_week_offs.append(1)
-            if not policy.wednesday: policy_week_offs.append(2)
-            if not policy.thursday: policy_week_offs.append(3)
-            if not policy.friday: policy_week_offs.append(4)
-            if not policy.saturday: policy_week_offs.append(5)
-            if not policy.sunday: policy_week_offs.append(6)
-
-        # Fetch Default Shift (Priority 2 before Policy)
-        default_shift = Shift.objects.filter(company=company, is_default=True, is_active=True).first()
-        default_working_days = set(default_shift.working_days) if default_shift else set()
-
-        # Fetch Shift Assignments (Priority 1)
+        # Week offs: assigned shift pattern (Priority 1), otherwise the
+        # company default (default shift, then policy)
+        company_weekdays = work_calendar.company_weekdays(company.id)
         shift_assignments = EmployeeShiftAssignment.objects.filter(
             employee__company=company,
             is_active=True
         ).select_related('shift')
         
-        # Map: emp_id -> set of working day indices (0-6)
+        # Map: emp_id -> weekly pattern
         emp_working_days = {}
         for sa in shift_assignments:
-            eid = str(sa.employee_id)
-            # Shift.working_days is a JSONField list of indices
-            emp_working_days[eid] = set(sa.shift.working_days)
+            weekdays = work_calendar.shift_weekdays(sa.shift)
+            if weekdays is not None:
+                emp_working_days[str(sa.employee_id)] = weekdays
+
+        # One calendar per distinct pattern
+        calendars = {}
+        def calendar_for(weekdays):
+            if weekdays not in calendars:
+                calendars[weekdays] = work_calendar.get_calendar(company.id, year, weekdays)
+            return calendars[weekdays]
         
         # Build Layout
         # Map: emp_id -> { day: status }
@@ -1393,6 +1582,8 @@ def monthly_matrix(request):
             eid = str(emp.id)
             emp_att = att_map.get(eid, {})
             
+            calendar = calendar_for(emp_working_days.get(eid, company_weekdays))
+            
             status_array = []
             p_count = 0
             a_count = 0
@@ -1401,27 +1592,10 @@ def monthly_matrix(request):
             for d in range(1, days_in_m + 1):
                 s = emp_att.get(d, '')
                 
-                # If No Attendance Record, check for Off/Holiday
-                if s == '':
-                    curr_date = date(year, month, d)
-                    if curr_date in holiday_set:
-                        s = 'O' # Holiday
-                    else:
-                        # Check Week Off
-                        weekday = curr_date.weekday() # 0=Mon, 6=Sun
-                        
-                        # Use shift-specific working days if assigned
-                        if eid in emp_working_days:
-                            if weekday not in emp_working_days[eid]:
-                                s = 'O' # Assigned Shift Off
-                        elif default_working_days:
-                            # Use company default shift if no specific assignment
-                            if weekday not in default_working_days:
-                                s = 'O' # Default Shift Off
-                        else:
-                            # Final fallback to company policy week offs
-                            if weekday in policy_week_offs:
-                                s = 'O' # Policy Off
+                # If No Attendance Record, check for Off/Holiday. Restricted/optional
+                # holidays count as working days but are still shown as off here
+                if s == '' and calendar.code(date(year, month, d)) != work_calendar.WORKING:
+                    s = 'O' # Holiday / Optional Holiday / Week Off
                 
                 status_array.append(s)
                 if s == 'P' or s == '!': p_count += 1
@@ -1566,7 +1740,10 @@ def holiday_delete_all(request):
             return Response({'error': 'Could not determine company for current user.'}, status=status.HTTP_400_BAD_REQUEST)
             
         count = queryset.count()
+        company_ids = set(queryset.values_list('company_id', flat=True))
         queryset.update(is_active=False)
+        for company_id in company_ids:
+            work_calendar.invalidate(company_id)
         return Response({'message': f'Successfully deleted {count} holidays.'}, status=status.HTTP_200_OK)
     
     return safe_api(logic)
@@ -1599,7 +1776,7 @@ def holiday_preview(request):
             return Response({'error': 'Year is required'}, status=status.HTTP_400_BAD_REQUEST)
 
         if country == 'IN':
-            holidays = get_indian_holidays(year, states, include_national)
+            holidays = [h._asdict() for h in get_indian_holidays(year, states, include_national)]
         else:
             holidays = []
 
@@ -1633,40 +1810,42 @@ def holiday_import(request):
         if not company:
             return Response({'error': 'Could not determine company for current user'}, status=status.HTTP_400_BAD_REQUEST)
 
-        holiday_previews = []
+        holiday_previews = ()
         if country == 'IN':
             holiday_previews = get_indian_holidays(year, states, include_national)
 
-        holidays_to_create = []
-        created_count = 0
-        skipped_count = 0
-
-        for h_data in holiday_previews:
-            holiday_date = datetime.strptime(h_data['date'], '%Y-%m-%d').date()
-            existing = Holiday.objects.filter(company=company, date=holiday_date, name=h_data['name']).first()
-
-            if existing:
-                if not existing.is_active:
-                    existing.is_active = True
-                    existing.holiday_type = h_data['type']
-                    existing.description = h_data['description']
-                    existing.save()
-                    created_count += 1
-                else:
-                    skipped_count += 1
-            else:
-                holidays_to_create.append(Holiday(
-                    company=company,
-                    name=h_data['name'],
-                    date=holiday_date,
-                    holiday_type=h_data['type'],
-                    description=h_data['description'],
-                    is_active=True
-                ))
-                created_count += 1
-
-        if holidays_to_create:
-            Holiday.objects.bulk_create(holidays_to_create)
+        # Active rows are left alone; new and soft-deleted ones are upserted
+        active = set(
+            Holiday.objects.filter(
+                company=company,
+                date__year=int(year),
+                is_active=True
+            ).values_list('date', 'name')
+        )
+        holidays_to_upsert = [
+            Holiday(
+                company=company,
+                name=h.name,
+                date=h.date,
+                holiday_type=h.type,
+                description=h.description,
+                is_active=True
+            )
+            for h in holiday_previews
+            if (h.date, h.name) not in active
+        ]
+        created_count = len(holidays_to_upsert)
+        skipped_count = len(holiday_previews) - created_count
+
+        if holidays_to_upsert:
+            Holiday.objects.bulk_create(
+                holidays_to_upsert,
+                update_conflicts=True,
+                # MySQL upserts on any unique key and rejects an explicit target
+                unique_fields=['company', 'date', 'name'] if connection.features.supports_update_conflicts_with_target else None,
+                update_fields=['holiday_type', 'description', 'is_active', 'updated_at'],
+            )
+            work_calendar.invalidate(company.id)
 
         return Response({
             'message': 'Holidays imported successfully',
@@ -1907,6 +2086,7 @@ def regularization_approve(request, pk):
         if instance.requested_check_out:
             attendance.check_out_time = instance.requested_check_out
         attendance.save()
+        AttendanceCounters.invalidate(attendance.employee.company_id, attendance.date)
         
         serializer = AttendanceRegularizationRequestSerializer(instance)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -1943,7 +2123,9 @@ def overtime_request_list(request):
     def logic():
         user = request.user
         if request.method == 'GET':
-            queryset = OvertimeRequest.objects.select_related('employee', 'reviewed_by').order_by('-date')
+            queryset = with_attendance(
+                OvertimeRequest.objects.select_related('employee', 'reviewed_by').order_by('-date')
+            )
             
             # Company filtering
             if not user.is_superuser:
@@ -1985,7 +2167,7 @@ def overtime_request_list(request):
 def overtime_request_detail(request, pk):
     def logic():
         user = request.user
-        queryset = OvertimeRequest.objects.all()
+        queryset = with_attendance(OvertimeRequest.objects.select_related('employee', 'reviewed_by'))
         if not user.is_superuser:
             employee = getattr(user, 'employee_profile', None)
             if employee:
@@ -2017,16 +2199,17 @@ def overtime_request_detail(request, pk):
 def overtime_pending(request):
     def logic():
         user = request.user
-        queryset = OvertimeRequest.objects.filter(status='pending').select_related('employee')
+        queryset = OvertimeRequest.objects.filter(status='pending').select_related('employee', 'reviewed_by')
         
         if not user.is_superuser:
             employee = getattr(user, 'employee_profile', None)
             if employee:
                 queryset = queryset.filter(employee__company=employee.company)
         
-        serializer = OvertimeRequestAlias(queryset, many=True)
+        requests = list(with_attendance(queryset))
+        serializer = OvertimeRequestAlias(requests, many=True)
         return Response({
-            'count': queryset.count(),
+            'count': len(requests),
             'results': serializer.data
         }, status=status.HTTP_200_OK)
     
@@ -2054,6 +2237,7 @@ def overtime_approve(request, pk):
             attendance = Attendance.objects.filter(employee=instance.employee, date=instance.date).first()
             if attendance:
                 attendance.save() # This triggers re-calculate_hours()
+            OvertimeService.invalidate(instance.employee.company_id, instance.date)
         
         serializer = OvertimeRequestAlias(instance)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -2076,6 +2260,7 @@ def overtime_reject(request, pk):
         instance.reviewed_at = timezone.now()
         instance.reviewer_comments = request.data.get('comments', '')
         instance.save()
+        OvertimeService.invalidate(instance.employee.company_id, instance.date)
         
         serializer = OvertimeRequestAlias(instance)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -2119,9 +2304,8 @@ def overtime_stats(request):
         # 3. Policy Flags (Mismatches and Cap Warnings)
         # Simple check: how many requests have potential mismatches?
         flags = 0
-        for req in queryset.filter(status='pending'):
-            att = Attendance.objects.filter(employee=req.employee, date=req.date).first()
-            if not att or float(req.hours_requested) > float(att.overtime_hours) + 0.1:
+        for req in with_attendance(queryset.filter(status='pending')):
+            if not req.attendance_id or float(req.hours_requested) > float(req.attendance_overtime_hours) + 0.1:
                 flags += 1
                 
         # 4. Estimated OT Cost (Simplified calculation for demonstration)
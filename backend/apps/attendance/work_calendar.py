@@ -0,0 +1,207 @@
+"""
+Per-company working-day calendar.
+
+A year is materialised once per (company, weekly pattern) as a string of day
+codes plus prefix sums, so "how many working days between A and B" is two
+list lookups instead of a day-by-day walk with holiday queries. Calendars are
+cached under a per-company version token that is rotated whenever a Holiday,
+Shift or AttendancePolicy of the company changes (see signals.py).
+
+Only a shared cache sees rotations made by other workers, and leave day counts
+built from a calendar are stored. With a per-process cache backend, calendars
+are therefore built per call and not cached.
+"""
+import uuid
+from datetime import date, timedelta
+
+from django.core.cache import cache
+
+from apps.accounts.permission_cache import is_shared_cache
+
+WORKING = 'W'
+WEEK_OFF = 'O'
+HOLIDAY = 'H'
+# Restricted/optional holidays are listed but employees are still expected in
+OPTIONAL_HOLIDAY = 'R'
+
+WORKING_CODES = (WORKING, OPTIONAL_HOLIDAY)
+
+DEFAULT_WEEKDAYS = frozenset(range(5))  # Mon-Fri
+
+VERSION_KEY = 'attendance:calendar:version:{company_id}'
+CALENDAR_KEY = 'attendance:calendar:{company_id}:{version}:{year}:{pattern}'
+WEEKDAYS_KEY = 'attendance:calendar:{company_id}:{version}:weekdays'
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+class WorkCalendar:
+    """Day codes and running totals for one calendar year."""
+
+    def __init__(self, year, weekdays, codes):
+        self.year = year
+        self.weekdays = frozenset(weekdays)
+        self.codes = codes
+        self.start = date(year, 1, 1)
+
+        # prefix[kind][i] = number of days of that kind before day index i
+        self.prefix = {WORKING: [0], HOLIDAY: [0], WEEK_OFF: [0]}
+        for code in codes:
+            working = code in WORKING_CODES
+            for kind, hit in ((WORKING, working), (HOLIDAY, code == HOLIDAY), (WEEK_OFF, code == WEEK_OFF)):
+                self.prefix[kind].append(self.prefix[kind][-1] + hit)
+
+    def code(self, day):
+        return self.codes[(day - self.start).days]
+
+    def is_working_day(self, day):
+        return self.code(day) in WORKING_CODES
+
+    def count(self, start, end, kind=WORKING):
+        """Days of ``kind`` in [start, end], clipped to this year."""
+        first = max((start - self.start).days, 0)
+        last = min((end - self.start).days, len(self.codes) - 1)
+        if last < first:
+            return 0
+        totals = self.prefix[kind]
+        return totals[last + 1] - totals[first]
+
+
+def pattern_key(weekdays):
+    return ''.join(str(d) for d in sorted(weekdays))
+
+
+def policy_weekdays(policy):
+    """Working weekdays (0=Monday) configured on an AttendancePolicy."""
+    if policy.working_days == '5_days':
+        return frozenset(range(5))
+    if policy.working_days == '6_days':
+        return frozenset(range(6))
+    flags = (
+        policy.monday, policy.tuesday, policy.wednesday, policy.thursday,
+        policy.friday, policy.saturday, policy.sunday,
+    )
+    return frozenset(day for day, enabled in enumerate(flags) if enabled)
+
+
+def shift_weekdays(shift):
+    """Working weekdays of a shift, or None when the shift does not set any."""
+    if shift and shift.working_days:
+        return frozenset(int(d) for d in shift.working_days)
+    return None
+
+
+def get_version(company_id):
+    key = VERSION_KEY.format(company_id=company_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def invalidate(company_id):
+    """Drop every cached calendar of the company by rotating its version."""
+    cache.set(VERSION_KEY.format(company_id=company_id), uuid.uuid4().hex, None)
+
+
+def company_weekdays(company_id):
+    """
+    Default weekly pattern of a company: the default shift's working days,
+    then the active attendance policy, then Monday to Friday.
+    """
+    if not is_shared_cache():
+        return load_company_weekdays(company_id)
+    key = WEEKDAYS_KEY.format(company_id=company_id, version=get_version(company_id))
+    weekdays = cache.get(key)
+    if weekdays is None:
+        weekdays = load_company_weekdays(company_id)
+        cache.set(key, weekdays, CACHE_TIMEOUT)
+    return weekdays
+
+
+def load_company_weekdays(company_id):
+    from .models import AttendancePolicy, Shift
+
+    default_shift = Shift.objects.filter(company_id=company_id, is_default=True, is_active=True).first()
+    weekdays = shift_weekdays(default_shift)
+    if weekdays is None:
+        policy = AttendancePolicy.objects.filter(company_id=company_id, is_active=True).first()
+        weekdays = policy_weekdays(policy) if policy else DEFAULT_WEEKDAYS
+    return weekdays
+
+
+def employee_weekdays(employee):
+    """Weekly pattern of an employee: active shift assignment, else company default."""
+    from .models import EmployeeShiftAssignment
+
+    assignment = EmployeeShiftAssignment.objects.filter(
+        employee=employee,
+        is_active=True
+    ).select_related('shift').order_by('-effective_from').first()
+    weekdays = shift_weekdays(assignment.shift if assignment else None)
+    return weekdays if weekdays is not None else company_weekdays(employee.company_id)
+
+
+def build(company_id, year, weekdays):
+    from .models import Holiday
+
+    start = date(year, 1, 1)
+    days = (date(year + 1, 1, 1) - start).days
+    codes = [
+        WORKING if (start + timedelta(days=i)).weekday() in weekdays else WEEK_OFF
+        for i in range(days)
+    ]
+
+    holidays = Holiday.objects.filter(
+        company_id=company_id,
+        date__year=year,
+        is_active=True
+    ).values_list('date', 'holiday_type')
+    for holiday_date, holiday_type in holidays:
+        index = (holiday_date - start).days
+        if holiday_type == 'working':
+            # Declared working day (e.g. a compensatory Saturday)
+            codes[index] = WORKING
+        elif holiday_type == 'public':
+            codes[index] = HOLIDAY
+        elif codes[index] == WORKING:
+            codes[index] = OPTIONAL_HOLIDAY
+
+    return WorkCalendar(year, weekdays, ''.join(codes))
+
+
+def get_calendar(company_id, year, weekdays=None):
+    if weekdays is None:
+        weekdays = company_weekdays(company_id)
+    if not is_shared_cache():
+        return build(company_id, year, weekdays)
+    key = CALENDAR_KEY.format(
+        company_id=company_id,
+        version=get_version(company_id),
+        year=year,
+        pattern=pattern_key(weekdays)
+    )
+    calendar = cache.get(key)
+    if calendar is None:
+        calendar = build(company_id, year, weekdays)
+        cache.set(key, calendar, CACHE_TIMEOUT)
+    return calendar
+
+
+def count_days(company_id, start, end, weekdays=None, kind=WORKING):
+    """Days of ``kind`` between ``start`` and ``end`` inclusive."""
+    if start > end:
+        return 0
+    return sum(
+        get_calendar(company_id, year, weekdays).count(start, end, kind)
+        for year in range(start.year, end.year + 1)
+    )
+
+
+def working_days_between(company_id, start, end, weekdays=None):
+    return count_days(company_id, start, end, weekdays, WORKING)
+
+
+def is_working_day(company_id, day, weekdays=None):
+    return get_calendar(company_id, day.year, weekdays).is_working_day(day)
@@ -5,3 +5,6 @@ class BiometricsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.biometrics'
     verbose_name = 'Biometric Management'
+
+    def ready(self):
+        import apps.biometrics.signals  # noqa
@@ -0,0 +1,212 @@
+"""
+Streaming importer for offline biometric exports (CSV / XLSX).
+
+Files are read row by row (csv iterator or openpyxl read-only mode), mapped
+in chunks and inserted through BiometricService.ingest_punches, so memory
+stays flat for exports with hundreds of thousands of rows.
+"""
+import csv
+import io
+import logging
+import os
+import tempfile
+from datetime import date, datetime, time
+
+import openpyxl
+from django.core.files import File
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BiometricImportJob
+from .services import BiometricService
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 2000
+COUNTER_FIELDS = ['total_rows', 'imported_rows', 'duplicate_rows', 'error_rows', 'unknown_user_rows']
+
+# Accepted header spellings (compared lower-cased, spaces/dashes as underscores)
+USER_ID_COLUMNS = ('user_id', 'userid', 'biometric_id', 'enroll_no', 'enrollment_no', 'emp_code', 'employee_code', 'ac_no')
+TIMESTAMP_COLUMNS = ('timestamp', 'datetime', 'date_time', 'punch_time', 'log_time', 'check_time')
+DATE_COLUMNS = ('date', 'punch_date', 'log_date')
+TIME_COLUMNS = ('time', 'punch_time_only', 'log_time_only')
+VERIFY_MODE_COLUMNS = ('verify_mode', 'verify', 'verify_type', 'mode')
+
+DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%m/%d/%Y')
+TIME_FORMATS = ('%H:%M:%S', '%H:%M')
+
+
+def _normalise_header(value):
+    return str(value or '').strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def _find_column(headers, candidates):
+    for candidate in candidates:
+        if candidate in headers:
+            return headers.index(candidate)
+    return None
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    value = str(value or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_time(value):
+    if isinstance(value, datetime):
+        return value.time()
+    if isinstance(value, time):
+        return value
+    value = str(value or '').strip()
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+class PunchFileReader:
+    """Iterates (row_number, punch dict | error string) over an export file."""
+
+    def __init__(self, fh, filename):
+        self.fh = fh
+        self.is_excel = filename.lower().endswith(('.xlsx', '.xlsm'))
+
+    def _raw_rows(self):
+        if self.is_excel:
+            workbook = openpyxl.load_workbook(self.fh, read_only=True, data_only=True)
+            try:
+                yield from workbook.active.iter_rows(values_only=True)
+            finally:
+                workbook.close()
+        else:
+            text = io.TextIOWrapper(self.fh, encoding='utf-8-sig', newline='')
+            yield from csv.reader(text)
+
+    def __iter__(self):
+        rows = self._raw_rows()
+        headers = [_normalise_header(h) for h in next(rows, [])]
+
+        user_col = _find_column(headers, USER_ID_COLUMNS)
+        ts_col = _find_column(headers, TIMESTAMP_COLUMNS)
+        date_col = _find_column(headers, DATE_COLUMNS)
+        time_col = _find_column(headers, TIME_COLUMNS)
+        mode_col = _find_column(headers, VERIFY_MODE_COLUMNS)
+
+        if user_col is None or (ts_col is None and (date_col is None or time_col is None)):
+            raise ValueError(
+                'File must have a user id column and either a timestamp column '
+                'or separate date and time columns'
+            )
+
+        for row_number, row in enumerate(rows, start=2):
+            if not row or all(cell in (None, '') for cell in row):
+                continue
+            row = list(row) + [None] * (len(headers) - len(row))
+
+            user_id = row[user_col]
+            if isinstance(user_id, float) and user_id.is_integer():
+                # Excel stores numeric enrolment numbers as floats
+                user_id = int(user_id)
+
+            if ts_col is not None:
+                timestamp = row[ts_col]
+                if isinstance(timestamp, str):
+                    timestamp = timestamp.strip()
+            else:
+                punch_date = _parse_date(row[date_col])
+                punch_time = _parse_time(row[time_col])
+                if not punch_date or not punch_time:
+                    yield row_number, 'Invalid date or time'
+                    continue
+                timestamp = datetime.combine(punch_date, punch_time)
+
+            yield row_number, {
+                'user_id': user_id,
+                'timestamp': timestamp,
+                'verify_mode': row[mode_col] if mode_col is not None else 0,
+            }
+
+
+class BiometricImportService:
+    @staticmethod
+    def run(job):
+        """Import a queued job, then feed the batched attendance processor."""
+        job.status = 'processing'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+
+        with tempfile.TemporaryFile(mode='w+', newline='') as report:
+            writer = csv.writer(report)
+            writer.writerow(['row', 'user_id', 'error'])
+            try:
+                with job.file.open('rb') as fh:
+                    BiometricImportService._import_rows(job, PunchFileReader(fh, job.file.name), writer)
+
+                job.processed_logs = BiometricService.process_logs(job.company_id)
+                job.status = 'completed'
+            except Exception as e:
+                logger.exception(e)
+                job.status = 'failed'
+                job.last_error = str(e)
+                # Chunks flushed before the failure were counted with F() updates
+                job.refresh_from_db(fields=COUNTER_FIELDS)
+
+            if job.error_rows:
+                report.seek(0)
+                name = f'{os.path.splitext(os.path.basename(job.file.name))[0]}_errors.csv'
+                job.error_report.save(name, File(report), save=False)
+
+        job.finished_at = timezone.now()
+        job.save()
+        return job
+
+    @staticmethod
+    def _import_rows(job, reader, writer):
+        chunk, row_numbers = [], []
+        pending = {'rows': 0, 'errors': 0}
+
+        def flush():
+            result = BiometricService.ingest_punches(job.device, chunk) if chunk else None
+            if result:
+                for error in result['errors']:
+                    index = error['index']
+                    writer.writerow([row_numbers[index], chunk[index].get('user_id'), error['error']])
+                unknown = set(result['unknown_users'])
+                job.unknown_user_rows += sum(
+                    1 for punch in chunk if str(punch.get('user_id') or '').strip() in unknown
+                )
+            # Progress is visible to pollers while the job runs
+            BiometricImportJob.objects.filter(pk=job.pk).update(
+                total_rows=F('total_rows') + pending['rows'] + len(chunk),
+                imported_rows=F('imported_rows') + (result['accepted'] if result else 0),
+                duplicate_rows=F('duplicate_rows') + (result['duplicates'] if result else 0),
+                error_rows=F('error_rows') + pending['errors'] + (len(result['errors']) if result else 0),
+                unknown_user_rows=job.unknown_user_rows,
+            )
+            pending['rows'] = pending['errors'] = 0
+
+        for row_number, punch in reader:
+            if isinstance(punch, str):
+                writer.writerow([row_number, '', punch])
+                pending['rows'] += 1
+                pending['errors'] += 1
+                continue
+            chunk.append(punch)
+            row_numbers.append(row_number)
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                flush()
+                chunk, row_numbers = [], []
+        flush()
+
+        job.refresh_from_db(fields=COUNTER_FIELDS)
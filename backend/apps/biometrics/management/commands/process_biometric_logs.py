@@ -0,0 +1,49 @@
+"""
+Worker that turns stored biometric punches into attendance.
+Usage: python manage.py process_biometric_logs [--company <uuid>] [--loop --interval 5]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.biometrics.models import BiometricLog
+from apps.biometrics.services import BiometricService
+
+
+class Command(BaseCommand):
+    help = 'Processes unprocessed biometric logs into attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Only process logs for this company id')
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, polling for new logs every --interval seconds'
+        )
+        parser.add_argument('--interval', type=float, default=5.0, help='Polling interval in seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = self.process_pending(options.get('company'))
+            if processed:
+                self.stdout.write(self.style.SUCCESS(f'Processed {processed} logs.'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def process_pending(self, company_id=None):
+        if company_id:
+            company_ids = [company_id]
+        else:
+            company_ids = BiometricLog.objects.filter(
+                is_processed=False,
+                employee__isnull=False
+            ).values_list('device__company_id', flat=True).distinct()
+
+        total = 0
+        for cid in list(company_ids):
+            try:
+                total += BiometricService.process_logs(cid)
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f'Failed to process logs for company {cid}: {e}'))
+        return total
@@ -0,0 +1,46 @@
+"""
+Runs queued biometric export imports.
+Usage: python manage.py run_biometric_imports [--loop --interval 10]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.biometrics.importer import BiometricImportService
+from apps.biometrics.models import BiometricImportJob
+
+
+class Command(BaseCommand):
+    help = 'Imports queued biometric CSV/XLSX exports and processes them into attendance'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, polling for new jobs every --interval seconds'
+        )
+        parser.add_argument('--interval', type=float, default=10.0, help='Polling interval in seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            ran = self.run_pending()
+            if not options['loop']:
+                break
+            if not ran:
+                time.sleep(options['interval'])
+
+    def run_pending(self):
+        ran = 0
+        for job_id in list(BiometricImportJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True)):
+            # Claim the job so concurrent workers skip it
+            if not BiometricImportJob.objects.filter(pk=job_id, status='pending').update(status='processing'):
+                continue
+            job = BiometricImportJob.objects.select_related('device').get(pk=job_id)
+            BiometricImportService.run(job)
+            ran += 1
+            style = self.style.SUCCESS if job.status == 'completed' else self.style.ERROR
+            self.stdout.write(style(
+                f'{job.original_filename}: {job.status} - {job.imported_rows} imported, '
+                f'{job.duplicate_rows} duplicates, {job.error_rows} errors'
+            ))
+        return ran
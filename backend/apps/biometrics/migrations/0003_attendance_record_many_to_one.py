@@ -0,0 +1,32 @@
+# Generated by Django 4.2.27 on 2026-10-19 00:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("attendance", "0011_merge_20260404_1439"),
+        ("biometrics", "0002_remove_biometricdevice_protocol_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="biometriclog",
+            name="attendance_record",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="source_biometric_logs",
+                to="attendance.attendance",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="biometriclog",
+            index=models.Index(
+                fields=["device", "is_processed"], name="biometrics__device__a81823_idx"
+            ),
+        ),
+    ]
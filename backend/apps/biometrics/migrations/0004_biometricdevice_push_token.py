@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 01:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("biometrics", "0003_attendance_record_many_to_one"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="biometricdevice",
+            name="push_token_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
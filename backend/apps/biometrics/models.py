@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.auth.models import User
 from apps.accounts.models import Company, Employee
 import uuid
 
@@ -51,6 +52,9 @@ class BiometricDevice(models.Model):
     is_active = models.BooleanField(default=True)
     location = models.CharField(max_length=200, blank=True, help_text="e.g. Main Entrance, Cafeteria")
     
+    # Push ingestion: SHA-256 of the device token (raw token is shown once)
+    push_token_hash = models.CharField(max_length=64, blank=True, db_index=True)
+
     # Statistics
     total_logs_fetched = models.PositiveIntegerField(default=0)
     last_error = models.TextField(blank=True)
@@ -76,11 +80,57 @@ class BiometricLog(models.Model):
     is_processed = models.BooleanField(default=False, db_index=True)
     processed_at = models.DateTimeField(null=True, blank=True)
     
-    attendance_record = models.OneToOneField('attendance.Attendance', on_delete=models.SET_NULL, null=True, blank=True, related_name='source_biometric_log')
+    # Many punches (in, out, breaks) roll up into a single day's attendance
+    attendance_record = models.ForeignKey('attendance.Attendance', on_delete=models.SET_NULL, null=True, blank=True, related_name='source_biometric_logs')
 
     class Meta:
         ordering = ['-timestamp']
         unique_together = ('device', 'biometric_user_id', 'timestamp')
+        indexes = [
+            models.Index(fields=['device', 'is_processed']),
+        ]
 
     def __str__(self):
         return f"Log: {self.biometric_user_id} at {self.timestamp}"
+
+
+class BiometricImportJob(models.Model):
+    """Offline punch export (CSV/XLSX) queued for import into BiometricLogs"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='biometric_import_jobs')
+    device = models.ForeignKey(BiometricDevice, on_delete=models.CASCADE, related_name='import_jobs')
+    file = models.FileField(upload_to='biometrics/imports/')
+    original_filename = models.CharField(max_length=255, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    total_rows = models.PositiveIntegerField(default=0)
+    imported_rows = models.PositiveIntegerField(default=0)
+    duplicate_rows = models.PositiveIntegerField(default=0)
+    error_rows = models.PositiveIntegerField(default=0)
+    unknown_user_rows = models.PositiveIntegerField(default=0)
+    processed_logs = models.PositiveIntegerField(default=0, help_text='Logs turned into attendance after import')
+
+    # CSV of (row, error) for rows that could not be imported
+    error_report = models.FileField(upload_to='biometrics/imports/errors/', null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='biometric_import_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['company', 'status']),
+        ]
+
+    def __str__(self):
+        return f"Import {self.original_filename or self.file.name} ({self.status})"
@@ -1,10 +1,15 @@
 from rest_framework import serializers
-from .models import BiometricDevice, BiometricLog
+from .models import BiometricDevice, BiometricLog, BiometricImportJob
 
 class BiometricDeviceSerializer(serializers.ModelSerializer):
+    has_push_token = serializers.SerializerMethodField()
+
     class Meta:
         model = BiometricDevice
-        fields = '__all__'
+        exclude = ('push_token_hash',)
+
+    def get_has_push_token(self, obj):
+        return bool(obj.push_token_hash)
 
 class BiometricLogSerializer(serializers.ModelSerializer):
     employee_name = serializers.CharField(source='employee.full_name', read_only=True)
@@ -13,3 +18,21 @@ class BiometricLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = BiometricLog
         fields = '__all__'
+
+
+class BiometricImportJobSerializer(serializers.ModelSerializer):
+    device_name = serializers.CharField(source='device.name', read_only=True)
+
+    class Meta:
+        model = BiometricImportJob
+        fields = '__all__'
+        read_only_fields = (
+            'company', 'original_filename', 'status', 'total_rows', 'imported_rows',
+            'duplicate_rows', 'error_rows', 'unknown_user_rows', 'processed_logs',
+            'error_report', 'last_error', 'created_by', 'started_at', 'finished_at',
+        )
+
+    def validate_file(self, value):
+        if not value.name.lower().endswith(('.csv', '.xlsx', '.xlsm')):
+            raise serializers.ValidationError('Only CSV or XLSX exports are supported.')
+        return value
@@ -1,10 +1,36 @@
+import hashlib
+import hmac
 import random
+import secrets
 from datetime import datetime, timedelta
+from django.core.cache import cache
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.db.models import Case, When, Value, F
 from .models import BiometricDevice, BiometricLog
 from apps.accounts.models import Employee
-from apps.attendance.models import Attendance, Shift
-from django.db import transaction
+from apps.attendance.models import Attendance, AttendancePolicy, EmployeeShiftAssignment, OvertimeRequest, Shift
+from apps.attendance.counters import AttendanceCounters
+from django.db import connection, transaction
+
+# Punches before this local hour belong to the previous work date when the
+# employee's shift crosses midnight (mirrors the check-in view).
+OVERNIGHT_CUTOFF_HOUR = 4
+
+# Logs are streamed and flushed in chunks of this size
+PROCESS_CHUNK_SIZE = 2000
+
+# Upper bound on punches accepted in one push request
+MAX_PUSH_BATCH = 5000
+
+EMPLOYEE_MAP_CACHE_KEY = 'biometrics:employee_map:{company_id}'
+EMPLOYEE_MAP_CACHE_TIMEOUT = 60 * 60
+
+ATTENDANCE_UPDATE_FIELDS = [
+    'check_in_time', 'check_out_time', 'shift', 'status',
+    'total_hours', 'overtime_hours', 'is_late', 'late_by_minutes',
+    'is_early_departure', 'early_departure_minutes', 'is_auto_marked', 'updated_at',
+]
 
 class BiometricService:
     @staticmethod
@@ -63,49 +89,317 @@ class BiometricService:
             return 0, str(e)
 
     @staticmethod
-    def process_logs(company_id):
-        """Convert BiometricLogs into Attendance records"""
+    def _hash_token(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def generate_push_token(device):
+        """Issue a new push token for a device. Only the hash is stored."""
+        token = secrets.token_urlsafe(32)
+        device.push_token_hash = BiometricService._hash_token(token)
+        device.save(update_fields=['push_token_hash', 'updated_at'])
+        return token
+
+    @staticmethod
+    def authenticate_device(serial_number, token):
+        """Return the active device for a serial/token pair, or None."""
+        if not serial_number or not token:
+            return None
+        device = BiometricDevice.objects.filter(serial_number=serial_number, is_active=True).first()
+        if not device or not device.push_token_hash:
+            return None
+        if not hmac.compare_digest(device.push_token_hash, BiometricService._hash_token(token)):
+            return None
+        return device
+
+    @staticmethod
+    def get_employee_map(company_id):
+        """Cached biometric_user_id -> employee id map for a company."""
+        key = EMPLOYEE_MAP_CACHE_KEY.format(company_id=company_id)
+        employee_map = cache.get(key)
+        if employee_map is None:
+            employee_map = dict(
+                Employee.objects.filter(company_id=company_id, biometric_id__isnull=False)
+                .exclude(biometric_id='')
+                .values_list('biometric_id', 'id')
+            )
+            cache.set(key, employee_map, EMPLOYEE_MAP_CACHE_TIMEOUT)
+        return employee_map
+
+    @staticmethod
+    def invalidate_employee_map(company_id):
+        cache.delete(EMPLOYEE_MAP_CACHE_KEY.format(company_id=company_id))
+
+    @staticmethod
+    def ingest_punches(device, punches):
+        """
+        Store a batch of pushed punches as BiometricLogs.
+
+        Each punch is a dict with ``user_id``, ``timestamp`` and optional
+        ``verify_mode``. Duplicates (within the batch or already stored) are
+        skipped; processing into attendance is left to the log worker.
+        Returns a dict of counts and per-punch errors.
+        """
+        employee_map = BiometricService.get_employee_map(device.company_id)
+        current_tz = timezone.get_current_timezone()
+
+        parsed = {}
+        errors = []
+        for index, punch in enumerate(punches):
+            if not isinstance(punch, dict):
+                errors.append({'index': index, 'error': 'Punch must be an object'})
+                continue
+            user_id = str(punch.get('user_id') or '').strip()
+            raw_timestamp = punch.get('timestamp')
+            if isinstance(raw_timestamp, datetime):
+                timestamp = raw_timestamp
+            elif isinstance(raw_timestamp, str):
+                timestamp = parse_datetime(raw_timestamp.strip())
+            else:
+                timestamp = None
+            if not user_id or timestamp is None:
+                errors.append({'index': index, 'error': 'user_id and a valid timestamp are required'})
+                continue
+            if timezone.is_naive(timestamp):
+                # Devices report wall-clock time in the site's timezone
+                timestamp = timezone.make_aware(timestamp, current_tz)
+            try:
+                verify_mode = int(punch.get('verify_mode') or 0)
+            except (TypeError, ValueError):
+                verify_mode = 0
+            parsed[(user_id, timestamp)] = verify_mode
+
+        unknown_users = set()
+        accepted = 0
+        if parsed:
+            timestamps = [timestamp for _, timestamp in parsed]
+            stored = BiometricLog.objects.filter(
+                device=device,
+                timestamp__range=(min(timestamps), max(timestamps)),
+                biometric_user_id__in={user_id for user_id, _ in parsed}
+            )
+            with transaction.atomic():
+                # Pushes of one device are serialised on its row, so the rows
+                # stored below are this request's and not a concurrent one's
+                list(BiometricDevice.objects.select_for_update().filter(pk=device.pk).values_list('pk'))
+                existing = set(stored.values_list('biometric_user_id', 'timestamp'))
+                new_logs = []
+                for (user_id, timestamp), verify_mode in parsed.items():
+                    if (user_id, timestamp) in existing:
+                        continue
+                    employee_id = employee_map.get(user_id)
+                    if employee_id is None:
+                        unknown_users.add(user_id)
+                    new_logs.append(BiometricLog(
+                        device=device,
+                        biometric_user_id=user_id,
+                        timestamp=timestamp,
+                        verify_mode=verify_mode,
+                        employee_id=employee_id
+                    ))
+
+                if new_logs:
+                    # ignore_conflicts still guards writers that skip the lock
+                    # (fetch_logs); count the keys added while it is held
+                    BiometricLog.objects.bulk_create(new_logs, batch_size=1000, ignore_conflicts=True)
+                    added = set(stored.values_list('biometric_user_id', 'timestamp')) - existing
+                    accepted = len(added & {(log.biometric_user_id, log.timestamp) for log in new_logs})
+
+        BiometricDevice.objects.filter(pk=device.pk).update(
+            total_logs_fetched=F('total_logs_fetched') + accepted,
+            last_sync_at=timezone.now(),
+            status='online'
+        )
+
+        return {
+            'received': len(punches),
+            'accepted': accepted,
+            'duplicates': len(punches) - len(errors) - accepted,
+            'unknown_users': sorted(unknown_users),
+            'errors': errors,
+        }
+
+    @staticmethod
+    def process_logs(company_id, chunk_size=PROCESS_CHUNK_SIZE):
+        """
+        Convert unprocessed BiometricLogs into Attendance records.
+
+        Logs are streamed in (employee, timestamp) order and folded into
+        first-in/last-out per (employee, local work date) in memory. Each
+        chunk is upserted with bulk_create/bulk_update and its logs are
+        marked processed with a single UPDATE.
+        """
         logs = BiometricLog.objects.filter(
             device__company_id=company_id,
             is_processed=False,
             employee__isnull=False
-        ).order_by('timestamp')
+        ).order_by('employee_id', 'timestamp').values_list(
+            'id', 'employee_id', 'timestamp'
+        )
 
+        processor = _AttendanceLogProcessor(company_id)
         processed_count = 0
-        
-        with transaction.atomic():
-            for log in logs:
-                log_date = log.timestamp.date()
-                emp = log.employee
-                
-                # Find or create attendance for this day
-                attendance, created = Attendance.objects.get_or_create(
-                    employee=emp,
-                    date=log_date,
-                    defaults={'status': 'present'} # Basic default
-                )
-                
-                # Update check-in/out based on time
-                # Simple logic: earlist log is In, latest is Out
-                if not attendance.check_in_time or log.timestamp < attendance.check_in_time:
-                    attendance.check_in_time = log.timestamp
-                
-                if not attendance.check_out_time or log.timestamp > attendance.check_out_time:
-                    attendance.check_out_time = log.timestamp
-                
-                # Auto-assign default shift if missing
-                if not attendance.shift:
-                    default_shift = Shift.objects.filter(company=emp.company, is_default=True).first()
-                    attendance.shift = default_shift
+        chunk = []
+
+        for row in logs.iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                processed_count += processor.flush(chunk)
+                chunk = []
+
+        if chunk:
+            processed_count += processor.flush(chunk)
 
-                attendance.save()
-                
-                # Mark log as processed
-                log.is_processed = True
-                log.processed_at = timezone.now()
-                log.attendance_record = attendance
-                log.save()
-                
-                processed_count += 1
-                
         return processed_count
+
+
+class _AttendanceLogProcessor:
+    """Folds chunks of raw punches into Attendance rows for one company."""
+
+    def __init__(self, company_id):
+        self.company_id = company_id
+        self.policy = AttendancePolicy.objects.filter(company_id=company_id, is_active=True).first()
+        self.shifts = {shift.id: shift for shift in Shift.objects.filter(company_id=company_id)}
+        self.default_shift = next((shift for shift in self.shifts.values() if shift.is_default), None)
+
+    def _shift_resolver(self, employee_ids):
+        """Return a callable (employee_id, work_date) -> Shift for the chunk."""
+        assignments = {}
+        queryset = EmployeeShiftAssignment.objects.filter(
+            employee_id__in=employee_ids,
+            is_active=True
+        ).select_related('shift').order_by('-effective_from')
+        for assignment in queryset:
+            assignments.setdefault(assignment.employee_id, []).append(assignment)
+
+        def resolve(employee_id, work_date):
+            for assignment in assignments.get(employee_id, ()):
+                if assignment.effective_from <= work_date and (
+                    assignment.effective_to is None or assignment.effective_to >= work_date
+                ):
+                    return assignment.shift
+            return self.default_shift
+
+        return resolve
+
+    def _work_date(self, employee_id, timestamp, resolve_shift):
+        local_ts = timezone.localtime(timestamp)
+        work_date = local_ts.date()
+        if local_ts.hour < OVERNIGHT_CUTOFF_HOUR:
+            yesterday = work_date - timedelta(days=1)
+            shift = resolve_shift(employee_id, yesterday)
+            if shift and shift.end_time < shift.start_time:
+                return yesterday
+        return work_date
+
+    def _approved_overtime(self, keys):
+        """(employee_id, date) -> approved overtime hours, when the policy needs them."""
+        if not (self.policy and self.policy.require_overtime_pre_approval):
+            return {}
+        employee_ids = {employee_id for employee_id, _ in keys}
+        dates = {work_date for _, work_date in keys}
+        return {
+            (employee_id, work_date): hours
+            for employee_id, work_date, hours in OvertimeRequest.objects.filter(
+                employee_id__in=employee_ids,
+                date__in=dates,
+                status='approved'
+            ).values_list('employee_id', 'date', 'hours_requested')
+        }
+
+    def _apply_punches(self, attendance, first_punch, last_punch, resolve_shift, approved_overtime=None):
+        if not attendance.check_in_time or first_punch < attendance.check_in_time:
+            attendance.check_in_time = first_punch
+        if not attendance.check_out_time or last_punch > attendance.check_out_time:
+            attendance.check_out_time = last_punch
+        if not attendance.shift_id:
+            attendance.shift = resolve_shift(attendance.employee_id, attendance.date)
+        elif attendance.shift_id in self.shifts:
+            attendance.shift = self.shifts[attendance.shift_id]
+
+        # Same derivations as Attendance.save(), without the per-row queries
+        attendance.calculate_hours(
+            policy=self.policy,
+            refresh_breaks=False,
+            approved_overtime=approved_overtime
+        )
+        attendance.check_late_arrival()
+        attendance.check_early_departure()
+        if attendance.status == 'late':
+            attendance.is_late = True
+        attendance.is_auto_marked = False
+        attendance.updated_at = timezone.now()
+
+    def flush(self, rows):
+        employee_ids = {employee_id for _, employee_id, _ in rows}
+        resolve_shift = self._shift_resolver(employee_ids)
+
+        # (employee_id, work_date) -> [first_punch, last_punch, [log ids]]
+        groups = {}
+        for log_id, employee_id, timestamp in rows:
+            key = (employee_id, self._work_date(employee_id, timestamp, resolve_shift))
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [timestamp, timestamp, [log_id]]
+            else:
+                group[0] = min(group[0], timestamp)
+                group[1] = max(group[1], timestamp)
+                group[2].append(log_id)
+
+        approvals = self._approved_overtime(groups.keys())
+
+        with transaction.atomic():
+            existing = {
+                (attendance.employee_id, attendance.date): attendance
+                for attendance in self._attendance_queryset(groups.keys()).select_for_update()
+                if (attendance.employee_id, attendance.date) in groups
+            }
+
+            rows_to_upsert = []
+            for key, (first_punch, last_punch, _) in groups.items():
+                attendance = existing.get(key)
+                if attendance is None:
+                    employee_id, work_date = key
+                    attendance = Attendance(employee_id=employee_id, date=work_date, status='present')
+                self._apply_punches(attendance, first_punch, last_punch, resolve_shift, approvals.get(key))
+                rows_to_upsert.append(attendance)
+
+            # INSERT ... ON DUPLICATE KEY UPDATE on (employee, date). A row
+            # created concurrently by a web check-in is updated in place, so
+            # ids are re-read below rather than taken from the instances.
+            Attendance.objects.bulk_create(
+                rows_to_upsert,
+                batch_size=500,
+                update_conflicts=True,
+                # MySQL upserts on any unique key and rejects an explicit target
+                unique_fields=['employee', 'date'] if connection.features.supports_update_conflicts_with_target else None,
+                update_fields=ATTENDANCE_UPDATE_FIELDS,
+            )
+            attendance_ids = {
+                (employee_id, work_date): attendance_id
+                for employee_id, work_date, attendance_id in self._attendance_queryset(groups.keys())
+                .values_list('employee_id', 'date', 'id')
+                if (employee_id, work_date) in groups
+            }
+
+            whens = [
+                When(id__in=log_ids, then=Value(attendance_ids[key]))
+                for key, (_, _, log_ids) in groups.items()
+            ]
+            log_ids = [log_id for log_id, _, _ in rows]
+            BiometricLog.objects.filter(id__in=log_ids).update(
+                is_processed=True,
+                processed_at=timezone.now(),
+                attendance_record=Case(*whens, default=None)
+            )
+
+            for work_date in {work_date for _, work_date in groups}:
+                AttendanceCounters.invalidate(self.company_id, work_date)
+
+        return len(rows)
+
+    def _attendance_queryset(self, keys):
+        # Bounding box over the chunk; callers discard rows outside `keys`
+        employee_ids = {employee_id for employee_id, _ in keys}
+        dates = {work_date for _, work_date in keys}
+        return Attendance.objects.filter(employee_id__in=employee_ids, date__in=dates)
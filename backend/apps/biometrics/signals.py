@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.accounts.models import Employee
+from .services import BiometricService
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_biometric_employee_map(sender, instance, **kwargs):
+    """Biometric IDs or company may have changed; drop the cached id map."""
+    BiometricService.invalidate_employee_map(instance.company_id)
@@ -0,0 +1,144 @@
+import tempfile
+from datetime import date, datetime, time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Employee, Organization
+from apps.attendance.models import Attendance, Shift
+from .importer import BiometricImportService
+from .models import BiometricDevice, BiometricImportJob, BiometricLog
+from .services import BiometricService
+
+
+def local(day, hour, minute=0):
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+class BiometricPunchProcessingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = Organization.objects.create(name="Punch Corp", slug="punch-corp")
+        Shift.objects.create(
+            company=self.company, name="General", code="GEN",
+            start_time=time(9, 0), end_time=time(18, 0), is_default=True
+        )
+        self.employee = Employee.objects.create(
+            employee_id="EMP001", company=self.company, first_name="John", email="john@punch.com",
+            date_of_joining=date(2020, 1, 1), biometric_id="101"
+        )
+        self.device = BiometricDevice.objects.create(company=self.company, name="Gate", serial_number="SN-1")
+
+    def _push(self, *punches):
+        return BiometricService.ingest_punches(
+            self.device, [{'user_id': user_id, 'timestamp': timestamp.isoformat()} for user_id, timestamp in punches]
+        )
+
+    def test_ingest_counts_stored_punches(self):
+        day = date(2024, 5, 6)
+        result = self._push(('101', local(day, 9)), ('101', local(day, 18)), ('999', local(day, 10)))
+        self.assertEqual((result['accepted'], result['duplicates']), (3, 0))
+        self.assertEqual(result['unknown_users'], ['999'])
+
+        result = self._push(('101', local(day, 9)), ('101', local(day, 19)))
+        self.assertEqual((result['accepted'], result['duplicates']), (1, 1))
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.total_logs_fetched, 4)
+
+    def test_process_upserts_attendance(self):
+        day, next_day = date(2024, 5, 6), date(2024, 5, 7)
+        # Web check-in already created the next day's row
+        Attendance.objects.create(employee=self.employee, date=next_day, status='present', check_in_time=local(next_day, 8, 30))
+
+        self._push(('101', local(day, 9)), ('101', local(day, 18)), ('101', local(next_day, 9)), ('101', local(next_day, 17)))
+        self.assertEqual(BiometricService.process_logs(self.company.id), 4)
+
+        first = Attendance.objects.get(employee=self.employee, date=day)
+        self.assertEqual((first.check_in_time, first.check_out_time), (local(day, 9), local(day, 18)))
+        second = Attendance.objects.get(employee=self.employee, date=next_day)
+        self.assertEqual((second.check_in_time, second.check_out_time), (local(next_day, 8, 30), local(next_day, 17)))
+
+        # A later punch updates the same row
+        self._push(('101', local(day, 19)))
+        BiometricService.process_logs(self.company.id)
+        self.assertEqual(Attendance.objects.filter(employee=self.employee, date=day).count(), 1)
+        self.assertEqual(Attendance.objects.get(employee=self.employee, date=day).check_out_time, local(day, 19))
+        self.assertFalse(BiometricLog.objects.filter(is_processed=False, employee=self.employee).exists())
+        self.assertTrue(BiometricLog.objects.filter(attendance_record=first).exists())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class BiometricImportTest(TestCase):
+    ROWS = (
+        "user_id,timestamp\n"
+        "101,2024-05-06 09:00:00\n"
+        "101,not-a-date\n"
+        "101,2024-05-06 18:00:00\n"
+        "101,2024-05-07 09:00:00\n"
+    )
+
+    setUp = BiometricPunchProcessingTest.setUp
+
+    def _run(self):
+        job = BiometricImportJob.objects.create(
+            company=self.company, device=self.device,
+            file=SimpleUploadedFile('punches.csv', self.ROWS.encode()), original_filename='punches.csv'
+        )
+        return BiometricImportService.run(job)
+
+    def test_import_counts_rows_and_processes_logs(self):
+        job = self._run()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.total_rows, job.imported_rows, job.error_rows), (4, 3, 1))
+        self.assertEqual(job.processed_logs, 3)
+        self.assertIn('3,101,user_id and a valid timestamp are required', job.error_report.read().decode())
+        self.assertTrue(Attendance.objects.filter(employee=self.employee, date=date(2024, 5, 6)).exists())
+
+    @mock.patch('apps.biometrics.importer.IMPORT_CHUNK_SIZE', 2)
+    def test_failure_keeps_counters_and_error_report(self):
+        ingest, calls = BiometricService.ingest_punches, []
+
+        def flaky(device, punches):
+            calls.append(punches)
+            if len(calls) > 1:
+                raise RuntimeError('device gone')
+            return ingest(device, punches)
+
+        with mock.patch.object(BiometricService, 'ingest_punches', side_effect=flaky):
+            job = self._run()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.last_error), ('failed', 'device gone'))
+        self.assertEqual((job.total_rows, job.imported_rows, job.error_rows), (2, 1, 1))
+        self.assertIn('3,101,user_id and a valid timestamp are required', job.error_report.read().decode())
+
+
+class DevicePushTest(TestCase):
+    setUp = BiometricPunchProcessingTest.setUp
+
+    def _post(self, token, punches):
+        return APIClient().post(
+            '/api/biometrics/push/', {'punches': punches}, format='json',
+            HTTP_X_DEVICE_SERIAL='SN-1', HTTP_X_DEVICE_TOKEN=token
+        )
+
+    def test_push_stores_punches_for_authenticated_device(self):
+        token = BiometricService.generate_push_token(self.device)
+        punch = {'user_id': '101', 'timestamp': local(date(2024, 5, 6), 9).isoformat()}
+        self.assertEqual(self._post('wrong', [punch]).status_code, 401)
+
+        response = self._post(token, [punch, punch])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.json()['accepted'], response.json()['duplicates']), (1, 1))
+        self.assertEqual(BiometricLog.objects.get().employee, self.employee)
+
+        # Re-enrolling under a new id drops the cached biometric id map
+        self.employee.biometric_id = '202'
+        self.employee.save()
+        response = self._post(token, [{'user_id': '202', 'timestamp': local(date(2024, 5, 6), 18).isoformat()}])
+        self.assertEqual(response.json()['unknown_users'], [])
+        self.assertEqual(BiometricLog.objects.filter(employee=self.employee).count(), 2)
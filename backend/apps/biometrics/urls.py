@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BiometricDeviceViewSet, BiometricLogViewSet
+from .views import BiometricDeviceViewSet, BiometricLogViewSet, BiometricImportJobViewSet, device_push
 
 router = DefaultRouter()
 router.register(r'devices', BiometricDeviceViewSet, basename='biometric-device')
 router.register(r'logs', BiometricLogViewSet, basename='biometric-log')
+router.register(r'imports', BiometricImportJobViewSet, basename='biometric-import')
 
 urlpatterns = [
+    path('push/', device_push, name='biometric-device-push'),
     path('', include(router.urls)),
 ]
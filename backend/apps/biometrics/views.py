@@ -1,10 +1,11 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes, authentication_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from .models import BiometricDevice, BiometricLog
-from .serializers import BiometricDeviceSerializer, BiometricLogSerializer
-from .services import BiometricService
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAuthenticated, AllowAny
+from .models import BiometricDevice, BiometricLog, BiometricImportJob
+from .serializers import BiometricDeviceSerializer, BiometricLogSerializer, BiometricImportJobSerializer
+from .services import BiometricService, MAX_PUSH_BATCH
 
 class BiometricDeviceViewSet(viewsets.ModelViewSet):
     serializer_class = BiometricDeviceSerializer
@@ -36,6 +37,18 @@ class BiometricDeviceViewSet(viewsets.ModelViewSet):
             'new_logs': count
         })
 
+    @action(detail=True, methods=['post'])
+    def push_token(self, request, pk=None):
+        """Issue (or rotate) the token the device uses for push ingestion."""
+        device = self.get_object()
+        token = BiometricService.generate_push_token(device)
+        return Response({
+            'status': 'success',
+            'serial_number': device.serial_number,
+            'push_token': token,
+            'message': 'Store this token on the device; it will not be shown again.'
+        })
+
     @action(detail=False, methods=['post'])
     def sync_all(self, request):
         devices = self.get_queryset().filter(is_active=True)
@@ -61,3 +74,65 @@ class BiometricLogViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         return BiometricLog.objects.filter(device__company__employees__user=self.request.user).distinct()
+
+class BiometricImportJobViewSet(viewsets.ModelViewSet):
+    """
+    Upload offline punch exports (CSV/XLSX). Jobs are queued and run by
+    ``manage.py run_biometric_imports``; poll the job for progress.
+    """
+    serializer_class = BiometricImportJobSerializer
+    permission_classes = [IsAuthenticated]
+    http_method_names = ['get', 'post', 'head', 'options']
+
+    def get_queryset(self):
+        return BiometricImportJob.objects.filter(
+            company__employees__user=self.request.user
+        ).select_related('device').distinct()
+
+    def perform_create(self, serializer):
+        device = serializer.validated_data['device']
+        if not BiometricDevice.objects.filter(pk=device.pk, company__employees__user=self.request.user).exists():
+            raise PermissionDenied('Device does not belong to your company.')
+        upload = serializer.validated_data['file']
+        serializer.save(
+            company_id=device.company_id,
+            original_filename=upload.name,
+            created_by=self.request.user
+        )
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def device_push(request):
+    """
+    Punch ingestion endpoint for devices that push their logs.
+
+    Headers: ``X-Device-Serial`` and ``X-Device-Token``.
+    Body: ``{"punches": [{"user_id": "...", "timestamp": "...", "verify_mode": 1}]}``
+    Logs are stored immediately; attendance is built by the log worker
+    (``manage.py process_biometric_logs``).
+    """
+    device = BiometricService.authenticate_device(
+        request.headers.get('X-Device-Serial') or request.data.get('serial_number'),
+        request.headers.get('X-Device-Token')
+    )
+    if not device:
+        return Response({'error': 'Invalid device credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    punches = request.data.get('punches')
+    if not isinstance(punches, list) or not punches:
+        return Response({'error': 'punches must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(punches) > MAX_PUSH_BATCH:
+        return Response(
+            {'error': f'At most {MAX_PUSH_BATCH} punches are accepted per request'},
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
+    result = BiometricService.ingest_punches(device, punches)
+    return Response({'status': 'accepted', **result}, status=status.HTTP_202_ACCEPTED)
@@ -1,13 +1,41 @@
 import logging
-from django.core.mail import get_connection, EmailMessage
+from apps.notifications.outbox import RenderedEmail, enqueue
 from apps.payroll.models import PayrollSettings
 
 logger = logging.getLogger(__name__)
 
+
+def _smtp_connection(settings):
+    """get_connection() kwargs for a company's own SMTP server."""
+    return {
+        'backend': 'django.core.mail.backends.smtp.EmailBackend',
+        'host': settings.email_host,
+        'port': settings.email_port,
+        'username': settings.email_host_user,
+        'password': settings.email_host_password,
+        'use_tls': settings.email_use_tls,
+        'timeout': 10,
+    }
+
+
 def send_claim_status_email(claim, status, comments=""):
     """
-    Send an email notification to the employee regarding their claim status.
+    Queue an email notification to the employee regarding their claim status.
     """
+    return enqueue(
+        'expense',
+        renderer='apps.expenses.emails.render_claim_status_email',
+        params=[claim.pk, status, comments],
+        dedup_key=f"expense:{claim.pk}:{status}:{len(claim.approval_history or [])}",
+    )
+
+
+def render_claim_status_email(claim_id, status, comments=""):
+    from .models import ExpenseClaim
+
+    claim = ExpenseClaim.objects.select_related('employee').filter(pk=claim_id).first()
+    if claim is None:
+        return None
     employee = claim.employee
     company = getattr(employee, 'company', None)
     if not company:
@@ -17,27 +45,12 @@ def send_claim_status_email(claim, status, comments=""):
 
     if not company:
         logger.warning(f"No company found for employee {employee.email}, skipping email.")
-        return
+        return None
 
     settings = PayrollSettings.objects.filter(company=company).first()
     if not settings or not settings.email_host:
         logger.warning(f"Email configuration incomplete for {company.name}, skipping email.")
-        return
-
-    # Connection Setup
-    try:
-        connection = get_connection(
-            backend='django.core.mail.backends.smtp.EmailBackend',
-            host=settings.email_host,
-            port=settings.email_port,
-            username=settings.email_host_user,
-            password=settings.email_host_password,
-            use_tls=settings.email_use_tls,
-            timeout=10
-        )
-    except Exception as e:
-        logger.error(f"Failed to connect to SMTP for claim email: {e}")
-        return
+        return None
 
     subject_map = {
         'approved': f"Expense Claim Approved: {claim.title}",
@@ -57,26 +70,30 @@ def send_claim_status_email(claim, status, comments=""):
 
     from_email = settings.email_host_user # Or default_from_email if exists
 
-    try:
-        email = EmailMessage(
-            subject=subject,
-            body=body,
-            from_email=from_email,
-            to=[employee.email],
-            connection=connection
-        )
-        email.send()
-        connection.close()
-        logger.info(f"Sent {status} email to {employee.email} for claim {claim.id}")
-    except Exception as e:
-        logger.error(f"Failed to send claim email to {employee.email}: {e}")
+    return RenderedEmail([employee.email], subject, body, '', from_email, _smtp_connection(settings))
 
 
 def send_manager_notification_email(claim, stage):
     """
-    Notify admin/finance users that a claim has been escalated to Level 2.
+    Queue a notification to admin/finance users that a claim has been
+    escalated to Level 2. Escalations close together are sent as a digest.
     """
+    return enqueue(
+        'expense',
+        renderer='apps.expenses.emails.render_manager_notification_email',
+        params=[claim.pk, stage],
+        dedup_key=f"expense:{claim.pk}:escalated:{stage}",
+        digest_key='expense-approvals',
+    )
+
+
+def render_manager_notification_email(claim_id, stage):
     from django.contrib.auth import get_user_model
+    from .models import ExpenseClaim
+
+    claim = ExpenseClaim.objects.select_related('employee', 'category').filter(pk=claim_id).first()
+    if claim is None or claim.current_stage != stage:
+        return None
     User = get_user_model()
 
     company = getattr(claim.employee, 'company', None)
@@ -87,13 +104,13 @@ def send_manager_notification_email(claim, stage):
 
     if not company:
         logger.warning("No company found; skipping manager notification.")
-        return
+        return None
 
     from apps.payroll.models import PayrollSettings
     settings = PayrollSettings.objects.filter(company=company).first()
     if not settings or not settings.email_host:
         logger.warning(f"Email configuration incomplete for {company.name}; skipping manager notification.")
-        return
+        return None
 
     # Find all staff/admin users within the company
     admin_users = User.objects.filter(is_staff=True, is_active=True).exclude(email='')
@@ -101,21 +118,7 @@ def send_manager_notification_email(claim, stage):
 
     if not admin_emails:
         logger.warning("No admin users with emails found; skipping manager notification.")
-        return
-
-    try:
-        connection = get_connection(
-            backend='django.core.mail.backends.smtp.EmailBackend',
-            host=settings.email_host,
-            port=settings.email_port,
-            username=settings.email_host_user,
-            password=settings.email_host_password,
-            use_tls=settings.email_use_tls,
-            timeout=10
-        )
-    except Exception as e:
-        logger.error(f"Failed to connect to SMTP for manager notification: {e}")
-        return
+        return None
 
     subject = f"[Action Required] Expense Claim Awaiting Finance Approval: {claim.title}"
     body = (
@@ -130,17 +133,5 @@ def send_manager_notification_email(claim, stage):
         f"Best Regards,\n{company.name} HR System"
     )
 
-    try:
-        email = EmailMessage(
-            subject=subject,
-            body=body,
-            from_email=settings.email_host_user,
-            to=admin_emails,
-            connection=connection
-        )
-        email.send()
-        connection.close()
-        logger.info(f"Sent Level 2 manager notification to {admin_emails} for claim {claim.id}")
-    except Exception as e:
-        logger.error(f"Failed to send manager notification email: {e}")
+    return RenderedEmail(admin_emails, subject, body, '', settings.email_host_user, _smtp_connection(settings))
 
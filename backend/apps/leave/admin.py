@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import LeaveType, LeaveBalance, LeaveRequest, LeaveEncashment, LeaveSettings, GlobalLeaveSettings
+from .models import LeaveType, LeaveBalance, LeaveLedgerEntry, LeaveRequest, LeaveEncashment, LeaveSettings, GlobalLeaveSettings
 
 
 @admin.register(LeaveType)
@@ -45,3 +45,16 @@ class LeaveEncashmentAdmin(admin.ModelAdmin):
     list_filter = ['status', 'year', 'leave_type']
     search_fields = ['employee__employee_id', 'employee__first_name']
     readonly_fields = ['total_amount']
+
+
+@admin.register(LeaveLedgerEntry)
+class LeaveLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'leave_type', 'year', 'entry_type', 'allocated', 'used', 'pending', 'carry_forward', 'created_at']
+    list_filter = ['entry_type', 'leave_type', 'year']
+    search_fields = ['employee__employee_id', 'employee__first_name']
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,65 @@
+"""
+Per-company leave request counters by status, kept in the cache backend.
+
+Approval inboxes and the stats endpoint read these instead of counting the
+company's whole request history. LeaveRequest.save()/delete() and the cancel
+view move them with atomic ``cache.incr`` after commit; a missing key is
+rebuilt with one grouped query over the (company, status) index.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+STATUSES = ('pending', 'approved', 'rejected', 'cancelled')
+
+CACHE_KEY = 'leave:counters:{company_id}:{status}'
+
+# Expire so that edits made outside the instrumented paths are picked up
+CACHE_TIMEOUT = 60 * 60
+
+
+def _key(company_id, status):
+    return CACHE_KEY.format(company_id=company_id, status=status)
+
+
+class LeaveRequestCounters:
+    @staticmethod
+    def get(company_id):
+        keys = {_key(company_id, status): status for status in STATUSES}
+        cached = cache.get_many(keys.keys())
+        if len(cached) < len(STATUSES):
+            return LeaveRequestCounters.rebuild(company_id)
+        return {keys[key]: value for key, value in cached.items()}
+
+    @staticmethod
+    def rebuild(company_id):
+        from .models import LeaveRequest
+
+        counts = dict.fromkeys(STATUSES, 0)
+        rows = LeaveRequest.objects.filter(company_id=company_id).values('status').annotate(count=Count('id'))
+        for row in rows:
+            if row['status'] in counts:
+                counts[row['status']] = row['count']
+        cache.set_many({_key(company_id, status): value for status, value in counts.items()}, CACHE_TIMEOUT)
+        return counts
+
+    @staticmethod
+    def transition(company_id, old_status, new_status):
+        """Move one request from ``old_status`` to ``new_status`` (either may be None) on commit."""
+        if not company_id or old_status == new_status:
+            return
+
+        def _apply():
+            try:
+                if old_status:
+                    cache.decr(_key(company_id, old_status))
+                if new_status:
+                    cache.incr(_key(company_id, new_status))
+            except ValueError:
+                LeaveRequestCounters.invalidate(company_id)
+
+        transaction.on_commit(_apply)
+
+    @staticmethod
+    def invalidate(company_id):
+        cache.delete_many([_key(company_id, status) for status in STATUSES])
@@ -0,0 +1,230 @@
+"""
+Leave cycle engine.
+
+Computes, for every active employee of a company and every active leave
+type, the balance the employee should hold for a year as of a given day:
+
+- allocation/accrual from days_per_year and the type's accrual_type,
+  pro-rated from the month the employee becomes eligible (joining date,
+  applicable_after_months and, optionally, end of probation)
+- carry-forward of the previous year's unused days up to
+  max_carry_forward_days; the remainder lapses
+- the max_balance cap on what accrual may add
+
+Everything is loaded with three queries and planned in memory. The plan is a
+list of per-balance changes that can be returned as a dry-run diff or
+applied: missing balances are inserted with bulk_create(ignore_conflicts),
+counters are moved with F() deltas through bulk_update and every delta is
+recorded in the leave ledger. Allocation never decreases, so runs are
+idempotent and manual grants are preserved.
+"""
+from calendar import monthrange
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.accounts.models import Employee
+from .models import LeaveBalance, LeaveLedgerEntry, LeaveType
+
+BATCH_SIZE = 1000
+ZERO = Decimal('0')
+TWO_PLACES = Decimal('0.01')
+
+# Months credited per accrual_type when the cycle is evaluated on a given month
+LAST_CREDITED_MONTH = {
+    'full_year': lambda month: 12,
+    'monthly': lambda month: month,
+    'quarterly': lambda month: ((month - 1) // 3 + 1) * 3,
+}
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    year = day.year + month // 12
+    month = month % 12 + 1
+    return date(year, month, min(day.day, monthrange(year, month)[1]))
+
+
+def probation_end(employee):
+    # Mirrors Employee.is_on_probation
+    if employee['confirmation_date']:
+        return employee['confirmation_date']
+    return employee['date_of_joining'] + timedelta(days=30 * employee['probation_period_months'])
+
+
+def eligible_from(employee, leave_type):
+    start = add_months(employee['date_of_joining'], leave_type.applicable_after_months)
+    if not leave_type.accrues_during_probation:
+        start = max(start, probation_end(employee))
+    return start
+
+
+def entitlement(employee, leave_type, year, as_of):
+    """Days of ``leave_type`` the employee has earned in ``year`` by ``as_of``."""
+    start = eligible_from(employee, leave_type)
+    if start > as_of:
+        return ZERO
+    if start.year < year:
+        first_month = 1
+    else:
+        # A month counts when eligibility starts in its first half
+        first_month = start.month + (1 if start.day > 15 else 0)
+    last_month = LAST_CREDITED_MONTH.get(leave_type.accrual_type, LAST_CREDITED_MONTH['full_year'])(as_of.month)
+    months = max(last_month - first_month + 1, 0)
+    return (leave_type.days_per_year * months / 12).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+class LeaveCycleEngine:
+    def __init__(self, company_id, year, as_of=None, employee_ids=None):
+        self.company_id = company_id
+        self.year = int(year)
+        as_of = as_of or timezone.localdate()
+        # Clip into the cycle year: a rollover run in December for next year
+        # evaluates on 1 January, a rerun of a past year on 31 December
+        self.as_of = max(date(self.year, 1, 1), min(as_of, date(self.year, 12, 31)))
+        self.employee_ids = employee_ids
+
+    def _load(self):
+        self.leave_types = {lt.id: lt for lt in LeaveType.objects.filter(company_id=self.company_id, is_active=True)}
+
+        employees = Employee.objects.filter(
+            company_id=self.company_id, status='active', date_of_joining__lte=self.as_of
+        )
+        if self.employee_ids is not None:
+            employees = employees.filter(id__in=self.employee_ids)
+        self.employees = list(employees.values(
+            'id', 'employee_id', 'date_of_joining', 'confirmation_date', 'probation_period_months'
+        ).order_by('employee_id'))
+
+        # (employee_id, leave_type_id, year) -> balance values
+        self.balances = {}
+        balances = LeaveBalance.objects.filter(
+            leave_type_id__in=list(self.leave_types),
+            year__in=(self.year - 1, self.year),
+            employee__company_id=self.company_id
+        )
+        if self.employee_ids is not None:
+            balances = balances.filter(employee_id__in=self.employee_ids)
+        for row in balances.values('id', 'employee_id', 'leave_type_id', 'year', 'allocated', 'used', 'pending', 'carry_forward'):
+            self.balances[(row['employee_id'], row['leave_type_id'], row['year'])] = row
+
+    def plan(self, carry_forward=True):
+        """Per-balance changes needed to bring the year up to date."""
+        self._load()
+        changes = []
+        for employee in self.employees:
+            for leave_type in self.leave_types.values():
+                change = self._plan_one(employee, leave_type, carry_forward)
+                if change:
+                    changes.append(change)
+        return changes
+
+    def _plan_one(self, employee, leave_type, carry_forward):
+        current = self.balances.get((employee['id'], leave_type.id, self.year))
+        allocated = current['allocated'] if current else ZERO
+        cf = current['carry_forward'] if current else ZERO
+        used = current['used'] if current else ZERO
+        pending = current['pending'] if current else ZERO
+
+        new_cf, lapsed = cf, ZERO
+        if carry_forward and leave_type.is_carry_forward:
+            previous = self.balances.get((employee['id'], leave_type.id, self.year - 1))
+            if previous:
+                unused = max(
+                    previous['allocated'] + previous['carry_forward'] - previous['used'] - previous['pending'],
+                    ZERO
+                )
+                new_cf = min(unused, leave_type.max_carry_forward_days)
+                lapsed = unused - new_cf
+
+        target = entitlement(employee, leave_type, self.year, self.as_of)
+        if leave_type.max_balance is not None:
+            target = min(target, leave_type.max_balance + used + pending - new_cf)
+        new_allocated = max(target, allocated)
+
+        if current and new_allocated == allocated and new_cf == cf:
+            return None
+        return {
+            'balance_id': current['id'] if current else None,
+            'employee': employee['id'],
+            'employee_id': employee['employee_id'],
+            'leave_type_id': leave_type.id,
+            'leave_type': leave_type.name,
+            'accrual_type': leave_type.accrual_type,
+            'year': self.year,
+            'allocated_before': allocated,
+            'allocated_after': new_allocated,
+            'carry_forward_before': cf,
+            'carry_forward_after': new_cf,
+            'lapsed': lapsed,
+        }
+
+    @transaction.atomic
+    def apply(self, changes, created_by=None):
+        """Write a plan produced by plan()."""
+        missing = [c for c in changes if c['balance_id'] is None]
+        if missing:
+            LeaveBalance.objects.bulk_create([
+                LeaveBalance(employee_id=c['employee'], leave_type_id=c['leave_type_id'], year=self.year)
+                for c in missing
+            ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+            ids = dict(
+                ((employee_id, leave_type_id), pk)
+                for pk, employee_id, leave_type_id in LeaveBalance.objects.filter(
+                    year=self.year,
+                    employee_id__in={c['employee'] for c in missing},
+                    leave_type_id__in={c['leave_type_id'] for c in missing}
+                ).values_list('id', 'employee_id', 'leave_type_id')
+            )
+            for c in missing:
+                c['balance_id'] = ids[(c['employee'], c['leave_type_id'])]
+
+        now = timezone.now()
+        updates, entries = [], []
+        for c in changes:
+            allocated = c['allocated_after'] - c['allocated_before']
+            cf = c['carry_forward_after'] - c['carry_forward_before']
+            if not allocated and not cf:
+                continue
+            balance = LeaveBalance(pk=c['balance_id'])
+            balance.allocated = F('allocated') + allocated
+            balance.carry_forward = F('carry_forward') + cf
+            balance.updated_at = now
+            updates.append(balance)
+
+            common = dict(
+                balance_id=c['balance_id'], employee_id=c['employee'], leave_type_id=c['leave_type_id'],
+                year=self.year, created_by=created_by
+            )
+            if allocated:
+                entry_type = 'allocation' if c['accrual_type'] == 'full_year' else 'accrual'
+                entries.append(LeaveLedgerEntry(
+                    entry_type=entry_type, allocated=allocated,
+                    remarks=f'Leave cycle as of {self.as_of}', **common
+                ))
+            if cf:
+                entries.append(LeaveLedgerEntry(
+                    entry_type='carry_forward', carry_forward=cf,
+                    remarks=f'Carried from {self.year - 1}; {c["lapsed"]} days lapsed', **common
+                ))
+
+        LeaveBalance.objects.bulk_update(updates, ['allocated', 'carry_forward', 'updated_at'], batch_size=BATCH_SIZE)
+        LeaveLedgerEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+
+    def run(self, carry_forward=True, dry_run=False, created_by=None):
+        changes = self.plan(carry_forward=carry_forward)
+        result = {
+            'year': self.year,
+            'as_of': self.as_of,
+            'dry_run': dry_run,
+            'created': sum(1 for c in changes if c['balance_id'] is None),
+            'updated': sum(1 for c in changes if c['balance_id'] is not None),
+        }
+        if dry_run:
+            result['changes'] = changes
+        else:
+            self.apply(changes, created_by=created_by)
+        return result
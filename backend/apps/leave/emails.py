@@ -1,9 +1,11 @@
 """
 Email Utilities for Leave Management
 Handles leave-related notifications.
+
+send_* functions only queue the email in the notification outbox; the
+matching render_* functions are called by the outbox worker.
 """
 
-from django.core.mail import send_mail
 from django.conf import settings
 from django.core.signing import TimestampSigner
 from django.urls import reverse
@@ -16,13 +18,29 @@ BASE_URL = getattr(settings, 'SITE_URL', 'http://localhost:8000')
 
 def send_leave_status_email(leave_request, action):
     """
-    Send an email to the employee informing them about their leave status.
+    Queue an email to the employee informing them about their leave status.
     action: 'approved' or 'rejected'
     """
+    from apps.notifications.outbox import enqueue
+    return enqueue(
+        'leave',
+        renderer='apps.leave.emails.render_leave_status_email',
+        params=[leave_request.pk, action],
+        dedup_key=f"leave:{leave_request.pk}:{action}",
+    )
+
+
+def render_leave_status_email(leave_request_id, action):
+    from apps.notifications.outbox import RenderedEmail
+    from .models import LeaveRequest
+
+    leave_request = LeaveRequest.objects.select_related('employee', 'leave_type').filter(pk=leave_request_id).first()
+    if leave_request is None:
+        return None
     employee = leave_request.employee
     if not employee.email:
         logger.warning(f"No email found for employee {employee.employee_id}")
-        return False
+        return None
 
     status_color = "#10b981" if action == 'approved' else "#ef4444"
     status_text = action.capitalize()
@@ -119,26 +137,39 @@ Leave Details:
     </html>
     """
 
-    try:
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[employee.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        logger.error(f"Failed to send leave {action} email to {employee.email}: {str(e)}")
-        return False
+    return RenderedEmail([employee.email], subject, plain_message, html_message)
 
 
 def send_leave_request_to_dept_head(leave_request):
     """
-    Notify the department head when a new leave request is submitted.
-    Includes interactive Approve and Reject buttons.
+    Queue a notification to the department head for a new leave request.
+    Several requests reaching the same approver close together are merged
+    into one digest email.
     """
+    from apps.notifications.outbox import enqueue
+    return enqueue(
+        'leave',
+        renderer='apps.leave.emails.render_leave_request_to_dept_head',
+        params=[leave_request.pk],
+        dedup_key=f"leave:{leave_request.pk}:submitted",
+        digest_key='leave-requests',
+    )
+
+
+def render_leave_request_to_dept_head(leave_request_id):
+    """
+    Email for the department head (or manager / company admins) about a new
+    leave request. Includes interactive Approve and Reject buttons.
+    """
+    from apps.notifications.outbox import RenderedEmail
+    from .models import LeaveRequest
+
+    leave_request = LeaveRequest.objects.select_related(
+        'employee__department__head', 'employee__reporting_manager', 'leave_type'
+    ).filter(pk=leave_request_id).first()
+    if leave_request is None or leave_request.status != 'pending':
+        # Already decided by the time the worker got to it
+        return None
     employee = leave_request.employee
     department = employee.department
     
@@ -153,12 +184,12 @@ def send_leave_request_to_dept_head(leave_request):
             admins = Employee.objects.filter(company=employee.company, is_admin=True, status='active')
             if not admins.exists():
                 logger.error(f"No manager/dept head/admin found for employee {employee.employee_id}")
-                return False
+                return None
             
             recipient_list = [admin.email for admin in admins if admin.email]
             if not recipient_list:
                 logger.error(f"Admins found but no emails for employee {employee.employee_id}")
-                return False
+                return None
             
             # Use the first admin as the friendly name in the greeting
             dept_head = admins.first()
@@ -172,7 +203,7 @@ def send_leave_request_to_dept_head(leave_request):
 
     if not recipient_list:
         logger.warning(f"No recipients found for leave request notification.")
-        return False
+        return None
 
     signer = TimestampSigner()
     
@@ -263,17 +294,5 @@ def send_leave_request_to_dept_head(leave_request):
     </html>
     """
 
-    try:
-        send_mail(
-            subject=subject,
-            message=f"New leave request from {employee.full_name}. Please check the system to review.",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=recipient_list,
-            html_message=html_message,
-            fail_silently=False,
-        )
-        logger.info(f"Leave request notification sent to: {recipient_list}")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to send leave request notification: {str(e)}")
-        return False
+    plain_message = f"New leave request from {employee.full_name}. Please check the system to review."
+    return RenderedEmail(recipient_list, subject, plain_message, html_message)
@@ -0,0 +1,178 @@
+"""
+In-memory interval index over leave requests.
+
+Requests are sorted by start date and laid out as an implicit balanced
+binary tree (the middle of every slice is its root) with the maximum end
+date of each subtree precomputed. A stabbing/overlap query only descends
+into subtrees whose max end reaches the window and whose starts can still
+fall inside it, so it costs O(log n + k) for k matches.
+
+LeaveCalendar builds the index from one range query over pending and
+approved requests and answers the team calendar and overlap warnings.
+"""
+from datetime import timedelta
+
+from django.db.models import Q
+
+from .models import LeaveRequest
+
+ACTIVE_STATUSES = ('pending', 'approved')
+
+
+class IntervalIndex:
+    """Static index of closed [start, end] intervals carrying a payload."""
+
+    def __init__(self, items):
+        # items: iterable of (start, end, payload)
+        self.items = sorted(items, key=lambda item: (item[0], item[1]))
+        self.max_end = [None] * len(self.items)
+        if self.items:
+            self._build(0, len(self.items))
+
+    def __len__(self):
+        return len(self.items)
+
+    def _build(self, lo, hi):
+        mid = (lo + hi) // 2
+        best = self.items[mid][1]
+        if lo < mid:
+            best = max(best, self._build(lo, mid))
+        if mid + 1 < hi:
+            best = max(best, self._build(mid + 1, hi))
+        self.max_end[mid] = best
+        return best
+
+    def overlapping(self, start, end):
+        """Payloads of every interval sharing at least one day with [start, end]."""
+        return [self.items[i][2] for i in self._overlapping_indexes(start, end)]
+
+    def daily_counts(self, start, end, key=None):
+        """
+        {day: number of distinct keys out that day} for every day of the
+        window, from a difference array over the overlapping intervals.
+        """
+        key = key or (lambda payload: payload)
+        days = (end - start).days + 1
+        per_key = {}
+        for item_start, item_end, payload in (
+            self.items[i] for i in self._overlapping_indexes(start, end)
+        ):
+            per_key.setdefault(key(payload), []).append(
+                (max((item_start - start).days, 0), min((item_end - start).days, days - 1))
+            )
+
+        delta = [0] * (days + 1)
+        for spans in per_key.values():
+            # Merge a person's own overlapping requests so they count once a day
+            spans.sort()
+            current_lo, current_hi = spans[0]
+            for lo, hi in spans[1:] + [(days + 1, days + 1)]:
+                if lo > current_hi + 1:
+                    delta[current_lo] += 1
+                    delta[current_hi + 1] -= 1
+                    current_lo, current_hi = lo, hi
+                else:
+                    current_hi = max(current_hi, hi)
+
+        counts, running = {}, 0
+        for offset in range(days):
+            running += delta[offset]
+            counts[start + timedelta(days=offset)] = running
+        return counts
+
+    def _overlapping_indexes(self, start, end):
+        found = []
+        stack = [(0, len(self.items))] if self.items else []
+        while stack:
+            lo, hi = stack.pop()
+            mid = (lo + hi) // 2
+            if self.max_end[mid] < start:
+                continue
+            if lo < mid:
+                stack.append((lo, mid))
+            if self.items[mid][0] <= end:
+                if self.items[mid][1] >= start:
+                    found.append(mid)
+                if mid + 1 < hi:
+                    stack.append((mid + 1, hi))
+        return found
+
+
+class LeaveCalendar:
+    """Pending and approved leave of a company (optionally one team) in a window."""
+
+    FIELDS = (
+        'id', 'employee_id', 'employee__employee_id', 'employee__first_name', 'employee__middle_name',
+        'employee__last_name', 'employee__department_id', 'employee__department__name',
+        'employee__reporting_manager_id', 'leave_type__name', 'start_date', 'end_date',
+        'days_count', 'status',
+    )
+
+    def __init__(self, company, start, end, department_id=None, manager_id=None, statuses=ACTIVE_STATUSES):
+        self.start = start
+        self.end = end
+        queryset = LeaveRequest.objects.filter(
+            employee__company=company,
+            status__in=statuses,
+            start_date__lte=end,
+            end_date__gte=start
+        )
+        if department_id:
+            queryset = queryset.filter(employee__department_id=department_id)
+        if manager_id:
+            queryset = queryset.filter(Q(employee__reporting_manager_id=manager_id) | Q(employee_id=manager_id))
+
+        self.index = IntervalIndex(
+            (row['start_date'], row['end_date'], row) for row in queryset.values(*self.FIELDS)
+        )
+
+    @staticmethod
+    def as_dict(row):
+        return {
+            'id': row['id'],
+            'employee': row['employee_id'],
+            'employee_id': row['employee__employee_id'],
+            'employee_name': ' '.join(filter(None, (
+                row['employee__first_name'], row['employee__middle_name'], row['employee__last_name']
+            ))),
+            'department': row['employee__department__name'],
+            'leave_type': row['leave_type__name'],
+            'start_date': row['start_date'],
+            'end_date': row['end_date'],
+            'days_count': row['days_count'],
+            'status': row['status'],
+        }
+
+    def requests(self):
+        return [self.as_dict(payload) for _, _, payload in self.index.items]
+
+    def daily_counts(self):
+        return self.index.daily_counts(self.start, self.end, key=lambda row: row['employee_id'])
+
+    def conflicts(self, start, end, exclude_employee=None):
+        rows = self.index.overlapping(start, end)
+        return sorted(
+            (self.as_dict(row) for row in rows if row['employee_id'] != exclude_employee),
+            key=lambda row: (row['start_date'], row['employee_id'])
+        )
+
+
+def overlap_warning(leave_request):
+    """
+    Colleagues (same department, or same reporting manager when the employee
+    has no department) with pending or approved leave overlapping the request.
+    """
+    employee = leave_request.employee
+    if employee.department_id:
+        team = {'department_id': employee.department_id}
+    elif employee.reporting_manager_id:
+        team = {'manager_id': employee.reporting_manager_id}
+    else:
+        return {'count': 0, 'conflicts': []}
+
+    calendar = LeaveCalendar(employee.company_id, leave_request.start_date, leave_request.end_date, **team)
+    conflicts = [
+        row for row in calendar.conflicts(leave_request.start_date, leave_request.end_date, exclude_employee=employee.id)
+        if row['id'] != leave_request.id
+    ]
+    return {'count': len(conflicts), 'conflicts': conflicts}
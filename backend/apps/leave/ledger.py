@@ -0,0 +1,131 @@
+"""
+Leave ledger.
+
+Every change to a LeaveBalance goes through LeaveLedger: the counters are
+moved with a single UPDATE ... SET col = col + delta (so concurrent requests
+never overwrite each other's read-modify-write) and the same deltas are
+appended to LeaveLedgerEntry for audit and reconstruction.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LeaveBalance, LeaveLedgerEntry
+
+BALANCE_FIELDS = ('allocated', 'used', 'pending', 'carry_forward')
+
+
+def _deltas(allocated, used, pending, carry_forward):
+    values = {'allocated': allocated, 'used': used, 'pending': pending, 'carry_forward': carry_forward}
+    return {field: Decimal(str(value)) for field, value in values.items() if value}
+
+
+def _apply(balance_filter, deltas):
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    return LeaveBalance.objects.filter(**balance_filter).update(updated_at=timezone.now(), **updates)
+
+
+class LeaveLedger:
+    @staticmethod
+    @transaction.atomic
+    def post(employee_id, leave_type, year, entry_type, allocated=0, used=0, pending=0, carry_forward=0,
+             leave_request=None, encashment=None, remarks='', created_by=None, create_missing=True):
+        """
+        Apply deltas to one employee's balance and record them. A missing
+        balance is created with the leave type's yearly allocation (itself
+        recorded as an allocation entry) unless ``create_missing`` is False,
+        in which case nothing happens and None is returned.
+        """
+        balance = LeaveBalance.objects.filter(
+            employee_id=employee_id, leave_type=leave_type, year=year
+        ).only('id').first()
+        if balance is None:
+            if not create_missing:
+                return None
+            balance, created = LeaveBalance.objects.get_or_create(
+                employee_id=employee_id, leave_type=leave_type, year=year,
+                defaults={'allocated': leave_type.days_per_year}
+            )
+            if created and balance.allocated:
+                LeaveLedgerEntry.objects.create(
+                    balance=balance, employee_id=employee_id, leave_type=leave_type, year=year,
+                    entry_type='allocation', allocated=balance.allocated,
+                    remarks='Opening allocation', created_by=created_by
+                )
+
+        deltas = _deltas(allocated, used, pending, carry_forward)
+        if deltas:
+            _apply({'pk': balance.pk}, deltas)
+        return LeaveLedgerEntry.objects.create(
+            balance=balance, employee_id=employee_id, leave_type=leave_type, year=year,
+            entry_type=entry_type, leave_request=leave_request, encashment=encashment,
+            remarks=remarks, created_by=created_by, **deltas
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def post_bulk(balances, entry_type, allocated=0, used=0, pending=0, carry_forward=0,
+                  remarks='', created_by=None):
+        """
+        Apply the same deltas to many balances with one UPDATE and one
+        bulk insert. ``balances`` is a LeaveBalance queryset.
+        """
+        deltas = _deltas(allocated, used, pending, carry_forward)
+        rows = list(balances.values_list('id', 'employee_id', 'leave_type_id', 'year'))
+        if not rows or not deltas:
+            return 0
+        ids = [row[0] for row in rows]
+        _apply({'pk__in': ids}, deltas)
+        LeaveLedgerEntry.objects.bulk_create([
+            LeaveLedgerEntry(
+                balance_id=balance_id, employee_id=employee_id, leave_type_id=leave_type_id, year=year,
+                entry_type=entry_type, remarks=remarks, created_by=created_by, **deltas
+            )
+            for balance_id, employee_id, leave_type_id, year in rows
+        ], batch_size=1000)
+        return len(rows)
+
+    @staticmethod
+    @transaction.atomic
+    def consume(balance, days, entry_type, leave_request=None, encashment=None, remarks='', created_by=None):
+        """
+        Move ``days`` into used only if the balance still has them available,
+        checked in the UPDATE itself. Returns None when it does not.
+        """
+        days = Decimal(str(days))
+        updated = LeaveBalance.objects.filter(
+            pk=balance.pk,
+            allocated__gte=F('used') + F('pending') - F('carry_forward') + days
+        ).update(used=F('used') + days, updated_at=timezone.now())
+        if not updated:
+            return None
+        return LeaveLedgerEntry.objects.create(
+            balance=balance, employee_id=balance.employee_id, leave_type_id=balance.leave_type_id,
+            year=balance.year, entry_type=entry_type, used=days, leave_request=leave_request,
+            encashment=encashment, remarks=remarks, created_by=created_by
+        )
+
+    @staticmethod
+    def record(balance, entry_type, previous=None, remarks='', created_by=None):
+        """
+        Record a balance that was written directly (admin create/edit) as the
+        difference against its ``previous`` counters.
+        """
+        previous = previous or {}
+        deltas = {
+            field: getattr(balance, field) - previous.get(field, 0)
+            for field in BALANCE_FIELDS
+        }
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return None
+        return LeaveLedgerEntry.objects.create(
+            balance=balance, employee_id=balance.employee_id, leave_type_id=balance.leave_type_id,
+            year=balance.year, entry_type=entry_type, remarks=remarks, created_by=created_by, **deltas
+        )
+
+    @staticmethod
+    def snapshot(balance):
+        return {field: getattr(balance, field) for field in BALANCE_FIELDS}
@@ -0,0 +1,57 @@
+"""
+Allocates / accrues leave balances and, at year start, carries forward or
+lapses last year's unused days. Safe to re-run; use --dry-run to preview.
+Usage: python manage.py run_leave_cycle [--company <uuid>] [--year 2027] [--as-of 2027-01-01] [--no-carry-forward] [--dry-run]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.accounts.models import Organization
+from apps.leave.cycle import LeaveCycleEngine
+
+
+class Command(BaseCommand):
+    help = 'Runs leave allocation, accrual and year-end carry-forward for every employee of a company'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Only this company id')
+        parser.add_argument('--year', type=int, help='Leave year; defaults to the year of --as-of')
+        parser.add_argument('--as-of', dest='as_of', help='Evaluate accrual on this day (YYYY-MM-DD); defaults to today')
+        parser.add_argument('--no-carry-forward', dest='carry_forward', action='store_false', help='Skip carry-forward and lapse')
+        parser.add_argument('--dry-run', action='store_true', help='Print the changes without writing them')
+
+    def handle(self, *args, **options):
+        as_of = timezone.localdate()
+        if options.get('as_of'):
+            as_of = parse_date(options['as_of'])
+            if as_of is None:
+                raise CommandError(f"Invalid date: {options['as_of']}")
+        year = options.get('year') or as_of.year
+
+        if options.get('company'):
+            company_ids = [options['company']]
+        else:
+            company_ids = Organization.objects.filter(is_active=True).values_list('id', flat=True)
+
+        created = updated = 0
+        for company_id in list(company_ids):
+            try:
+                result = LeaveCycleEngine(company_id, year, as_of=as_of).run(
+                    carry_forward=options['carry_forward'], dry_run=options['dry_run']
+                )
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f'Failed to run leave cycle for company {company_id}: {e}'))
+                continue
+            created += result['created']
+            updated += result['updated']
+            for change in result.get('changes', ()):
+                self.stdout.write(
+                    f"{change['employee_id']} {change['leave_type']}: "
+                    f"allocated {change['allocated_before']} -> {change['allocated_after']}, "
+                    f"carry forward {change['carry_forward_before']} -> {change['carry_forward_after']}"
+                    f"{', lapsed ' + str(change['lapsed']) if change['lapsed'] else ''}"
+                )
+
+        verb = 'Would update' if options['dry_run'] else 'Updated'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {created + updated} leave balances for {year} ({created} new).'))
@@ -0,0 +1,132 @@
+# Generated by Django 4.2.27 on 2026-10-19 01:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0019_employee_company_status_name_index"),
+        ("leave", "0008_alter_leaveencashment_options_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaveLedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveIntegerField()),
+                (
+                    "entry_type",
+                    models.CharField(
+                        choices=[
+                            ("allocation", "Allocation"),
+                            ("accrual", "Accrual"),
+                            ("request", "Leave Requested"),
+                            ("approval", "Leave Approved"),
+                            ("rejection", "Leave Rejected"),
+                            ("cancellation", "Leave Cancelled"),
+                            ("encashment", "Encashment"),
+                            ("carry_forward", "Carry Forward"),
+                            ("adjustment", "Manual Adjustment"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "allocated",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=6),
+                ),
+                (
+                    "used",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=6),
+                ),
+                (
+                    "pending",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=6),
+                ),
+                (
+                    "carry_forward",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=6),
+                ),
+                ("remarks", models.CharField(blank=True, max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "balance",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ledger_entries",
+                        to="leave.leavebalance",
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="accounts.employee",
+                    ),
+                ),
+                (
+                    "employee",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="leave_ledger_entries",
+                        to="accounts.employee",
+                    ),
+                ),
+                (
+                    "encashment",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="ledger_entries",
+                        to="leave.leaveencashment",
+                    ),
+                ),
+                (
+                    "leave_request",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="ledger_entries",
+                        to="leave.leaverequest",
+                    ),
+                ),
+                (
+                    "leave_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="leave.leavetype",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Leave ledger entries",
+                "ordering": ["created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["employee", "leave_type", "year"],
+                        name="leave_leave_employe_51acee_idx",
+                    ),
+                    models.Index(
+                        fields=["entry_type", "created_at"],
+                        name="leave_leave_entry_t_7c0dfd_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
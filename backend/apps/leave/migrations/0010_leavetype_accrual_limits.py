@@ -0,0 +1,31 @@
+# Generated by Django 4.2.27 on 2026-10-19 01:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leave", "0009_leaveledgerentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="leavetype",
+            name="accrues_during_probation",
+            field=models.BooleanField(
+                default=True, help_text="Accrue while the employee is on probation"
+            ),
+        ),
+        migrations.AddField(
+            model_name="leavetype",
+            name="max_balance",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                help_text="Accrual stops once available balance reaches this (blank for no cap)",
+                max_digits=5,
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.27 on 2026-10-19 01:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_company(apps, schema_editor):
+    LeaveRequest = apps.get_model("leave", "LeaveRequest")
+    Employee = apps.get_model("accounts", "Employee")
+    LeaveRequest.objects.filter(company__isnull=True).update(
+        company_id=models.Subquery(
+            Employee.objects.filter(pk=models.OuterRef("employee_id")).values("company_id")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0019_employee_company_status_name_index"),
+        ("leave", "0010_leavetype_accrual_limits"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="leaverequest",
+            name="company",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="leave_requests",
+                to="accounts.organization",
+            ),
+        ),
+        migrations.RunPython(backfill_company, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="leaverequest",
+            index=models.Index(
+                fields=["employee", "status", "start_date"],
+                name="leave_leave_employe_54273e_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="leaverequest",
+            index=models.Index(
+                fields=["leave_type", "status"], name="leave_leave_leave_t_b7df7e_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="leaverequest",
+            index=models.Index(
+                fields=["company", "created_at", "id"],
+                name="leave_leave_company_52666f_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="leaverequest",
+            index=models.Index(
+                fields=["company", "status", "created_at", "id"],
+                name="leave_leave_company_166551_idx",
+            ),
+        ),
+    ]
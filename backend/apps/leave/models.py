@@ -35,10 +35,15 @@ class LeaveType(models.Model):
     is_paid = models.BooleanField(default=True)
     is_carry_forward = models.BooleanField(default=False)
     max_carry_forward_days = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    max_balance = models.DecimalField(
+        max_digits=5, decimal_places=2, null=True, blank=True,
+        help_text='Accrual stops once available balance reaches this (blank for no cap)'
+    )
     is_encashable = models.BooleanField(default=False, help_text='Can be converted to money')
     
     # Eligibility
     applicable_after_months = models.PositiveIntegerField(default=0, help_text='Months after joining')
+    accrues_during_probation = models.BooleanField(default=True, help_text='Accrue while the employee is on probation')
     requires_document = models.BooleanField(default=False, help_text='Requires medical certificate etc.')
     
     is_active = models.BooleanField(default=True)
@@ -80,6 +85,69 @@ class LeaveBalance(models.Model):
         return self.allocated + self.carry_forward - self.used - self.pending
 
 
+class LeaveLedgerEntry(models.Model):
+    """
+    Append-only history of every change to a LeaveBalance. Each entry holds
+    the deltas applied to the balance counters; summing a balance's entries
+    reproduces it.
+    """
+    ENTRY_TYPE_CHOICES = [
+        ('allocation', 'Allocation'),
+        ('accrual', 'Accrual'),
+        ('request', 'Leave Requested'),
+        ('approval', 'Leave Approved'),
+        ('rejection', 'Leave Rejected'),
+        ('cancellation', 'Leave Cancelled'),
+        ('encashment', 'Encashment'),
+        ('carry_forward', 'Carry Forward'),
+        ('adjustment', 'Manual Adjustment'),
+    ]
+
+    balance = models.ForeignKey(LeaveBalance, on_delete=models.CASCADE, related_name='ledger_entries')
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leave_ledger_entries')
+    leave_type = models.ForeignKey(LeaveType, on_delete=models.CASCADE)
+    year = models.PositiveIntegerField()
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPE_CHOICES)
+
+    # Deltas applied to the balance
+    allocated = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    used = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    pending = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    carry_forward = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+
+    # Source document
+    leave_request = models.ForeignKey(
+        'LeaveRequest', on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries'
+    )
+    encashment = models.ForeignKey(
+        'LeaveEncashment', on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries'
+    )
+    remarks = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(
+        Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['employee', 'leave_type', 'year']),
+            models.Index(fields=['entry_type', 'created_at']),
+        ]
+        verbose_name_plural = 'Leave ledger entries'
+
+    def __str__(self):
+        return f"{self.employee_id} - {self.entry_type} ({self.year})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Leave ledger entries are append-only')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Leave ledger entries are append-only')
+
+
 class LeaveRequest(models.Model):
     """Leave application by employee"""
     
@@ -98,6 +166,10 @@ class LeaveRequest(models.Model):
     
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leave_requests')
     leave_type = models.ForeignKey(LeaveType, on_delete=models.CASCADE)
+    # Copied from employee.company on save so company listings use their own index
+    company = models.ForeignKey(
+        Organization, on_delete=models.CASCADE, null=True, editable=False, related_name='leave_requests'
+    )
     
     # Date range
     start_date = models.DateField()
@@ -126,64 +198,61 @@ class LeaveRequest(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['employee', 'status', 'start_date']),
+            models.Index(fields=['leave_type', 'status']),
+            models.Index(fields=['company', 'created_at', 'id']),
+            models.Index(fields=['company', 'status', 'created_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.employee.employee_id} - {self.leave_type.code} ({self.start_date} to {self.end_date})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status as loaded, so save() can move the status counters
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
     
     def calculate_days(self):
         """Calculate number of leave days excluding holidays and weekends"""
-        from datetime import timedelta
         from decimal import Decimal
-        from apps.attendance.models import Holiday, AttendancePolicy
+        from apps.attendance import work_calendar
         
         if self.start_date > self.end_date:
             return Decimal('0')
-            
-        # Get company holidays in the date range
-        holidays = Holiday.objects.filter(
-            company=self.employee.company,
-            date__range=(self.start_date, self.end_date),
-            is_active=True,
-            holiday_type='public' # Usually only public holidays count against leave
-        ).values_list('date', flat=True)
-        
-        # Get attendance policy for weekends
-        policy = AttendancePolicy.objects.filter(
-            company=self.employee.company,
-            is_active=True
-        ).first()
         
-        total_days = Decimal('0')
-        current_date = self.start_date
+        # Only public holidays and week offs are excluded; restricted and
+        # optional holidays still count against leave
+        company_id = self.employee.company_id
+        total_days = Decimal(work_calendar.working_days_between(company_id, self.start_date, self.end_date))
         
-        while current_date <= self.end_date:
-            is_holiday = current_date in holidays
-            is_weekend = False
-            
-            if policy:
-                is_weekend = not policy.is_working_day(current_date)
-            else:
-                # Fallback to Sat/Sun
-                is_weekend = current_date.weekday() >= 5
-                
-            if not is_holiday and not is_weekend:
-                # Normal work day
-                day_value = Decimal('1.0')
-                if current_date == self.start_date and self.start_day_type != 'full':
-                    day_value = Decimal('0.5')
-                elif current_date == self.end_date and self.end_day_type != 'full':
-                    day_value = Decimal('0.5')
-                
-                total_days += day_value
-            
-            current_date += timedelta(days=1)
+        # Half day at either end counts 0.5 (a single-day request only once)
+        start_half = self.start_day_type != 'full'
+        end_half = self.end_day_type != 'full' and (self.end_date != self.start_date or not start_half)
+        if start_half and work_calendar.is_working_day(company_id, self.start_date):
+            total_days -= Decimal('0.5')
+        if end_half and work_calendar.is_working_day(company_id, self.end_date):
+            total_days -= Decimal('0.5')
             
         return total_days
     
     def save(self, *args, **kwargs):
         # Auto-calculate days
         self.days_count = self.calculate_days()
+        if self.company_id is None:
+            self.company_id = self.employee.company_id
         super().save(*args, **kwargs)
+
+        from .counters import LeaveRequestCounters
+        LeaveRequestCounters.transition(self.company_id, getattr(self, '_loaded_status', None), self.status)
+        self._loaded_status = self.status
+
+    def delete(self, *args, **kwargs):
+        from .counters import LeaveRequestCounters
+        LeaveRequestCounters.transition(self.company_id, getattr(self, '_loaded_status', None), None)
+        return super().delete(*args, **kwargs)
     
     def approve(self, approved_by_employee):
         """Approve the leave request"""
@@ -202,15 +271,12 @@ class LeaveRequest(models.Model):
             logger.error(f"Failed to trigger leave approval email: {str(e)}")
         
         # Update leave balance
-        balance, _ = LeaveBalance.objects.get_or_create(
-            employee=self.employee,
-            leave_type=self.leave_type,
-            year=self.start_date.year,
-            defaults={'allocated': self.leave_type.days_per_year}
+        from .ledger import LeaveLedger
+        LeaveLedger.post(
+            self.employee_id, self.leave_type, self.start_date.year, 'approval',
+            pending=-self.days_count, used=self.days_count,
+            leave_request=self, created_by=approved_by_employee
         )
-        balance.pending -= self.days_count
-        balance.used += self.days_count
-        balance.save()
     
     def reject(self, rejection_reason):
         """Reject the leave request"""
@@ -226,16 +292,11 @@ class LeaveRequest(models.Model):
             logger.error(f"Failed to trigger leave rejection email: {str(e)}")
         
         # Remove from pending
-        try:
-            balance = LeaveBalance.objects.get(
-                employee=self.employee,
-                leave_type=self.leave_type,
-                year=self.start_date.year
-            )
-            balance.pending -= self.days_count
-            balance.save()
-        except LeaveBalance.DoesNotExist:
-            pass
+        from .ledger import LeaveLedger
+        LeaveLedger.post(
+            self.employee_id, self.leave_type, self.start_date.year, 'rejection',
+            pending=-self.days_count, leave_request=self, create_missing=False
+        )
 
 
 class GlobalLeaveSettings(models.Model):
@@ -327,11 +388,13 @@ class LeaveEncashment(models.Model):
         self.save()
         
         # Restore leave balance
-        try:
-            balance = LeaveBalance.objects.get(employee=self.employee, leave_type=self.leave_type, year=self.year)
-            balance.used -= self.days_encashed
-            balance.save()
-        except LeaveBalance.DoesNotExist:
+        from .ledger import LeaveLedger
+        entry = LeaveLedger.post(
+            self.employee_id, self.leave_type, self.year, 'encashment',
+            used=-self.days_encashed, encashment=self, remarks='Encashment rejected',
+            create_missing=False
+        )
+        if entry is None:
             logger.warning(f"Could not restore balance for rejected encashment {self.id}: Balance record missing")
 
     def mark_paid(self):
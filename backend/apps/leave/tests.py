@@ -1,7 +1,15 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
 from apps.accounts.models import Organization, Employee
-from .models import LeaveType, LeaveBalance, LeaveRequest
-from datetime import date
+from django.db.models import Sum
+from .counters import LeaveRequestCounters
+from .cycle import LeaveCycleEngine
+from .encashment import bulk_create_encashments, eligible_balances, forecast_rows
+from .intervals import IntervalIndex
+from .ledger import LeaveLedger
+from .models import LeaveType, LeaveBalance, LeaveEncashment, LeaveLedgerEntry, LeaveRequest
+from datetime import date, timedelta
+from decimal import Decimal
 
 
 class LeaveRequestTest(TestCase):
@@ -31,3 +39,188 @@ class LeaveRequestTest(TestCase):
         )
         leave.save()
         self.assertEqual(leave.days_count, 3)
+
+
+class LeaveLedgerTest(TestCase):
+    setUp = LeaveRequestTest.setUp
+
+    def test_ledger_reproduces_balance(self):
+        leave = LeaveRequest.objects.create(
+            employee=self.employee,
+            leave_type=self.leave_type,
+            start_date=date(2026, 3, 2),
+            end_date=date(2026, 3, 3),
+            reason="Vacation"
+        )
+        LeaveLedger.post(self.employee.id, self.leave_type, 2026, 'request', pending=leave.days_count, leave_request=leave)
+        leave.approve(None)
+
+        balance = LeaveBalance.objects.get(employee=self.employee, leave_type=self.leave_type, year=2026)
+        self.assertEqual((balance.allocated, balance.used, balance.pending), (12, 2, 0))
+
+        totals = LeaveLedgerEntry.objects.filter(balance=balance).aggregate(
+            allocated=Sum('allocated'), used=Sum('used'), pending=Sum('pending')
+        )
+        self.assertEqual((totals['allocated'], totals['used'], totals['pending']), (12, 2, 0))
+
+        with self.assertRaises(ValueError):
+            LeaveLedgerEntry.objects.first().save()
+
+
+class LeaveCycleTest(TestCase):
+    setUp = LeaveRequestTest.setUp
+
+    def test_prorated_accrual_and_carry_forward(self):
+        earned = LeaveType.objects.create(
+            company=self.company, name="Earned Leave", code="EL", days_per_year=18,
+            accrual_type='monthly', is_carry_forward=True, max_carry_forward_days=5
+        )
+        self.employee.date_of_joining = date(2025, 7, 10)
+        self.employee.save()
+        LeaveBalance.objects.create(employee=self.employee, leave_type=earned, year=2025, allocated=9, used=1)
+
+        engine = LeaveCycleEngine(self.company.id, 2026, as_of=date(2026, 3, 1))
+        self.assertEqual(engine.run(dry_run=True)['created'], 2)
+        self.assertFalse(LeaveBalance.objects.filter(year=2026).exists())
+
+        engine.run()
+        balance = LeaveBalance.objects.get(employee=self.employee, leave_type=earned, year=2026)
+        self.assertEqual((balance.allocated, balance.carry_forward), (Decimal('4.50'), 5))
+
+        # Re-running is a no-op
+        result = LeaveCycleEngine(self.company.id, 2026, as_of=date(2026, 3, 1)).run()
+        self.assertEqual((result['created'], result['updated']), (0, 0))
+
+
+
+class LeaveEncashmentForecastTest(TestCase):
+    setUp = LeaveRequestTest.setUp
+
+    def test_forecast_and_bulk_create(self):
+        from apps.payroll.models import EmployeeSalary
+        earned = LeaveType.objects.create(
+            company=self.company, name="Earned Leave", code="EL", days_per_year=15, is_encashable=True
+        )
+        EmployeeSalary.objects.create(
+            employee=self.employee, basic_salary=13000, gross_salary=26000, net_salary=24000,
+            ctc=312000, effective_from=date(2026, 1, 1)
+        )
+        balance = LeaveBalance.objects.create(employee=self.employee, leave_type=earned, year=2026, allocated=15, used=5)
+
+        with self.assertNumQueries(1):
+            rows = list(forecast_rows(eligible_balances(self.company, 2026)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]['available_days'], rows[0]['daily_rate'], rows[0]['estimated_amount']),
+                         (10, Decimal('1000.00'), Decimal('10000.00')))
+
+        plan = bulk_create_encashments(self.company, 2026, max_days=4)
+        self.assertEqual(len(plan), 1)
+        encashment = LeaveEncashment.objects.get(employee=self.employee)
+        self.assertEqual((encashment.days_encashed, encashment.total_amount), (4, Decimal('4000.00')))
+        balance.refresh_from_db()
+        self.assertEqual(balance.used, 9)
+        self.assertTrue(LeaveLedgerEntry.objects.filter(encashment=encashment, used=4).exists())
+
+        # A pending encashment blocks a second one
+        self.assertEqual(bulk_create_encashments(self.company, 2026), [])
+
+    def test_bulk_create_endpoint_parses_dry_run(self):
+        from django.contrib.auth.models import User
+        from rest_framework.test import APIClient
+        from .models import LeaveSettings
+
+        earned = LeaveType.objects.create(
+            company=self.company, name="Earned Leave", code="EL", days_per_year=15, is_encashable=True
+        )
+        LeaveBalance.objects.create(employee=self.employee, leave_type=earned, year=2026, allocated=15, used=5)
+        LeaveSettings.objects.create(company=self.company, is_encashment_enabled=True)
+        self.employee.user = User.objects.create_user('hr', 'hr@test.com', 'x')
+        self.employee.is_admin = True
+        self.employee.save()
+        client = APIClient()
+        client.force_authenticate(self.employee.user)
+
+        # Form posts send booleans as strings; 'false' must not mean a dry run
+        response = client.post('/api/leave/encashments/bulk-create/', {'year': 2026, 'dry_run': 'true'})
+        self.assertEqual((response.json()['dry_run'], response.json()['created']), (True, 1))
+        self.assertFalse(LeaveEncashment.objects.exists())
+        response = client.post('/api/leave/encashments/bulk-create/', {'year': 2026, 'dry_run': 'false'})
+        self.assertFalse(response.json()['dry_run'])
+        self.assertEqual(LeaveEncashment.objects.filter(employee=self.employee).count(), 1)
+
+
+class LeaveRequestKeysetTest(TestCase):
+    setUp = LeaveRequestTest.setUp
+
+    def test_cursor_pages_newest_first_through_ties(self):
+        from django.contrib.auth.models import User
+        from django.utils import timezone
+        from rest_framework.test import APIClient
+
+        created = [
+            LeaveRequest.objects.create(
+                employee=self.employee, leave_type=self.leave_type, start_date=date(2026, 3, day),
+                end_date=date(2026, 3, day), reason="Errand"
+            )
+            for day in (2, 3, 4, 5, 6)
+        ]
+        # Two requests share a timestamp; the id breaks the tie
+        moment = timezone.now()
+        LeaveRequest.objects.filter(pk__in=[created[1].pk, created[2].pk]).update(created_at=moment)
+        LeaveRequest.objects.filter(pk=created[0].pk).update(created_at=moment - timedelta(days=1))
+        expected = list(LeaveRequest.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+        self.employee.user = User.objects.create_user('hr', 'hr@test.com', 'x')
+        self.employee.save()
+        client = APIClient()
+        client.force_authenticate(self.employee.user)
+        seen, cursor = [], ''
+        while cursor is not None:
+            data = client.get('/api/leave/requests/', {'cursor': cursor, 'page_size': 2}).json()
+            seen += [row['id'] for row in data['results']]
+            cursor = data['next_cursor']
+        self.assertEqual(seen, expected)
+        self.assertEqual(client.get('/api/leave/requests/', {'cursor': 'bogus'}).status_code, 400)
+
+
+class LeaveRequestCountersTest(TestCase):
+    setUp = LeaveRequestTest.setUp
+
+    def test_counters_follow_status_transitions(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second = [
+                LeaveRequest.objects.create(
+                    employee=self.employee, leave_type=self.leave_type,
+                    start_date=date(2026, 3, day), end_date=date(2026, 3, day), reason="Personal"
+                )
+                for day in (2, 3)
+            ]
+        self.assertEqual(first.company_id, self.company.id)
+        self.assertEqual(LeaveRequestCounters.get(self.company.id)['pending'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            LeaveRequest.objects.get(pk=first.pk).approve(None)
+            LeaveRequest.objects.get(pk=second.pk).delete()
+        expected = {'pending': 0, 'approved': 1, 'rejected': 0, 'cancelled': 0}
+        self.assertEqual(LeaveRequestCounters.get(self.company.id), expected)
+
+        cache.clear()
+        self.assertEqual(LeaveRequestCounters.get(self.company.id), expected)
+
+class IntervalIndexTest(SimpleTestCase):
+    def test_overlaps_and_daily_counts(self):
+        index = IntervalIndex([
+            (date(2026, 3, 2), date(2026, 3, 6), ('r1', 'alice')),
+            (date(2026, 3, 5), date(2026, 3, 5), ('r2', 'bob')),
+            (date(2026, 3, 4), date(2026, 3, 9), ('r3', 'alice')),
+            (date(2026, 3, 20), date(2026, 3, 21), ('r4', 'carol')),
+        ])
+        found = sorted(request for request, _ in index.overlapping(date(2026, 3, 5), date(2026, 3, 8)))
+        self.assertEqual(found, ['r1', 'r2', 'r3'])
+        self.assertEqual(index.overlapping(date(2026, 3, 10), date(2026, 3, 19)), [])
+
+        counts = index.daily_counts(date(2026, 3, 1), date(2026, 3, 10), key=lambda payload: payload[1])
+        self.assertEqual(counts[date(2026, 3, 1)], 0)
+        self.assertEqual(counts[date(2026, 3, 5)], 2)  # alice counted once
+        self.assertEqual(counts[date(2026, 3, 9)], 1)
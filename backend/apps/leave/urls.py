@@ -1,11 +1,13 @@
 from django.urls import path
 from .views import (
     leave_type_list_create, leave_type_detail,
-    leave_balance_list_create, leave_balance_detail, leave_balance_my_balance, leave_balance_allocate, leave_balance_run_accrual,
+    leave_balance_list_create, leave_balance_detail, leave_balance_my_balance, leave_balance_allocate, leave_balance_run_accrual, leave_balance_year_end,
     leave_request_list_create, leave_request_detail, leave_request_process,
+    leave_calendar, leave_request_overlaps,
     leave_request_email_process, leave_request_cancel, leave_request_stats,
     leave_encashment_list_create, leave_encashment_detail,
     leave_encashment_process, leave_encashment_eligibility,
+    leave_encashment_forecast, leave_encashment_bulk_create,
     leave_settings_detail,
     leave_request_email_process, leave_request_cancel, leave_request_stats,
     global_leave_settings
@@ -25,12 +27,15 @@ urlpatterns = [
     path('balances/my-balance/', leave_balance_my_balance, name='leave-balance-my-balance'),
     path('balances/allocate/', leave_balance_allocate, name='leave-balance-allocate'),
     path('balances/run-accrual/', leave_balance_run_accrual, name='leave-balance-run-accrual'),
+    path('balances/year-end/', leave_balance_year_end, name='leave-balance-year-end'),
     path('balances/<int:pk>/', leave_balance_detail, name='leave-balance-detail'),
 
     # Leave Requests
     # IMPORTANT: 'stats/' must come BEFORE '<int:pk>/' to avoid Django routing 'stats' as an integer pk
     path('requests/', leave_request_list_create, name='leave-request-list'),
     path('requests/stats/', leave_request_stats, name='leave-request-stats'),
+    path('requests/overlaps/', leave_request_overlaps, name='leave-request-overlaps'),
+    path('calendar/', leave_calendar, name='leave-calendar'),
     path('requests/<int:pk>/', leave_request_detail, name='leave-request-detail'),
     path('requests/<int:pk>/process/', leave_request_process, name='leave-request-process'),
     path('requests/<int:pk>/email-process/', leave_request_email_process, name='leave-request-email-process'),
@@ -40,6 +45,8 @@ urlpatterns = [
     # IMPORTANT: Named paths must come BEFORE '<int:pk>/'
     path('encashments/', leave_encashment_list_create, name='leave-encashment-list'),
     path('encashments/eligibility/', leave_encashment_eligibility, name='leave-encashment-eligibility'),
+    path('encashments/forecast/', leave_encashment_forecast, name='leave-encashment-forecast'),
+    path('encashments/bulk-create/', leave_encashment_bulk_create, name='leave-encashment-bulk-create'),
     path('encashments/<int:pk>/', leave_encashment_detail, name='leave-encashment-detail'),
     path('encashments/<int:pk>/process/', leave_encashment_process, name='leave-encashment-process'),
     path('requests/stats/', leave_request_stats, name='leave-request-stats'),
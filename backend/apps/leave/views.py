@@ -2,24 +2,41 @@ from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
+from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
+from django.http import HttpResponse, StreamingHttpResponse
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import Q
-from datetime import date
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import date, datetime, timedelta
 import logging
 import uuid
 from .models import LeaveType, LeaveBalance, LeaveRequest, LeaveEncashment, LeaveSettings, GlobalLeaveSettings
+from .counters import LeaveRequestCounters
+from .cycle import LeaveCycleEngine
+from . import encashment as encashment_service
+from .intervals import ACTIVE_STATUSES, LeaveCalendar, overlap_warning
+from .ledger import LeaveLedger
 from .serializers import (
     LeaveTypeSerializer, LeaveBalanceSerializer,
     LeaveRequestSerializer, LeaveRequestApprovalSerializer,
     LeaveEncashmentSerializer, LeaveEncashmentProcessSerializer,
     LeaveSettingsSerializer, GlobalLeaveSettingsSerializer
 )
+from apps.accounts.pagination import CursorCodec, keyset_page
 from apps.accounts.permissions import is_client_admin
 from apps.audit.utils import log_activity
 
 logger = logging.getLogger(__name__)
 
+class LeaveRequestPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
 def get_client_company(user):
     from apps.accounts.utils import get_employee_org
     return get_employee_org(user)
@@ -97,7 +114,9 @@ def leave_balance_list_create(request):
                 return Response({'error': 'Admin access required'}, status=403)
             serializer = LeaveBalanceSerializer(data=request.data)
             if serializer.is_valid():
-                serializer.save(); return Response(serializer.data, status=201)
+                balance = serializer.save()
+                LeaveLedger.record(balance, 'allocation', created_by=getattr(request.user, 'employee_profile', None))
+                return Response(serializer.data, status=201)
             return Response(serializer.errors, status=400)
     except Exception as e:
         import traceback
@@ -113,8 +132,12 @@ def leave_balance_detail(request, pk):
         if request.method == 'GET': return Response(LeaveBalanceSerializer(balance).data)
         elif request.method in ['PUT', 'PATCH']:
             if not is_client_admin(request.user): return Response({'error': 'Admin access required'}, status=403)
+            previous = LeaveLedger.snapshot(balance)
             serializer = LeaveBalanceSerializer(balance, data=request.data, partial=(request.method == 'PATCH'))
-            if serializer.is_valid(): serializer.save(); return Response(serializer.data)
+            if serializer.is_valid():
+                serializer.save()
+                LeaveLedger.record(balance, 'adjustment', previous, created_by=getattr(request.user, 'employee_profile', None))
+                return Response(serializer.data)
             return Response(serializer.errors, status=400)
         elif request.method == 'DELETE':
             if not is_client_admin(request.user): return Response({'error': 'Admin access required'}, status=403)
@@ -138,22 +161,27 @@ def leave_balance_my_balance(request):
         logger.error(f"Error in {request.resolver_match.func.__name__ if hasattr(request, 'resolver_match') else 'Leave View'}: {str(e)}\n{traceback.format_exc()}")
         return Response({'success': False, 'error': str(e)}, status=500)
 
+def _run_leave_cycle(request, year, carry_forward):
+    company_id = request.data.get('company') or getattr(get_client_company(request.user), 'id', None)
+    if not company_id: return Response({'error': 'company parameter required'}, status=400)
+    dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+    employee_ids = request.data.get('employees') or None
+    engine = LeaveCycleEngine(company_id, year, employee_ids=employee_ids)
+    result = engine.run(
+        carry_forward=carry_forward, dry_run=dry_run,
+        created_by=getattr(request.user, 'employee_profile', None)
+    )
+    verb = 'Would update' if dry_run else 'Updated'
+    result['message'] = f"{verb} {result['created'] + result['updated']} leave balance records ({result['created']} new)"
+    return Response(result)
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def leave_balance_allocate(request):
     try:
         if not is_client_admin(request.user): return Response({'error': 'Admin access required'}, status=403)
-        employee_ids = request.data.get('employees', [])
         year = request.data.get('year', date.today().year)
-        company_id = request.data.get('company')
-        if not company_id: return Response({'error': 'company parameter required'}, status=400)
-        leave_types = LeaveType.objects.filter(company_id=company_id, is_active=True)
-        created = 0
-        for emp_id in employee_ids:
-            for lt in leave_types:
-                _, was_created = LeaveBalance.objects.get_or_create(employee_id=emp_id, leave_type=lt, year=year, defaults={'allocated': lt.days_per_year})
-                if was_created: created += 1
-        return Response({'message': f'Created {created} leave balance records'})
+        return _run_leave_cycle(request, year, carry_forward=False)
     except Exception as e:
         import traceback
         logger.error(f"Error in {request.resolver_match.func.__name__ if hasattr(request, 'resolver_match') else 'Leave View'}: {str(e)}\n{traceback.format_exc()}")
@@ -164,20 +192,20 @@ def leave_balance_allocate(request):
 def leave_balance_run_accrual(request):
     try:
         if not is_client_admin(request.user): return Response({'error': 'Admin access required'}, status=403)
-        from django.db.models import F
-        company_id = request.data.get('company')
-        if not company_id: return Response({'error': 'company parameter required'}, status=400)
-        today = date.today()
-        leave_types = LeaveType.objects.filter(company_id=company_id, is_active=True)
-        accrued_count = 0
-        for lt in leave_types:
-            if lt.accrual_type == 'monthly':
-                accrual_amount = lt.days_per_year / 12
-                accrued_count += LeaveBalance.objects.filter(leave_type=lt, year=today.year).update(allocated=F('allocated') + accrual_amount)
-            elif lt.accrual_type == 'quarterly' and today.month in [1, 4, 7, 10]:
-                accrual_amount = lt.days_per_year / 4
-                accrued_count += LeaveBalance.objects.filter(leave_type=lt, year=today.year).update(allocated=F('allocated') + accrual_amount)
-        return Response({'message': f'Accrued leaves for {accrued_count} records'})
+        return _run_leave_cycle(request, date.today().year, carry_forward=False)
+    except Exception as e:
+        import traceback
+        logger.error(f"Error in {request.resolver_match.func.__name__ if hasattr(request, 'resolver_match') else 'Leave View'}: {str(e)}\n{traceback.format_exc()}")
+        return Response({'success': False, 'error': str(e)}, status=500)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def leave_balance_year_end(request):
+    """Open a leave year: carry forward / lapse last year's balances and allocate the new one."""
+    try:
+        if not is_client_admin(request.user): return Response({'error': 'Admin access required'}, status=403)
+        year = request.data.get('year', date.today().year + 1)
+        return _run_leave_cycle(request, year, carry_forward=True)
     except Exception as e:
         import traceback
         logger.error(f"Error in {request.resolver_match.func.__name__ if hasattr(request, 'resolver_match') else 'Leave View'}: {str(e)}\n{traceback.format_exc()}")
@@ -190,7 +218,7 @@ def leave_request_list_create(request):
     try:
         company = get_client_company(request.user)
         if request.method == 'GET':
-            queryset = LeaveRequest.objects.filter(employee__company=company).select_related('employee', 'leave_type', 'approved_by')
+            queryset = LeaveRequest.objects.filter(company=company).select_related('employee', 'leave_type', 'approved_by')
             employee_id = request.query_params.get('employee')
             status_filter = request.query_params.get('status')
             if employee_id: 
@@ -201,13 +229,23 @@ def leave_request_list_create(request):
                     # If invalid UUID (e.g. 'admin-2'), return empty queryset for safety
                     queryset = queryset.none()
             if status_filter: queryset = queryset.filter(status=status_filter)
-            return Response(LeaveRequestSerializer(queryset.order_by('-created_at'), many=True).data)
+            if 'cursor' in request.query_params:
+                try:
+                    rows, next_cursor = keyset_page(queryset, request, LEAVE_REQUEST_ORDERING, LEAVE_REQUEST_CURSOR)
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=400)
+                return Response({'results': LeaveRequestSerializer(rows, many=True).data, 'next_cursor': next_cursor})
+            queryset = queryset.order_by('-created_at')
+            if 'page' in request.query_params or 'page_size' in request.query_params:
+                paginator = LeaveRequestPagination()
+                page = paginator.paginate_queryset(queryset, request)
+                return paginator.get_paginated_response(LeaveRequestSerializer(page, many=True).data)
+            return Response(LeaveRequestSerializer(queryset, many=True).data)
         elif request.method == 'POST':
             serializer = LeaveRequestSerializer(data=request.data)
             if serializer.is_valid():
                 leave_request = serializer.save()
-                balance, _ = LeaveBalance.objects.get_or_create(employee=leave_request.employee, leave_type=leave_request.leave_type, year=leave_request.start_date.year, defaults={'allocated': leave_request.leave_type.days_per_year})
-                balance.pending += leave_request.days_count; balance.save()
+                LeaveLedger.post(leave_request.employee_id, leave_request.leave_type, leave_request.start_date.year, 'request', pending=leave_request.days_count, leave_request=leave_request)
                 
                 # Check for Auto-approval
                 settings, _ = GlobalLeaveSettings.objects.get_or_create(company=company)
@@ -221,13 +259,75 @@ def leave_request_list_create(request):
                     except Exception as e:
                         logger.error(f"Failed to trigger dept head leave notification: {str(e)}")
                 
-                return Response(serializer.data, status=201)
+                data = dict(serializer.data)
+                data['overlap_warning'] = overlap_warning(leave_request)
+                return Response(data, status=201)
             return Response(serializer.errors, status=400)
     except Exception as e:
         import traceback
         logger.error(f"Error in {request.resolver_match.func.__name__ if hasattr(request, 'resolver_match') else 'Leave View'}: {str(e)}\n{traceback.format_exc()}")
         return Response({'success': False, 'error': str(e)}, status=500)
 
+# Newest first; seeks on the (company[, status], created_at, id) index
+LEAVE_REQUEST_ORDERING = ('-created_at', '-id')
+LEAVE_REQUEST_CURSOR = CursorCodec(datetime.fromisoformat, int)
+
+def _parse_window(request, default_days=30):
+    start = parse_date(request.query_params.get('start') or '') or date.today()
+    end = parse_date(request.query_params.get('end') or '') or start + timedelta(days=default_days - 1)
+    if end < start:
+        raise ValueError('end must not be before start')
+    if (end - start).days > 366:
+        raise ValueError('Window cannot exceed one year')
+    return start, end
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def leave_calendar(request):
+    """Who is out (pending or approved) on each day of a window, optionally for one department or manager's team."""
+    try:
+        company = get_client_company(request.user)
+        if not company: return Response({'error': 'Company context required'}, status=400)
+        try:
+            start, end = _parse_window(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        statuses = ('approved',) if request.query_params.get('status') == 'approved' else ACTIVE_STATUSES
+        calendar = LeaveCalendar(
+            company, start, end,
+            department_id=request.query_params.get('department'),
+            manager_id=request.query_params.get('manager'),
+            statuses=statuses
+        )
+        return Response({
+            'start': start,
+            'end': end,
+            'days': [{'date': day, 'count': count} for day, count in calendar.daily_counts().items()],
+            'requests': calendar.requests(),
+        })
+    except Exception as e:
+        import traceback
+        logger.error(f"Error in {request.resolver_match.func.__name__ if hasattr(request, 'resolver_match') else 'Leave View'}: {str(e)}\n{traceback.format_exc()}")
+        return Response({'success': False, 'error': str(e)}, status=500)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def leave_request_overlaps(request):
+    """Pre-submit check: colleagues already out during ?employee=&start_date=&end_date=."""
+    try:
+        company = get_client_company(request.user)
+        employee = _get_employee_instance(request.query_params.get('employee'), company, request.user)
+        if not employee: return Response({'error': 'Employee record not found'}, status=404)
+        start = parse_date(request.query_params.get('start_date') or '')
+        end = parse_date(request.query_params.get('end_date') or '') or start
+        if not start or end < start:
+            return Response({'error': 'Valid start_date and end_date are required'}, status=400)
+        return Response(overlap_warning(LeaveRequest(employee=employee, start_date=start, end_date=end)))
+    except Exception as e:
+        import traceback
+        logger.error(f"Error in {request.resolver_match.func.__name__ if hasattr(request, 'resolver_match') else 'Leave View'}: {str(e)}\n{traceback.format_exc()}")
+        return Response({'success': False, 'error': str(e)}, status=500)
+
 @api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def leave_request_detail(request, pk):
@@ -306,13 +406,15 @@ def leave_request_cancel(request, pk):
         leave_request = get_object_or_404(LeaveRequest, pk=pk)
         if leave_request.status == 'cancelled': return Response({'error': 'Leave is already cancelled'}, status=400)
         if leave_request.status == 'rejected': return Response({'error': 'Rejected leave cannot be cancelled'}, status=400)
-        old_status = leave_request.status; leave_request.status = 'cancelled'; leave_request.save()
-        try:
-            balance = LeaveBalance.objects.get(employee=leave_request.employee, leave_type=leave_request.leave_type, year=leave_request.start_date.year)
-            if old_status == 'pending': balance.pending -= leave_request.days_count
-            elif old_status == 'approved': balance.used -= leave_request.days_count
-            balance.save()
-            
+        old_status = leave_request.status
+        # Conditional update so two concurrent cancels cannot both restore the balance
+        if not LeaveRequest.objects.filter(pk=leave_request.pk, status=old_status).update(status='cancelled', updated_at=timezone.now()):
+            return Response({'error': 'Leave request was modified, please retry'}, status=409)
+        leave_request.status = leave_request._loaded_status = 'cancelled'
+        LeaveRequestCounters.transition(leave_request.company_id, old_status, 'cancelled')
+        restore = {'pending': -leave_request.days_count} if old_status == 'pending' else {'used': -leave_request.days_count} if old_status == 'approved' else {}
+        entry = LeaveLedger.post(leave_request.employee_id, leave_request.leave_type, leave_request.start_date.year, 'cancellation', leave_request=leave_request, create_missing=False, **restore)
+        if entry is not None:
             log_activity(
                 user=request.user,
                 action_type='UPDATE',
@@ -322,7 +424,7 @@ def leave_request_cancel(request, pk):
             )
             
             return Response({'message': 'Leave cancelled and balance restored'})
-        except LeaveBalance.DoesNotExist: return Response({'message': 'Leave cancelled (no balance record found to restore)'})
+        return Response({'message': 'Leave cancelled (no balance record found to restore)'})
     except Exception as e:
         import traceback
         logger.error(f"Error in {request.resolver_match.func.__name__ if hasattr(request, 'resolver_match') else 'Leave View'}: {str(e)}\n{traceback.format_exc()}")
@@ -336,10 +438,14 @@ def leave_request_stats(request):
         from datetime import date, timedelta
         company = get_client_company(request.user)
         employee_id = request.query_params.get('employee')
-        queryset = LeaveRequest.objects.filter(employee__company=company)
-        if employee_id: queryset = queryset.filter(employee_id=employee_id)
+        queryset = LeaveRequest.objects.filter(company=company)
+        if employee_id:
+            queryset = queryset.filter(employee_id=employee_id)
+            counts = dict(queryset.values_list('status').annotate(count=Count('id')).order_by())
+        else:
+            counts = LeaveRequestCounters.get(company.id) if company else {}
         today = date.today()
-        stats = {'pending': queryset.filter(status='pending').count(), 'approved': queryset.filter(status='approved').count(), 'rejected': queryset.filter(status='rejected').count(), 
+        stats = {'pending': counts.get('pending', 0), 'approved': counts.get('approved', 0), 'rejected': counts.get('rejected', 0),
                  'on_leave_today': queryset.filter(status='approved', start_date__lte=today, end_date__gte=today).count()}
         type_dist = queryset.values('leave_type__name').annotate(count=Count('id'))
         stats['type_distribution'] = {item['leave_type__name']: item['count'] for item in type_dist}
@@ -503,7 +609,7 @@ def _get_employee_daily_rate(employee):
         from apps.payroll.models import EmployeeSalary
         salary = EmployeeSalary.objects.filter(employee=employee, is_current=True).first()
         if salary and salary.gross_salary:
-            return (salary.gross_salary / Decimal('26')).quantize(Decimal('0.01'))
+            return encashment_service.daily_rate(salary.gross_salary)
     except Exception as e:
         logger.warning(f"Could not compute daily rate for {employee}: {e}")
     return Decimal('0')
@@ -589,19 +695,25 @@ def leave_encashment_list_create(request):
             # Compute daily rate
             daily_rate = _get_employee_daily_rate(employee)
 
-            # Deduct from leave balance (treated as used)
-            balance.used += days_dec
-            balance.save()
-
-            # Create encashment record
-            encashment = LeaveEncashment.objects.create(
-                employee=employee,
-                leave_type=leave_type,
-                year=year,
-                days_encashed=days_dec,
-                daily_rate=daily_rate,
-                remarks=remarks,
-            )
+            with transaction.atomic():
+                # Create encashment record
+                encashment = LeaveEncashment.objects.create(
+                    employee=employee,
+                    leave_type=leave_type,
+                    year=year,
+                    days_encashed=days_dec,
+                    daily_rate=daily_rate,
+                    remarks=remarks,
+                )
+
+                # Deduct from leave balance (treated as used); fails if a concurrent request got there first
+                entry = LeaveLedger.consume(
+                    balance, days_dec, 'encashment', encashment=encashment,
+                    created_by=getattr(request.user, 'employee_profile', None)
+                )
+                if entry is None:
+                    transaction.set_rollback(True)
+                    return Response({'error': 'Insufficient balance'}, status=400)
 
             log_activity(
                 user=request.user,
@@ -779,6 +891,117 @@ def leave_encashment_eligibility(request):
         return Response({'error': str(e)}, status=500)
 
 
+def _encashment_filters(params):
+    employees = params.get('employees') or []
+    if isinstance(employees, str):
+        employees = [e for e in employees.split(',') if e]
+    return {
+        'leave_type_id': params.get('leave_type') or None,
+        'department_id': params.get('department') or None,
+        'employee_ids': employees or None,
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def leave_encashment_forecast(request):
+    """
+    Company-wide encashment eligibility with daily rates and estimated
+    payouts for every employee, from one query.
+    GET ?year=<year>&leave_type=<id>&department=<id>&export=csv|xlsx
+    """
+    try:
+        if not is_client_admin(request.user):
+            return Response({'error': 'Admin access required'}, status=403)
+        company = get_client_company(request.user)
+        year = int(request.query_params.get('year', date.today().year))
+
+        settings, _ = LeaveSettings.objects.get_or_create(company=company)
+        if not settings.is_encashment_enabled:
+            return Response({
+                'year': year, 'results': [], 'is_enabled': False,
+                'message': 'Leave encashment is currently disabled by your organization.'
+            })
+
+        rows = encashment_service.forecast_rows(
+            encashment_service.eligible_balances(company, year, **_encashment_filters(request.query_params))
+        )
+        export = request.query_params.get('export')
+        if export == 'csv':
+            response = StreamingHttpResponse(encashment_service.csv_lines(rows), content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="leave_encashment_forecast_{year}.csv"'
+            return response
+        if export == 'xlsx':
+            response = HttpResponse(
+                encashment_service.xlsx_bytes(rows),
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+            response['Content-Disposition'] = f'attachment; filename="leave_encashment_forecast_{year}.xlsx"'
+            return response
+
+        results = list(rows)
+        return Response({
+            'year': year,
+            'count': len(results),
+            'total_days': sum(r['available_days'] for r in results),
+            'total_amount': sum(r['estimated_amount'] for r in results),
+            'results': results,
+        })
+
+    except Exception as e:
+        import traceback
+        logger.error(f"Error in leave_encashment_forecast: {str(e)}\n{traceback.format_exc()}")
+        return Response({'error': str(e)}, status=500)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def leave_encashment_bulk_create(request):
+    """
+    Raise pending encashment requests for every eligible balance that has none.
+    POST {year, leave_type?, department?, employees?: [...], max_days?, dry_run?}
+    """
+    try:
+        if not is_client_admin(request.user):
+            return Response({'error': 'Admin access required'}, status=403)
+        company = get_client_company(request.user)
+        year = int(request.data.get('year', date.today().year))
+
+        settings, _ = LeaveSettings.objects.get_or_create(company=company)
+        if not settings.is_encashment_enabled:
+            return Response({'error': 'Leave encashment is currently disabled by your organization.'}, status=400)
+
+        created_by = getattr(request.user, 'employee_profile', None)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        plan = encashment_service.bulk_create_encashments(
+            company, year,
+            max_days=request.data.get('max_days') or None,
+            created_by=created_by,
+            dry_run=dry_run,
+            **_encashment_filters(request.data)
+        )
+        if plan and not dry_run:
+            log_activity(
+                user=request.user, action_type='CREATE', module='LEAVE',
+                description=f"Bulk leave encashment for {year}: {len(plan)} request(s)",
+                reference_id=str(year)
+            )
+        return Response({
+            'success': True,
+            'year': year,
+            'dry_run': dry_run,
+            'created': len(plan),
+            'total_days': sum(r['days_encashed'] for r in plan),
+            'total_amount': sum(r['estimated_amount'] for r in plan),
+            'results': plan,
+        })
+
+    except Exception as e:
+        import traceback
+        logger.error(f"Error in leave_encashment_bulk_create: {str(e)}\n{traceback.format_exc()}")
+        return Response({'success': False, 'error': str(e)}, status=500)
+
+
 @api_view(['GET', 'PATCH'])
 @permission_classes([IsAuthenticated])
 def global_leave_settings(request):
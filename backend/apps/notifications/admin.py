@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import OutboxMessage
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'category', 'subject', 'renderer', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'category']
+    search_fields = ['dedup_key', 'subject']
+    readonly_fields = ['created_at', 'sent_at']
@@ -0,0 +1,35 @@
+"""
+Outbox worker: renders and sends queued emails in batches.
+Usage: python manage.py send_notifications [--batch-size 100] [--loop [--interval 5]]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.notifications.outbox import deliver
+
+
+class Command(BaseCommand):
+    help = 'Sends queued notification emails from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of draining once')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep when the outbox is empty')
+
+    def handle(self, *args, **options):
+        totals = {'sent': 0, 'retrying': 0, 'failed': 0, 'skipped': 0}
+        try:
+            while True:
+                result = deliver(options['batch_size'])
+                for key, value in result.items():
+                    totals[key] += value
+                if not any(result.values()):
+                    if not options['loop']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {totals['sent']}, retrying {totals['retrying']}, failed {totals['failed']}, skipped {totals['skipped']}."
+        ))
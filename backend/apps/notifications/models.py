@@ -0,0 +1,60 @@
+from django.db import models
+
+
+class OutboxMessage(models.Model):
+    """
+    An email waiting to be sent. Rows are written in the same transaction as
+    the business change that triggers them and delivered by the
+    send_notifications worker.
+
+    Either ``renderer`` (dotted path of a function called with ``params``
+    that returns a RenderedEmail) or the stored subject/body is used.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('skipped', 'Skipped'),
+        ('failed', 'Failed'),
+    ]
+
+    CATEGORY_CHOICES = [
+        ('leave', 'Leave'),
+        ('expense', 'Expense'),
+        ('account', 'Account'),
+        ('performance', 'Performance'),
+    ]
+
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
+    dedup_key = models.CharField(
+        max_length=255, unique=True, null=True, blank=True,
+        help_text='Enqueuing a second message with the same key is a no-op'
+    )
+    digest_key = models.CharField(
+        max_length=100, blank=True,
+        help_text='Messages to the same recipient with the same key are merged into one email'
+    )
+
+    renderer = models.CharField(max_length=200, blank=True)
+    params = models.JSONField(default=list, blank=True)
+
+    recipients = models.JSONField(default=list, blank=True)
+    subject = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.category} #{self.pk} ({self.status})"
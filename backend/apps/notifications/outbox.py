@@ -0,0 +1,203 @@
+"""
+Transactional email outbox.
+
+Request handlers call enqueue(), which only inserts an OutboxMessage row (in
+the caller's transaction, so a rolled-back approval never emails anyone).
+The send_notifications worker calls deliver() in a loop:
+
+1. claims a batch of due rows with a lease (SELECT ... FOR UPDATE SKIP
+   LOCKED where supported), so several workers can run side by side
+2. renders each row through its renderer, late, with current data
+3. merges rows sharing a digest_key into one email per recipient
+4. sends over one open connection per SMTP configuration
+5. marks rows sent, or schedules a retry with exponential backoff until
+   MAX_ATTEMPTS is reached
+"""
+import json
+import logging
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+MAX_BACKOFF_MINUTES = 60
+# A claimed row whose worker died becomes due again after this
+LEASE = timedelta(minutes=10)
+# Digest rows are held until the end of the current window so that
+# notifications raised close together go out as one email
+DIGEST_WINDOW_SECONDS = 300
+
+# connection: None for the project's EMAIL_* settings, or get_connection() kwargs
+RenderedEmail = namedtuple(
+    'RenderedEmail', ['recipients', 'subject', 'body', 'html', 'from_email', 'connection'],
+    defaults=('', None, None)
+)
+
+
+def enqueue(category, renderer='', params=(), recipients=(), subject='', body='', html='',
+            dedup_key=None, digest_key='', delay=None):
+    """
+    Queue one email. Pass ``renderer`` (dotted path) and JSON-serialisable
+    ``params`` to render in the worker, or the finished recipients/subject/
+    body. A message whose ``dedup_key`` was already queued is dropped.
+    """
+    now = timezone.now()
+    if delay is None and digest_key:
+        delay = timedelta(seconds=DIGEST_WINDOW_SECONDS - int(now.timestamp()) % DIGEST_WINDOW_SECONDS)
+    message = OutboxMessage(
+        category=category,
+        renderer=renderer,
+        params=json.loads(json.dumps(list(params), cls=DjangoJSONEncoder)),
+        recipients=[r for r in recipients if r],
+        subject=subject[:255],
+        body=body,
+        html_body=html,
+        dedup_key=dedup_key[:255] if dedup_key else None,
+        digest_key=digest_key,
+        next_attempt_at=now + (delay or timedelta(0)),
+    )
+    OutboxMessage.objects.bulk_create([message], ignore_conflicts=True)
+    return True
+
+
+def _claim(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        due = OutboxMessage.objects.select_for_update(skip_locked=True).filter(
+            Q(status='pending') | Q(status='sending'),
+            next_attempt_at__lte=now
+        ).order_by('next_attempt_at', 'id').values_list('id', flat=True)[:batch_size]
+        ids = list(due)
+        OutboxMessage.objects.filter(id__in=ids).update(status='sending', next_attempt_at=now + LEASE)
+    return list(OutboxMessage.objects.filter(id__in=ids).order_by('id'))
+
+
+def _render(message):
+    if message.renderer:
+        return import_string(message.renderer)(*message.params)
+    return RenderedEmail(message.recipients, message.subject, message.body, message.html_body)
+
+
+def _connection_key(rendered):
+    return tuple(sorted((rendered.connection or {}).items()))
+
+
+def _build(messages):
+    """
+    Turn rendered rows into outgoing emails. Returns
+    [(connection_key, EmailMultiAlternatives, [row, ...]), ...].
+    """
+    outgoing = []
+    digests = OrderedDict()
+    for row, rendered in messages:
+        if row.digest_key:
+            for recipient in rendered.recipients:
+                key = (recipient, row.digest_key, rendered.from_email, _connection_key(rendered))
+                digests.setdefault(key, []).append((row, rendered))
+            continue
+        email = EmailMultiAlternatives(
+            rendered.subject, rendered.body, rendered.from_email or settings.DEFAULT_FROM_EMAIL,
+            list(rendered.recipients)
+        )
+        if rendered.html:
+            email.attach_alternative(rendered.html, 'text/html')
+        outgoing.append((_connection_key(rendered), email, [row]))
+
+    for (recipient, _, from_email, connection_key), parts in digests.items():
+        if len(parts) == 1:
+            subject, body, html = parts[0][1].subject, parts[0][1].body, parts[0][1].html
+        else:
+            subject = f"{len(parts)} new notifications: {parts[0][1].subject}"
+            body = '\n\n----------\n\n'.join(rendered.body for _, rendered in parts)
+            html = '<hr>'.join(rendered.html or f'<pre>{rendered.body}</pre>' for _, rendered in parts)
+        email = EmailMultiAlternatives(subject, body, from_email or settings.DEFAULT_FROM_EMAIL, [recipient])
+        if html:
+            email.attach_alternative(html, 'text/html')
+        outgoing.append((connection_key, email, [row for row, _ in parts]))
+    return outgoing
+
+
+def deliver(batch_size=100):
+    """Send one batch of due messages. Returns counts per outcome."""
+    rows = _claim(batch_size)
+    if not rows:
+        return {'sent': 0, 'retrying': 0, 'failed': 0, 'skipped': 0}
+
+    now = timezone.now()
+    failed = {}
+    skipped = set()
+    rendered = []
+    for row in rows:
+        try:
+            email = _render(row)
+        except Exception as e:
+            logger.exception("Failed to render outbox message %s", row.pk)
+            failed[row.pk] = f"Render error: {e}"
+            continue
+        if email is None or not email.recipients:
+            skipped.add(row.pk)
+        else:
+            rendered.append((row, email))
+
+    by_connection = OrderedDict()
+    for connection_key, email, members in _build(rendered):
+        by_connection.setdefault(connection_key, []).append((email, members))
+
+    for connection_key, emails in by_connection.items():
+        connection = get_connection(**dict(connection_key)) if connection_key else get_connection()
+        try:
+            connection.open()
+        except Exception as e:
+            logger.error("Failed to open mail connection: %s", e)
+            for _, members in emails:
+                for row in members:
+                    failed[row.pk] = f"Connection error: {e}"
+            continue
+        try:
+            for email, members in emails:
+                email.connection = connection
+                try:
+                    email.send()
+                except Exception as e:
+                    logger.error("Failed to send outbox message(s) %s: %s", [row.pk for row in members], e)
+                    for row in members:
+                        failed[row.pk] = str(e)
+        finally:
+            connection.close()
+
+    sent = 0
+    for row in rows:
+        if row.pk in skipped:
+            row.status = 'skipped'
+        elif row.pk in failed:
+            row.attempts += 1
+            row.last_error = failed[row.pk]
+            if row.attempts >= MAX_ATTEMPTS:
+                row.status = 'failed'
+            else:
+                row.status = 'pending'
+                row.next_attempt_at = now + timedelta(minutes=min(2 ** row.attempts, MAX_BACKOFF_MINUTES))
+        else:
+            row.status = 'sent'
+            row.sent_at = now
+            sent += 1
+    OutboxMessage.objects.bulk_update(
+        rows, ['status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at'], batch_size=500
+    )
+    return {
+        'sent': sent,
+        'retrying': sum(1 for row in rows if row.status == 'pending'),
+        'failed': sum(1 for row in rows if row.status == 'failed'),
+        'skipped': len(skipped),
+    }
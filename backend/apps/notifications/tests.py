@@ -0,0 +1,37 @@
+from django.core import mail
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .outbox import deliver, enqueue
+
+
+class OutboxTest(TestCase):
+    def test_enqueue_is_deduplicated_and_delivered(self):
+        enqueue('account', recipients=['a@test.com'], subject='Hello', body='Hi', dedup_key='welcome:a')
+        enqueue('account', recipients=['a@test.com'], subject='Hello', body='Hi', dedup_key='welcome:a')
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+        self.assertEqual(len(mail.outbox), 0)
+
+        result = deliver()
+        self.assertEqual(result['sent'], 1)
+        self.assertEqual(mail.outbox[0].to, ['a@test.com'])
+        self.assertEqual(OutboxMessage.objects.get().status, 'sent')
+
+    def test_digest_merges_messages_per_recipient(self):
+        for subject in ('First', 'Second'):
+            enqueue('performance', recipients=['m@test.com'], subject=subject, body=subject, digest_key='reminders')
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+
+        deliver()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('First', mail.outbox[0].body)
+        self.assertIn('Second', mail.outbox[0].body)
+
+    def test_render_failure_is_retried_later(self):
+        enqueue('leave', renderer='apps.notifications.missing.render', params=[1])
+        result = deliver()
+        message = OutboxMessage.objects.get()
+        self.assertEqual(result['retrying'], 1)
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertGreater(message.next_attempt_at, timezone.now())
@@ -92,6 +92,16 @@ class SalaryStructureComponent(BaseModel):
     def __str__(self):
         return f"{self.salary_structure.name} - {self.component.name}"
 
+    def amount_for(self, basic_salary):
+        """Monthly amount of this component for a given basic salary"""
+        if self.amount and self.amount > 0:
+            return self.amount
+        if self.percentage and self.percentage > 0:
+            return (basic_salary * self.percentage) / 100
+        if self.component.calculation_type == 'percentage' and self.component.default_percentage:
+            return (basic_salary * self.component.default_percentage) / 100
+        return self.component.default_amount
+
 class EmployeeSalary(BaseModel):
     """Actual salary assigned to an employee"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -0,0 +1,342 @@
+"""
+Bulk Salary Assignment Import
+
+Reads an XLSX (openpyxl read_only, streamed) or CSV sheet with the columns
+
+    Employee ID | Salary Structure | Basic Salary | Effective From | Remarks | CTC
+
+plus one optional column per salary component (header = component name or
+code) whose value overrides the structure amount. See tests/salary_bulk_data
+for samples.
+
+- Employees, structures (with their components) and salary components are
+  loaded once into maps keyed by lower-cased employee id / name / code.
+- Every row is validated before anything is written and gets a report line
+  (status ``imported``, ``valid`` for dry runs, or ``error`` with reasons).
+- Previous current salaries are closed with one UPDATE (is_current off,
+  effective_to the day before the new salary), new salaries and their
+  components are written with bulk_create. EmployeeSalary.save is bypassed,
+  so there is no per-row is_current UPDATE.
+"""
+
+import csv
+import io
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+import openpyxl
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from apps.accounts.models import Employee
+from apps.audit.utils import log_activity
+from ..models import (
+    EmployeeSalary, EmployeeSalaryComponent, SalaryComponent, SalaryStructure, SalaryStructureComponent
+)
+
+BULK_BATCH_SIZE = 1000
+INACTIVE_STATUSES = ('terminated', 'resigned')
+DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%m/%d/%Y')
+
+COLUMNS = {
+    'employee_id': ('employee_id', 'emp_id', 'employee_code'),
+    'salary_structure': ('salary_structure', 'structure'),
+    'basic_salary': ('basic_salary', 'basic'),
+    'effective_from': ('effective_from', 'effective_date'),
+    'remarks': ('remarks', 'remark', 'notes'),
+    'ctc': ('ctc', 'annual_ctc'),
+}
+
+
+def _normalise_header(value):
+    return str(value or '').strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _decimal(value):
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value))
+    try:
+        return Decimal(str(value).replace(',', '').strip())
+    except InvalidOperation:
+        raise ValueError(f"'{value}' is not a number")
+
+
+def _date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"'{value}' is not a valid date")
+
+
+class SalaryImportService:
+
+    @staticmethod
+    def read_rows(fh, filename):
+        """Yields (row_number, {header: value}) without loading the whole workbook."""
+        if filename.lower().endswith(('.xlsx', '.xlsm')):
+            workbook = openpyxl.load_workbook(fh, read_only=True, data_only=True)
+            try:
+                rows = workbook.active.iter_rows(values_only=True)
+                headers = [_normalise_header(h) for h in next(rows, ())]
+                for row_number, row in enumerate(rows, start=2):
+                    if row and any(cell not in (None, '') for cell in row):
+                        yield row_number, dict(zip(headers, row))
+            finally:
+                workbook.close()
+        else:
+            reader = csv.reader(io.TextIOWrapper(fh, encoding='utf-8-sig', newline=''))
+            headers = [_normalise_header(h) for h in next(reader, [])]
+            for row_number, row in enumerate(reader, start=2):
+                if any(cell.strip() for cell in row):
+                    yield row_number, dict(zip(headers, row))
+
+    @staticmethod
+    def import_file(company, fh, filename, user=None, dry_run=False):
+        """
+        Validate and import a salary sheet for ``company``. ``dry_run`` only
+        validates. Returns the counters and the per-row report under 'rows'.
+        """
+        lookups = SalaryImportService._load_lookups(company)
+        report, valid = [], []
+        seen = {}
+
+        for row_number, raw in SalaryImportService.read_rows(fh, filename):
+            entry, salary = SalaryImportService._validate_row(row_number, raw, lookups)
+            report.append(entry)
+            if salary is None:
+                continue
+            first = seen.setdefault(salary['employee_id'], entry)
+            if first is not entry:
+                message = f"Employee '{entry['employee_id']}' appears more than once in the file"
+                for duplicate in (first, entry):
+                    duplicate['status'] = 'error'
+                    if message not in duplicate['errors']:
+                        duplicate['errors'].append(message)
+            valid.append((entry, salary))
+
+        valid = [(entry, salary) for entry, salary in valid if entry['status'] != 'error']
+        if valid and not dry_run:
+            SalaryImportService._write(company, [salary for _, salary in valid], user)
+            for entry, _ in valid:
+                entry['status'] = 'imported'
+
+        imported = len(valid) if not dry_run else 0
+        if imported and user:
+            log_activity(
+                user=user,
+                action_type='CREATE',
+                module='PAYROLL',
+                description=f"Imported {imported} employee salaries from '{filename}'"
+            )
+
+        return {
+            'dry_run': dry_run,
+            'total_rows': len(report),
+            'imported_rows': imported,
+            'valid_rows': len(valid),
+            'error_rows': sum(1 for entry in report if entry['status'] == 'error'),
+            'rows': report,
+        }
+
+    # ---------- lookups ----------
+
+    @staticmethod
+    def _load_lookups(company):
+        employees = {
+            employee_id.lower(): (pk, employee_id, status)
+            for pk, employee_id, status in Employee.objects.filter(company=company).values_list('id', 'employee_id', 'status')
+        }
+        current = dict(
+            EmployeeSalary.objects.filter(employee__company=company, is_current=True)
+            .values_list('employee_id', 'effective_from')
+        )
+
+        structures = {}
+        for structure in SalaryStructure.objects.filter(company=company, is_active=True):
+            for key in (structure.name, structure.code):
+                if key:
+                    structures.setdefault(key.lower(), structure)
+        structure_components = {}
+        for struct_comp in SalaryStructureComponent.objects.filter(
+            salary_structure__company=company, salary_structure__is_active=True
+        ).select_related('component'):
+            structure_components.setdefault(struct_comp.salary_structure_id, []).append(struct_comp)
+
+        components = {}
+        for component in SalaryComponent.objects.filter(company=company, is_active=True):
+            for key in (component.name, component.code):
+                components.setdefault(_normalise_header(key), component)
+
+        return {
+            'employees': employees,
+            'current': current,
+            'structures': structures,
+            'structure_components': structure_components,
+            'components': components,
+        }
+
+    # ---------- validation ----------
+
+    @staticmethod
+    def _value(raw, column):
+        for header in COLUMNS[column]:
+            if header in raw:
+                return raw[header]
+        return None
+
+    @staticmethod
+    def _validate_row(row_number, raw, lookups):
+        errors = []
+        employee_id = _text(SalaryImportService._value(raw, 'employee_id'))
+        remarks = _text(SalaryImportService._value(raw, 'remarks'))
+        entry = {'row': row_number, 'employee_id': employee_id, 'remarks': remarks, 'status': 'error', 'errors': errors}
+
+        employee_pk = None
+        if not employee_id:
+            errors.append('Employee ID is required')
+        elif employee_id.lower() not in lookups['employees']:
+            errors.append(f"Employee '{employee_id}' not found")
+        else:
+            employee_pk, _, employee_status = lookups['employees'][employee_id.lower()]
+            if employee_status in INACTIVE_STATUSES:
+                errors.append(f"Employee '{employee_id}' is {employee_status}")
+
+        basic_salary = None
+        value = SalaryImportService._value(raw, 'basic_salary')
+        if value in (None, ''):
+            errors.append('Basic Salary is required')
+        else:
+            try:
+                basic_salary = EmployeeSalary._meta.get_field('basic_salary').clean(_decimal(value), None)
+                if basic_salary <= 0:
+                    errors.append('Basic Salary must be greater than zero')
+            except (ValueError, ValidationError) as e:
+                errors.append(f"Basic Salary: {' '.join(e.messages) if isinstance(e, ValidationError) else e}")
+
+        effective_from = timezone.now().date()
+        value = SalaryImportService._value(raw, 'effective_from')
+        if value not in (None, ''):
+            try:
+                effective_from = _date(value)
+            except ValueError as e:
+                errors.append(f"Effective From: {e}")
+        current_from = lookups['current'].get(employee_pk)
+        if current_from and effective_from < current_from:
+            errors.append(f"Effective From {effective_from} is before the current salary's ({current_from})")
+
+        structure = None
+        value = _text(SalaryImportService._value(raw, 'salary_structure'))
+        if value:
+            structure = lookups['structures'].get(value.lower())
+            if structure is None:
+                errors.append(f"Salary Structure '{value}' not found")
+
+        ctc = None
+        value = SalaryImportService._value(raw, 'ctc')
+        if value not in (None, ''):
+            try:
+                ctc = _decimal(value)
+            except ValueError as e:
+                errors.append(f"CTC: {e}")
+
+        overrides = {}
+        known = {header for headers in COLUMNS.values() for header in headers}
+        for header, value in raw.items():
+            if not header or header in known or value in (None, ''):
+                continue
+            component = lookups['components'].get(header)
+            if component is None:
+                errors.append(f"Unknown salary component column '{header}'")
+                continue
+            try:
+                amount = _decimal(value)
+            except ValueError as e:
+                errors.append(f"{component.name}: {e}")
+                continue
+            if amount < 0:
+                errors.append(f"{component.name}: amount cannot be negative")
+            overrides[component.pk] = (component, amount)
+
+        if errors:
+            return entry, None
+
+        amounts = {
+            struct_comp.component_id: (struct_comp.component, struct_comp.amount_for(basic_salary))
+            for struct_comp in (lookups['structure_components'].get(structure.pk, []) if structure else [])
+        }
+        amounts.update(overrides)
+        earnings = sum((amount for component, amount in amounts.values() if component.component_type == 'earning'), Decimal(0))
+        deductions = sum((amount for component, amount in amounts.values() if component.component_type != 'earning'), Decimal(0))
+        gross = basic_salary + earnings
+
+        entry['status'] = 'valid'
+        entry.update({'basic_salary': str(basic_salary), 'gross_salary': str(gross), 'effective_from': str(effective_from)})
+        return entry, {
+            'employee_id': employee_pk,
+            'structure': structure,
+            'basic_salary': basic_salary,
+            'gross_salary': gross,
+            'net_salary': gross - deductions,
+            'ctc': ctc if ctc is not None else gross * 12,
+            'effective_from': effective_from,
+            'remarks': remarks,
+            'components': list(amounts.values()),
+        }
+
+    # ---------- writes ----------
+
+    @staticmethod
+    @transaction.atomic
+    def _write(company, rows, user):
+        # Close out the current salaries in one statement
+        by_date = {}
+        for row in rows:
+            by_date.setdefault(row['effective_from'], []).append(row['employee_id'])
+        EmployeeSalary.objects.filter(
+            employee_id__in=[row['employee_id'] for row in rows], is_current=True
+        ).update(
+            is_current=False,
+            effective_to=Greatest(F('effective_from'), Case(*[
+                When(employee_id__in=employee_ids, then=Value(effective_from - timedelta(days=1)))
+                for effective_from, employee_ids in by_date.items()
+            ]))
+        )
+
+        salaries = [
+            EmployeeSalary(
+                employee_id=row['employee_id'],
+                salary_structure=row['structure'],
+                basic_salary=row['basic_salary'],
+                gross_salary=row['gross_salary'],
+                net_salary=row['net_salary'],
+                ctc=row['ctc'],
+                effective_from=row['effective_from'],
+                is_current=True,
+                remarks=row['remarks'],
+                created_by=user,
+            )
+            for row in rows
+        ]
+        EmployeeSalary.objects.bulk_create(salaries, batch_size=BULK_BATCH_SIZE)
+        EmployeeSalaryComponent.objects.bulk_create([
+            EmployeeSalaryComponent(employee_salary=salary, component=component, amount=amount, created_by=user)
+            for salary, row in zip(salaries, rows)
+            for component, amount in row['components']
+        ], batch_size=BULK_BATCH_SIZE)
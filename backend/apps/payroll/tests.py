@@ -1,3 +1,68 @@
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
 from django.test import TestCase
 
-# Create your tests here.
+from apps.accounts.models import Employee, Organization
+from .models import EmployeeSalary, SalaryComponent, SalaryStructure, SalaryStructureComponent
+from .services.salary_importer import SalaryImportService
+
+SAMPLES = settings.BASE_DIR.parent / 'tests' / 'salary_bulk_data'
+
+
+class SalaryImportTest(TestCase):
+    def setUp(self):
+        self.company = Organization.objects.create(name="Salary Corp", slug="salary-corp")
+        self.employees = {
+            code: Employee.objects.create(
+                employee_id=code, company=self.company, first_name=code,
+                email=f"{code.lower()}@salary.com", date_of_joining=date(2020, 1, 1)
+            )
+            for code in ('EMP001', 'EMP002', 'EMP003')
+        }
+        hra = SalaryComponent.objects.create(
+            company=self.company, name="HRA", code="HRA", component_type='earning', calculation_type='percentage'
+        )
+        SalaryComponent.objects.create(company=self.company, name="Health Insurance", code="HI", component_type='deduction')
+        for name in ("Verification Structure", "Basic salary"):
+            structure = SalaryStructure.objects.create(company=self.company, name=name)
+            SalaryStructureComponent.objects.create(salary_structure=structure, component=hra, percentage=Decimal('40'))
+        self.old = EmployeeSalary.objects.create(
+            employee=self.employees['EMP001'], basic_salary=40000, gross_salary=40000,
+            net_salary=40000, ctc=480000, effective_from=date(2023, 4, 1)
+        )
+
+    def _import(self, name, dry_run=False):
+        with open(SAMPLES / name, 'rb') as fh:
+            return SalaryImportService.import_file(self.company, fh, name, dry_run=dry_run)
+
+    def test_simple_import_closes_previous_salary(self):
+        result = self._import('01_simple_success.xlsx')
+        self.assertEqual((result['imported_rows'], result['error_rows']), (3, 0))
+
+        self.old.refresh_from_db()
+        self.assertFalse(self.old.is_current)
+        self.assertEqual(self.old.effective_to, date(2024, 3, 31))
+
+        salary = EmployeeSalary.objects.get(employee=self.employees['EMP001'], is_current=True)
+        self.assertEqual((salary.basic_salary, salary.gross_salary), (Decimal('50000'), Decimal('70000')))
+        self.assertEqual(salary.components.get().amount, Decimal('20000'))
+        self.assertFalse(EmployeeSalary.objects.get(employee=self.employees['EMP003']).components.exists())
+
+    def test_component_overrides(self):
+        self._import('02_component_overrides.xlsx')
+        salary = EmployeeSalary.objects.get(employee=self.employees['EMP002'])
+        self.assertEqual((salary.gross_salary, salary.net_salary), (Decimal('35000'), Decimal('33500')))
+
+    def test_validation_report(self):
+        result = self._import('03_mixed_validation.xlsx')
+        self.assertEqual([row['status'] for row in result['rows']], ['imported', 'error', 'imported'])
+        self.assertIn("Employee 'EMP_NONE' not found", result['rows'][1]['errors'])
+
+        result = self._import('04_missing_fields.xlsx', dry_run=True)
+        self.assertEqual([row['status'] for row in result['rows']], ['error', 'error', 'valid'])
+        self.assertEqual(result['rows'][0]['errors'], ['Basic Salary is required'])
+        self.assertEqual(result['rows'][1]['errors'], ['Employee ID is required'])
+        self.assertEqual(result['rows'][2]['effective_from'], str(date.today()))
+        self.assertEqual(EmployeeSalary.objects.filter(employee=self.employees['EMP003']).count(), 1)
@@ -4,6 +4,7 @@ from .views import (
     salary_component_list_create, salary_component_detail,
     salary_structure_list_create, salary_structure_detail, salary_structure_add_component, salary_structure_update_components,
     employee_salary_list_create, employee_salary_detail, employee_salary_current, employee_salary_stats,
+    employee_salary_bulk_import,
     payroll_period_list_create, payroll_period_detail, payroll_period_generate, payroll_period_mark_paid,
     payslip_list_create, payslip_detail, payslip_my_payslips, payslip_dashboard_stats, payslip_download, payslip_recalculate, payslip_send_email,
     tax_slab_list_create, tax_slab_detail, 
@@ -56,6 +57,7 @@ urlpatterns = [
     path('employee-salaries/<uuid:pk>/', employee_salary_detail, name='employee-salary-detail'),
     path('employee-salaries/current/', employee_salary_current, name='employee-salary-current'),
     path('employee-salaries/stats/', employee_salary_stats, name='employee-salary-stats'),
+    path('employee-salaries/bulk-import/', employee_salary_bulk_import, name='employee-salary-bulk-import'),
     
     # Payroll Periods
     path('periods/', payroll_period_list_create, name='payroll-period-list'),
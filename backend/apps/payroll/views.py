@@ -1,6 +1,7 @@
 from django.db import models
-from django.http import HttpResponse
-from rest_framework.decorators import api_view, permission_classes, action
+from django.http import Http404, HttpResponse
+from rest_framework.decorators import api_view, permission_classes, parser_classes, action
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
@@ -20,6 +21,7 @@ def get_client_company(user):
     return get_employee_org(user)
 
 from apps.accounts.models import Employee
+from apps.accounts.permissions import is_client_admin
 from apps.attendance.models import Attendance, AttendanceSummary
 from apps.leave.models import LeaveRequest
 
@@ -37,6 +39,7 @@ from .serializers import (
     LoanSerializer, EMISerializer
 )
 from .services.tds_calculator import TDSCalculator
+from .services.salary_importer import SalaryImportService
 
 
 @api_view(['GET', 'POST'])
@@ -262,41 +265,39 @@ def salary_structure_update_components(request, pk):
 def process_employee_salary_components(salary, components_data):
     """Utility to process components for employee salary"""
     if components_data and len(components_data) > 0:
-        salary.components.all().delete()
-        total_earnings = Decimal(0)
-        total_deductions = Decimal(0)
-        for comp_data in components_data:
-            component_id = comp_data.get('component_id') or comp_data.get('component')
-            amount = Decimal(str(comp_data.get('amount', 0)))
+        amounts = [
+            (comp_data.get('component_id') or comp_data.get('component'), Decimal(str(comp_data.get('amount', 0))))
+            for comp_data in components_data
+        ]
+        component_map = {
+            str(pk): component
+            for pk, component in SalaryComponent.objects.in_bulk([component_id for component_id, _ in amounts if component_id]).items()
+        }
+        rows = []
+        for component_id, amount in amounts:
             if component_id:
-                comp_obj = get_object_or_404(SalaryComponent, id=component_id)
-                EmployeeSalaryComponent.objects.create(
-                    employee_salary=salary, component=comp_obj, amount=amount
-                )
-                if comp_obj.component_type == 'earning': total_earnings += amount
-                else: total_deductions += amount
-        salary.gross_salary = salary.basic_salary + total_earnings
-        salary.net_salary = salary.gross_salary - total_deductions
-        salary.save()
+                comp_obj = component_map.get(str(component_id))
+                if comp_obj is None:
+                    raise Http404('No SalaryComponent matches the given query.')
+                rows.append((comp_obj, amount))
     elif salary.salary_structure:
-        salary.components.all().delete()
-        total_earnings = Decimal(0)
-        total_deductions = Decimal(0)
-        for struct_comp in salary.salary_structure.components.all():
-            amount = Decimal(0)
-            if struct_comp.amount > 0: amount = struct_comp.amount
-            elif struct_comp.percentage > 0: amount = (salary.basic_salary * struct_comp.percentage) / 100
-            elif struct_comp.component.calculation_type == 'percentage' and struct_comp.component.default_percentage:
-                 amount = (salary.basic_salary * struct_comp.component.default_percentage) / 100
-            else: amount = struct_comp.component.default_amount
-            EmployeeSalaryComponent.objects.create(
-                employee_salary=salary, component=struct_comp.component, amount=amount
-            )
-            if struct_comp.component.component_type == 'earning': total_earnings += amount
-            else: total_deductions += amount
-        salary.gross_salary = salary.basic_salary + total_earnings
-        salary.net_salary = salary.gross_salary - total_deductions
-        salary.save()
+        rows = [
+            (struct_comp.component, struct_comp.amount_for(salary.basic_salary))
+            for struct_comp in salary.salary_structure.components.select_related('component')
+        ]
+    else:
+        return
+
+    salary.components.all().delete()
+    EmployeeSalaryComponent.objects.bulk_create([
+        EmployeeSalaryComponent(employee_salary=salary, component=component, amount=amount)
+        for component, amount in rows
+    ])
+    total_earnings = sum((amount for component, amount in rows if component.component_type == 'earning'), Decimal(0))
+    total_deductions = sum((amount for component, amount in rows if component.component_type != 'earning'), Decimal(0))
+    salary.gross_salary = salary.basic_salary + total_earnings
+    salary.net_salary = salary.gross_salary - total_deductions
+    salary.save()
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
@@ -321,6 +322,32 @@ def employee_salary_list_create(request):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e: return Response({'error': str(e)}, status=500)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser, FormParser])
+def employee_salary_bulk_import(request):
+    """
+    Assign salaries from an XLSX/CSV sheet (see tests/salary_bulk_data).
+    Returns a per-row report; ``dry_run=true`` validates without saving.
+    """
+    try:
+        company = get_client_company(request.user)
+        if not company: return Response({'error': 'Company not found'}, status=400)
+        if not is_client_admin(request.user):
+            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if not upload.name.lower().endswith(('.csv', '.xlsx', '.xlsm')):
+            return Response({'error': 'Only CSV or XLSX files are supported.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        result = SalaryImportService.import_file(company, upload, upload.name, user=request.user, dry_run=dry_run)
+        return Response(result, status=status.HTTP_200_OK if dry_run or not result['imported_rows'] else status.HTTP_201_CREATED)
+    except Exception as e:
+        logger.error(f"Error in employee_salary_bulk_import: {str(e)}", exc_info=True)
+        return Response({'error': str(e)}, status=500)
+
 @api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def employee_salary_detail(request, pk):
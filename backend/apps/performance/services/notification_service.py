@@ -1,35 +1,37 @@
-from django.core.mail import send_mail
-from django.conf import settings
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.html import strip_tags
 
+from apps.notifications.outbox import enqueue
+
 
 class NotificationService:
     """
-    Service for sending notifications related to performance reviews
+    Service for sending notifications related to performance reviews.
+    Emails are queued in the notification outbox and sent by its worker.
     """
     
     @staticmethod
-    def _send_email(to_email, subject, html_message):
+    def _send_email(to_email, subject, html_message, dedup_key=None, digest_key=''):
         """
-        Helper method to send email
+        Helper method to queue an email
         """
-        try:
-            plain_message = strip_tags(html_message)
-            
-            send_mail(
-                subject=subject,
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[to_email],
-                html_message=html_message,
-                fail_silently=False,
-            )
-            return True
-        except Exception as e:
-            # Log error in production
-            print(f"Email sending failed: {str(e)}")
+        if not to_email:
             return False
+        return enqueue(
+            'performance',
+            recipients=[to_email],
+            subject=subject,
+            body=strip_tags(html_message),
+            html=html_message,
+            dedup_key=dedup_key,
+            digest_key=digest_key,
+        )
+
+    @staticmethod
+    def _reminder_key(kind, obj, to_email):
+        # At most one reminder of a kind per object, recipient and day
+        return f"performance:{kind}:{obj.pk}:{to_email}:{timezone.localdate()}"
     
     @staticmethod
     def notify_review_period_started(performance_review):
@@ -182,6 +184,7 @@ class NotificationService:
         review_period = performance_review.review_period
         
         subject = f"Reminder: Complete Your Self-Assessment - {review_period.name}"
+        dedup_key = NotificationService._reminder_key('employee-reminder', performance_review, employee.email)
         
         html_message = f"""
         <html>
@@ -196,7 +199,7 @@ class NotificationService:
         </html>
         """
         
-        return NotificationService._send_email(employee.email, subject, html_message)
+        return NotificationService._send_email(employee.email, subject, html_message, dedup_key=dedup_key, digest_key='performance-reminders')
     
     @staticmethod
     def notify_manager_reminder(performance_review):
@@ -212,6 +215,7 @@ class NotificationService:
         review_period = performance_review.review_period
         
         subject = f"Reminder: Complete Performance Review - {employee.get_full_name()}"
+        dedup_key = NotificationService._reminder_key('manager-reminder', performance_review, manager.email)
         
         html_message = f"""
         <html>
@@ -227,7 +231,7 @@ class NotificationService:
         </html>
         """
         
-        return NotificationService._send_email(manager.email, subject, html_message)
+        return NotificationService._send_email(manager.email, subject, html_message, dedup_key=dedup_key, digest_key='performance-reminders')
     
     @staticmethod
     def notify_deadline_approaching(performance_review, days_remaining):
@@ -238,6 +242,7 @@ class NotificationService:
         review_period = performance_review.review_period
         
         subject = f"Urgent: {days_remaining} Days Left - Performance Review Deadline"
+        dedup_key = NotificationService._reminder_key('review-deadline', performance_review, employee.email)
         
         html_message = f"""
         <html>
@@ -253,7 +258,7 @@ class NotificationService:
         </html>
         """
         
-        return NotificationService._send_email(employee.email, subject, html_message)
+        return NotificationService._send_email(employee.email, subject, html_message, dedup_key=dedup_key, digest_key='performance-reminders')
     
     @staticmethod
     def notify_goal_deadline_approaching(goal, days_remaining):
@@ -263,6 +268,7 @@ class NotificationService:
         employee = goal.employee
         
         subject = f"Goal Deadline Approaching: {goal.title}"
+        dedup_key = NotificationService._reminder_key('goal-deadline', goal, employee.email)
         
         html_message = f"""
         <html>
@@ -278,7 +284,7 @@ class NotificationService:
         </html>
         """
         
-        return NotificationService._send_email(employee.email, subject, html_message)
+        return NotificationService._send_email(employee.email, subject, html_message, dedup_key=dedup_key, digest_key='performance-reminders')
     
     @staticmethod
     def send_bulk_notification(recipients, subject, message):
@@ -2,8 +2,9 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Count, Q
-from apps.leave.models import LeaveRequest, LeaveBalance, LeaveType
+from django.db.models import Sum, Count, Q, DecimalField, FilteredRelation, Value
+from django.db.models.functions import Coalesce
+from apps.leave.models import LeaveRequest, LeaveType
 from apps.accounts.models import Employee
 from apps.attendance.models import Attendance
 from apps.payroll.models import PaySlip, AdhocPayment
@@ -46,41 +47,46 @@ class LeaveReportViewSet(viewsets.ViewSet):
             except (ValueError, TypeError):
                 year = date.today().year
             
-            employees = Employee.objects.filter(company_id=company_id, status='active')
-            report_data = []
-            
-            for emp in employees:
-                balances = LeaveBalance.objects.filter(employee=emp, year=year).select_related('leave_type')
-                leave_stats = []
-                
-                for bal in balances:
-                    # Use decimals consistently or convert safely to float
-                    allocated = bal.allocated or Decimal('0')
-                    carry_forward = bal.carry_forward or Decimal('0')
-                    used = bal.used or Decimal('0')
-                    pending = bal.pending or Decimal('0')
-                    
-                    try:
-                        available = float(bal.available)
-                    except (TypeError, ValueError, AttributeError):
-                        # Calculate as fallback
-                        available = float(allocated + carry_forward - used - pending)
-
-                    leave_stats.append({
-                        'type': bal.leave_type.name if bal.leave_type else 'Unknown',
-                        'total': float(allocated + carry_forward),
-                        'used': float(used),
-                        'pending': float(pending),
-                        'available': available
-                    })
-                
-                report_data.append({
-                    'employee_id': emp.employee_id,
-                    'employee_name': emp.full_name,
-                    'department': emp.department.name if emp.department else 'N/A',
-                    'leaves': leave_stats
+            # One grouped query: active employees LEFT JOIN their balances of the year,
+            # summed per leave type, then pivoted into one row per employee
+            zero = Value(Decimal('0'), output_field=DecimalField(max_digits=9, decimal_places=2))
+            rows = Employee.objects.filter(
+                company_id=company_id, status='active'
+            ).annotate(
+                balance=FilteredRelation('leave_balances', condition=Q(leave_balances__year=year))
+            ).values(
+                'id', 'employee_id', 'first_name', 'middle_name', 'last_name',
+                'department__name', 'balance__leave_type__name'
+            ).annotate(
+                allocated=Coalesce(Sum('balance__allocated'), zero),
+                carry_forward=Coalesce(Sum('balance__carry_forward'), zero),
+                used=Coalesce(Sum('balance__used'), zero),
+                pending=Coalesce(Sum('balance__pending'), zero),
+                balances=Count('balance__id'),
+            ).order_by('first_name', 'last_name', 'id', 'balance__leave_type__name')
+
+            report = {}
+            for row in rows:
+                entry = report.get(row['id'])
+                if entry is None:
+                    entry = report[row['id']] = {
+                        'employee_id': row['employee_id'],
+                        'employee_name': ' '.join(filter(None, (row['first_name'], row['middle_name'], row['last_name']))),
+                        'department': row['department__name'] or 'N/A',
+                        'leaves': []
+                    }
+                if not row['balances']:
+                    continue
+                total = row['allocated'] + row['carry_forward']
+                entry['leaves'].append({
+                    'type': row['balance__leave_type__name'] or 'Unknown',
+                    'total': float(total),
+                    'used': float(row['used']),
+                    'pending': float(row['pending']),
+                    'available': float(total - row['used'] - row['pending'])
                 })
-                
+            report_data = list(report.values())
+
             return Response(report_data)
         except Exception as e:
             # Re-raise for debugging if needed, but for now return clean 500
@@ -91,6 +91,7 @@ INSTALLED_APPS = [
     'apps.performance',
     'apps.recruitment',
     'apps.expenses',
+    'apps.notifications',
 ]
 
 # Custom User Model - uncomment if you create a custom User class
@@ -108,6 +109,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.accounts.tenant.TenantMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -184,6 +186,31 @@ else:
     }
 
 
+# =============================================================================
+# CACHE CONFIGURATION
+# =============================================================================
+
+# Shared cache for counters and lookup maps. Use Redis in production so that
+# all workers see the same values; local memory is per-process.
+REDIS_URL = env('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'hrms',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'hrms-default',
+        }
+    }
+
+
 # =============================================================================
 # AUTHENTICATION CONFIGURATION
 # =============================================================================
@@ -238,7 +265,7 @@ CSRF_TRUSTED_ORIGINS = CORS_ALLOWED_ORIGINS if CORS_ALLOWED_ORIGINS else [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.TenantJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
@@ -258,6 +285,11 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
 }
 
+# Trust the tenant claims (employee, company, root org, admin flag) of access
+# tokens whose permission version is current and skip loading the User row.
+# Needs a shared cache (REDIS_URL): startup fails with a per-process backend.
+JWT_STATELESS_TENANT = env.bool('JWT_STATELESS_TENANT', default=False)
+
 
 # =============================================================================
 # STATIC & MEDIA FILES
@@ -316,6 +348,34 @@ LOGGING = {
 }
 
 
+# =============================================================================
+# PERMISSION AUDIT
+# =============================================================================
+
+# Permission checks are audited through a per-process buffer flushed in bulk.
+# Denials are always kept; successful checks are sampled at this rate.
+PERMISSION_AUDIT_SAMPLE_RATE = env.float('PERMISSION_AUDIT_SAMPLE_RATE', default=1.0)
+PERMISSION_AUDIT_BATCH_SIZE = env.int('PERMISSION_AUDIT_BATCH_SIZE', default=100)
+PERMISSION_AUDIT_FLUSH_MS = env.int('PERMISSION_AUDIT_FLUSH_MS', default=2000)
+
+
+# =============================================================================
+# EMPLOYEE IMPORT
+# =============================================================================
+
+# Threads hashing the passwords of a bulk employee import (0 = one per CPU)
+EMPLOYEE_IMPORT_HASH_WORKERS = env.int('EMPLOYEE_IMPORT_HASH_WORKERS', default=0)
+
+
+# =============================================================================
+# STATISTICS SNAPSHOTS
+# =============================================================================
+
+# Dashboard counts are served from snapshots refreshed by
+# `manage.py refresh_stats_snapshots`; older ones are reported stale.
+STATS_SNAPSHOT_MAX_AGE = env.int('STATS_SNAPSHOT_MAX_AGE', default=900)
+
+
 # =============================================================================
 # EMAIL CONFIGURATION
 # =============================================================================